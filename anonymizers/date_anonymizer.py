@@ -6,8 +6,16 @@
 # @brief: 日期脱敏
 import re
 from datetime import datetime, timedelta
+from functools import lru_cache
 
+# 缓存的日期条目数：病历中反复出现的日期通常只有几百到几千个
+DATE_CACHE_SIZE = 65536
 
+# 整格日期（批量接口使用），与规则引擎的日期正则一致：19xx/20xx 年，分隔符 - / . 或 年月日
+RE_FULL_DATE = re.compile(r'(19\d{2}|20\d{2})[-/.年](0?[1-9]|1[0-2])[-/.月](0?[1-9]|[12]\d|3[01])日?')
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def normalize_and_shift_date(text, shift_days=-100):
     '''
     日期处理,只保留年月日，且向前偏移一定天数，例如向前偏移100天
@@ -21,9 +29,28 @@ def normalize_and_shift_date(text, shift_days=-100):
         return None  # 未匹配到日期则返回 None
 
     year, month, day = map(int, match.groups())
+    return _shift_ymd(year, month, day, shift_days)
+
+
+def shift_date(year, month, day, shift_days=-100):
+    '''
+    按年月日偏移日期（调用方已从匹配结果中取出年月日时使用，无需再次正则解析）
+    :param year: 年 例如：2025
+    :param month: 月 例如：10
+    :param day: 日 例如：1
+    :param shift_days: 向前偏移的天数 例如：-100天
+    :return: 偏移后的 YYYY-MM-DD；日期不合法（如 2 月 30 日）时返回 None
+    '''
+    return _shift_ymd(int(year), int(month), int(day), shift_days)
+
 
-    # 构造日期对象
-    date_obj = datetime(year, month, day)
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _shift_ymd(year, month, day, shift_days):
+    try:
+        # 构造日期对象
+        date_obj = datetime(year, month, day)
+    except ValueError:
+        return None
 
     # 向前偏移指定天数（默认 -10 天）
     shifted_date = date_obj + timedelta(days=shift_days)
@@ -32,6 +59,50 @@ def normalize_and_shift_date(text, shift_days=-100):
     return shifted_date.strftime("%Y-%m-%d")
 
 
+def shift_dates(values, shift_days=-100):
+    '''
+    批量日期偏移：去重后用 NumPy datetime64 一次完成校验、偏移和格式化
+    :param values: 日期字符串列表或 pandas Series，每个值须整体是一个日期（如 2025-10-01、2025/10/01、2025年10月1日）
+    :param shift_days: 偏移天数；整数时所有值偏移相同天数，与 values 等长的序列时逐个偏移（如按患者的偏移量）
+    :return: 与输入同结构（列表或 Series）的 YYYY-MM-DD；不是日期或日期不合法的位置为 None
+    '''
+    # NumPy 只在批量接口中用到，按需导入
+    import numpy as np
+    is_series = hasattr(values, 'index') and hasattr(values, 'to_numpy')
+    raw = np.asarray(values.to_numpy(dtype=object) if is_series else list(values), dtype=object)
+    if len(raw) == 0:
+        result = []
+    else:
+        uniques, inverse = np.unique(raw.astype(str), return_inverse=True)
+        days, valid = _parse_unique(uniques)
+        days, valid = days[inverse], valid[inverse]
+        out = np.datetime_as_string(days + np.asarray(shift_days, dtype=np.int64), unit='D').astype(object)
+        out[~valid] = None
+        result = out.tolist()
+    if is_series:
+        return values.__class__(result, index=values.index, name=values.name, dtype=object)
+    return result
+
+
+def _parse_unique(uniques):
+    import numpy as np
+    # 正则只作用于去重后的值；未匹配的位置年月日记为 0，后面按不合法处理
+    ymd = np.zeros((len(uniques), 3), dtype=np.int64)
+    for i, text in enumerate(uniques):
+        match = RE_FULL_DATE.fullmatch(text)
+        if match:
+            ymd[i] = [int(g) for g in match.groups()]
+    year, month, day = ymd[:, 0], ymd[:, 1], ymd[:, 2]
+    valid = (year > 0) & (month >= 1) & (month <= 12) & (day >= 1)
+
+    # 月份起始日 + (日 - 1)，日不能超过当月天数（闰年由 datetime64 自动处理）
+    months = (np.where(valid, year, 1970) - 1970) * 12 + np.where(valid, month, 1) - 1
+    month_start = months.astype('datetime64[M]').astype('datetime64[D]')
+    month_days = ((months + 1).astype('datetime64[M]').astype('datetime64[D]') - month_start).astype(np.int64)
+    valid &= day <= month_days
+    return month_start + (np.where(valid, day, 1) - 1), valid
+
+
 if __name__ == '__main__':
     # 测试示例
     examples = [
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17 17:10
+# @File    : date_offset.py
+# @brief: 按患者的日期偏移量（HMAC 密钥派生 + 偏移量表缓存）
+'''
+同一患者的所有日期使用同一个偏移量，患者内部的时间间隔（住院天数、复诊间隔等）保持不变；
+不同患者的偏移量不同，且不知道密钥无法由患者 ID 推算出偏移量。
+- 偏移量 = HMAC-SHA256(密钥, 患者ID) 映射到 [min_days, max_days]
+- 计算结果写入偏移量表（PseudonymStore，可为 SQLite 持久化存储），批量任务中每个患者只计算一次，之后按 ID 直接查表
+'''
+import hashlib
+import hmac
+from typing import Iterable, List, Optional, Union
+
+from anonymizers.id_anonymizer import _is_missing, _na_values
+from anonymizers.pseudonym_store import MemoryStore, PseudonymStore
+
+
+def hmac_offset(key: Union[str, bytes], patient_id: str, min_days: int = -365, max_days: int = -1) -> int:
+    '''
+    由密钥和患者 ID 确定性地生成偏移天数
+    :param key: 密钥
+    :param patient_id: 患者 ID（住院号、身份证号等）
+    :param min_days: 偏移下限（含）
+    :param max_days: 偏移上限（含）
+    :return: min_days ~ max_days 之间的整数
+    '''
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    digest = hmac.new(key, str(patient_id).encode('utf-8'), hashlib.sha256).digest()
+    return min_days + int.from_bytes(digest[:8], 'big') % (max_days - min_days + 1)
+
+
+def key_fingerprint(key: Union[str, bytes]) -> str:
+    '''
+    密钥的不可逆指纹，用于区分不同密钥生成的偏移量表/输出，不泄露密钥本身
+    :param key:
+    :return: 12 位十六进制串
+    '''
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    return hmac.new(key, b'date_offset', hashlib.sha256).hexdigest()[:12]
+
+
+class DateOffsetTable(object):
+    '''
+    患者 → 偏移天数 的查询表
+    '''
+
+    def __init__(self, key: Union[str, bytes], min_days: int = -365, max_days: int = -1, default_days: int = -100,
+                 store: Optional[PseudonymStore] = None):
+        '''
+        :param key: HMAC 密钥（来自配置 date_shift_key 或环境变量 SAFE_MED_DATE_KEY）
+        :param min_days: 偏移下限（含）
+        :param max_days: 偏移上限（含）
+        :param default_days: 患者 ID 为空时使用的偏移天数
+        :param store: 偏移量表的存储（通常与 ID 映射共用同一个 SQLite 文件），缺省时在内存中
+        '''
+        if not key:
+            raise ValueError('日期偏移密钥不能为空')
+        if min_days > max_days:
+            raise ValueError(f'偏移范围不合法: {min_days} > {max_days}')
+        self.key = key.encode('utf-8') if isinstance(key, str) else key
+        self.min_days = min_days
+        self.max_days = max_days
+        self.default_days = default_days
+        self.store = store if store is not None else MemoryStore()
+        # 密钥或范围变化后不能复用旧表：namespace 中带上密钥指纹（不可逆）和范围
+        self.namespace = f'date_offset:{key_fingerprint(self.key)}:{min_days}:{max_days}'
+
+    def _compute(self, patient_id: str) -> str:
+        return str(hmac_offset(self.key, patient_id, self.min_days, self.max_days))
+
+    def offsets_for(self, patient_ids: Iterable) -> List[int]:
+        '''
+        批量查询偏移天数：去重后一次查表，表中没有的患者计算后写入
+        :param patient_ids: 患者 ID 序列（可为 pandas Series）
+        :return: 与 patient_ids 等长的偏移天数列表
+        '''
+        # None / NaN / pd.NA / NaT（pandas 缺失值）视为无患者 ID
+        na_values = _na_values()
+        ids = ['' if _is_missing(pid, na_values) else str(pid).strip() for pid in patient_ids]
+        table = self.store.get_or_create_many((pid for pid in ids if pid), self._compute, namespace=self.namespace)
+        return [int(table[pid]) if pid else self.default_days for pid in ids]
+
+    def offset_for(self, patient_id) -> int:
+        return self.offsets_for([patient_id])[0]
@@ -5,6 +5,7 @@
 # @File    : doctor_anonymizer.py
 # @brief: 医生职称脱敏
 import re
+from typing import Optional
 
 # 医院常见职称列表（可根据实际医院扩展） todo：替换成从文件中读取
 TITLES = [
@@ -18,14 +19,18 @@ TITLES = [
 ]
 
 
-def anonymize_name_with_title(text: str) -> str:
+def anonymize_name_with_title(text: str, title: Optional[str] = None) -> str:
     """
     医院姓名脱敏，保留职称，姓名替换为'某某'
     例如：
         '陈佛平主治医师' → '某某主治医师'
         '李四护士长' → '某某护士长'
         '王五技师' → '某某技师'
+    title: 调用方已识别出的职称（如正则捕获组），给出时不再查找职称表
     """
+    if title:
+        return "某某" + title
+
     if not text or not isinstance(text, str):
         return "某某"
 
@@ -5,17 +5,101 @@
 # @File    : id_anonymizer.py
 # @brief: 各种id号脱敏
 import hashlib
+import sys
+from functools import lru_cache
 
+# 单值与批量哈希共用的缓存条目数上限
+HASH_CACHE_SIZE = 1 << 18
 
-def get_hash(text):
+
+def get_hash(text, store=None, key=None):
     '''
     生成唯一代号
     :param value:
+    :param store: 可选的假名存储（PseudonymStore），已有映射时直接复用，保证跨运行/跨进程一致
+    :param key: 可选的密钥，指定时改用带密钥的 BLAKE2（更快，且无法用字典穷举反推原值）
     :return:
     '''
 
     if not text:
         return ''
     value = str(text)
-    hash_number = hashlib.sha256(value.encode("utf-8")).hexdigest()[:8]
-    return hash_number
+    if store is not None:
+        return store.get_or_create(value, lambda v: hash_code(v, key), namespace=hash_namespace("hash", key))
+    return hash_code(value, key)
+
+
+def get_hash_many(values, store=None, key=None):
+    '''
+    批量生成代号：先去重，只对唯一值计算哈希（与 get_hash 共用缓存）
+    :param values: 可迭代对象或 pandas Series
+    :param store: 可选的假名存储，唯一值一次批量查询/写入
+    :param key: 同 get_hash
+    :return: 与输入对齐的代号列表（输入为 Series 时返回同索引的 Series）；空值对应 ''
+    '''
+    return map_unique(values, lambda v: hash_code(v, key), store, hash_namespace("hash", key))
+
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def hash_code(value, key=None):
+    '''
+    8 位十六进制摘要（有界缓存）：无密钥时为 SHA-256 前缀，与历史代号一致；有密钥时为 BLAKE2b
+    :param value: 字符串
+    :param key: 密钥（str 或 bytes）
+    :return:
+    '''
+    if key is None:
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()[:8]
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    return hashlib.blake2b(value.encode("utf-8"), key=key, digest_size=4).hexdigest()
+
+
+def hash_namespace(base, key=None):
+    '''
+    假名存储中的 namespace：带密钥的代号与无密钥的代号分开存放，换密钥后不会取到旧代号
+    '''
+    if key is None:
+        return base
+    return f"{base}:blake2:{hash_code('namespace', key)}"
+
+
+def _na_values():
+    '''
+    pandas 的 pd.NA / NaT 不能直接求布尔值，只在已导入 pandas 时才可能出现
+    '''
+    pd = sys.modules.get('pandas')
+    return (pd.NA, pd.NaT) if pd is not None else ()
+
+
+def _is_missing(value, na_values=()):
+    '''
+    None、NaN（含 numpy 浮点）以及 na_values 中的缺失值标记
+    '''
+    if value is None or (isinstance(value, float) and value != value):
+        return True
+    return any(value is na for na in na_values)
+
+
+def map_unique(values, factory, store=None, namespace=""):
+    '''
+    对去重后的值调用 factory，结果按位置映射回输入
+    :param values: 可迭代对象或 pandas Series；与 get_hash 一致，空值（None、NaN、空串等）对应 ''
+    :param factory: 字符串 → 代号
+    :param store: 可选的假名存储
+    :param namespace:
+    :return:
+    '''
+    is_series = hasattr(values, 'index') and hasattr(values, 'to_numpy')
+    na_values = _na_values()
+    keys = ['' if _is_missing(v, na_values) or not v else str(v) for v in values]
+    uniques = [k for k in dict.fromkeys(keys) if k]
+    if store is not None:
+        codes = store.get_or_create_many(uniques, factory, namespace=namespace)
+    else:
+        codes = {k: factory(k) for k in uniques}
+    codes[''] = ''
+    result = [codes[k] for k in keys]
+    if is_series:
+        return values.__class__(result, index=values.index, name=values.name, dtype=object)
+    return result
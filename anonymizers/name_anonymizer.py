@@ -5,7 +5,8 @@
 # @File    : name_anonymizer.py
 # @brief: 姓名脱敏
 import re
-import hashlib
+
+from anonymizers.id_anonymizer import hash_code, hash_namespace, map_unique
 
 
 def anonymize_name(name: str) -> str:
@@ -33,15 +34,33 @@ def anonymize_name(name: str) -> str:
     return name[0] + '某'
 
 
-def hash_name(name: str) -> str:
+def hash_name(name: str, store=None, key=None) -> str:
     '''
     对姓名进行哈希脱敏，可保持同名映射一致
     张三 → NAME_ID_8a9f3b1c
     李四 → NAME_ID_17e25ca2
     :param name:
+    :param store: 可选的假名存储（PseudonymStore），已有映射时直接复用
+    :param key: 可选的密钥，指定时改用带密钥的 BLAKE2（见 id_anonymizer.hash_code）
     :return:
     '''
     if not name:
         return ""
-    h = hashlib.sha256(name.encode('utf-8')).hexdigest()[:8]
-    return f"NAME_ID_{h}"
+    if store is not None:
+        return store.get_or_create(name, lambda n: _name_code(n, key), namespace=hash_namespace("name", key))
+    return _name_code(name, key)
+
+
+def hash_name_many(names, store=None, key=None):
+    '''
+    批量姓名哈希：去重后只对唯一姓名计算（与 hash_name 共用缓存）
+    :param names: 可迭代对象或 pandas Series
+    :param store: 可选的假名存储
+    :param key: 同 hash_name
+    :return: 与输入对齐的代号列表（输入为 Series 时返回同索引的 Series）；空值对应 ''
+    '''
+    return map_unique(names, lambda n: _name_code(n, key), store, hash_namespace("name", key))
+
+
+def _name_code(name: str, key=None) -> str:
+    return f"NAME_ID_{hash_code(name, key)}"
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17 14:20
+# @File    : pseudonym_store.py
+# @brief: 假名映射存储（原值 → 代号），跨运行、跨进程保持一致
+'''
+- MemoryStore：进程内字典，默认实现，行为与原先的 hash_mapping 字典一致
+- SQLiteStore：SQLite（WAL 模式）持久化，多个工作进程可同时读写同一个库文件
+- LRUStore：在任意后端前加一层有界 LRU 缓存，千万级映射也无需全部驻留内存
+所有存储都支持批量 get_many / put_many；写入时已存在的映射优先（先写者胜），保证各进程得到同一代号。
+映射按 namespace 区分（如身份证、姓名各用一个），同一原值在不同 namespace 下互不影响。
+'''
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# 单条 SQL 中 IN (...) 的参数个数上限（SQLite 默认上限 999）
+_SQL_BATCH = 500
+
+
+class PseudonymStore(ABC):
+    '''
+    存储基类：子类必须实现 get_many / put_many / __len__，缺少任一方法时无法实例化
+    另提供字典式接口（作用于默认 namespace ""），可直接替代原 hash_mapping 字典
+    '''
+
+    @abstractmethod
+    def get_many(self, keys: Iterable[str], namespace: str = "") -> Dict[str, str]:
+        '''
+        批量查询
+        :param keys:
+        :param namespace:
+        :return: 已存在的 {原值: 代号}，不存在的键不出现在结果中
+        '''
+
+    @abstractmethod
+    def put_many(self, mapping: Dict[str, str], namespace: str = "") -> Dict[str, str]:
+        '''
+        批量写入，已存在的键保留原代号
+        :param mapping: {原值: 代号}
+        :param namespace:
+        :return: 写入后实际生效的 {原值: 代号}
+        '''
+
+    def get_or_create_many(self, keys: Iterable[str], factory: Callable[[str], str],
+                           namespace: str = "") -> Dict[str, str]:
+        '''
+        批量取代号，缺失的键用 factory(原值) 生成后写入
+        :param keys:
+        :param factory: 原值 → 代号
+        :param namespace:
+        :return: {原值: 代号}，包含 keys 中的所有键
+        '''
+        keys = list(dict.fromkeys(keys))
+        found = self.get_many(keys, namespace)
+        missing = {k: factory(k) for k in keys if k not in found}
+        if missing:
+            found.update(self.put_many(missing, namespace))
+        return found
+
+    def get_or_create(self, key: str, factory: Callable[[str], str], namespace: str = "") -> str:
+        return self.get_or_create_many([key], factory, namespace)[key]
+
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        '''
+        映射条目总数（所有 namespace）
+        '''
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.get_many([key]).get(key, default)
+
+    def __getitem__(self, key: str) -> str:
+        found = self.get_many([key])
+        if key not in found:
+            raise KeyError(key)
+        return found[key]
+
+    def __setitem__(self, key: str, value: str) -> None:
+        self.put_many({key: value})
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.get_many([key])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class MemoryStore(PseudonymStore):
+    '''
+    进程内字典存储
+    '''
+
+    def __init__(self):
+        self._data: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys, namespace=""):
+        data = self._data
+        return {k: data[(namespace, k)] for k in keys if (namespace, k) in data}
+
+    def put_many(self, mapping, namespace=""):
+        with self._lock:
+            return {k: self._data.setdefault((namespace, k), v) for k, v in mapping.items()}
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteStore(PseudonymStore):
+    '''
+    SQLite 持久化存储（WAL 模式：读写互不阻塞，多进程并发写由 SQLite 文件锁串行化）
+    连接按进程懒加载，fork 出的工作进程会各自重新连接
+    '''
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        '''
+        :param path: 数据库文件路径，不存在时自动创建
+        :param timeout: 等待其它进程释放写锁的秒数
+        '''
+        self.path = str(path)
+        self.timeout = timeout
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pseudonyms ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get_many(self, keys, namespace=""):
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            for i in range(0, len(keys), _SQL_BATCH):
+                batch = keys[i:i + _SQL_BATCH]
+                sql = "SELECT key, value FROM pseudonyms WHERE namespace = ? AND key IN (%s)" % ",".join("?" * len(batch))
+                found.update(conn.execute(sql, [namespace] + batch).fetchall())
+        return found
+
+    def put_many(self, mapping, namespace=""):
+        if not mapping:
+            return {}
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO pseudonyms (namespace, key, value) VALUES (?, ?, ?)",
+                    [(namespace, k, v) for k, v in mapping.items()],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        # 其它进程可能先写入了同一键，以库中的值为准
+        return self.get_many(mapping.keys(), namespace)
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM pseudonyms").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        # 连接不可 pickle，传给工作进程时只带路径
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_pid"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class LRUStore(PseudonymStore):
+    '''
+    有界 LRU 缓存 + 后端存储：命中缓存不访问后端，未命中的键批量查询后端
+    '''
+
+    def __init__(self, backend: PseudonymStore, maxsize: int = 100000):
+        self.backend = backend
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, namespace, mapping):
+        cache = self._cache
+        for k, v in mapping.items():
+            cache[(namespace, k)] = v
+            cache.move_to_end((namespace, k))
+        while len(cache) > self.maxsize:
+            cache.popitem(last=False)
+
+    def get_many(self, keys, namespace=""):
+        found = {}
+        missing = []
+        with self._lock:
+            for k in keys:
+                v = self._cache.get((namespace, k))
+                if v is None:
+                    missing.append(k)
+                else:
+                    self._cache.move_to_end((namespace, k))
+                    found[k] = v
+        if missing:
+            loaded = self.backend.get_many(missing, namespace)
+            with self._lock:
+                self._remember(namespace, loaded)
+            found.update(loaded)
+        return found
+
+    def put_many(self, mapping, namespace=""):
+        stored = self.backend.put_many(mapping, namespace)
+        with self._lock:
+            self._remember(namespace, stored)
+        return stored
+
+    def __len__(self):
+        return len(self.backend)
+
+    def close(self):
+        self.backend.close()
+
+    def __getstate__(self):
+        # 缓存不随 pickle 传递，工作进程各自重新预热
+        state = self.__dict__.copy()
+        state["_cache"] = OrderedDict()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def open_store(path: Optional[str] = None, cache_size: int = 100000) -> PseudonymStore:
+    '''
+    获取假名存储
+    :param path: SQLite 文件路径；为空时返回进程内 MemoryStore
+    :param cache_size: SQLite 前置 LRU 缓存的条目数
+    :return:
+    '''
+    if not path:
+        return MemoryStore()
+    return LRUStore(SQLiteStore(path), maxsize=cache_size)
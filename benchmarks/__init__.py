@@ -0,0 +1,5 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17 15:10
+# @File    : __init__.py
+# @brief: 性能基准（python -m benchmarks）
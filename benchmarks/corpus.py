@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17 15:10
+# @File    : corpus.py
+# @brief: 合成中文病历语料（确定性，可复现）
+'''
+同一 seed 生成的语料与词典完全一致，便于不同版本之间对比耗时。
+语料中混入姓名、身份证、电话、日期、年龄、医院、科室、医生职称等敏感信息。
+'''
+import random
+from pathlib import Path
+from typing import Dict, List
+
+SURNAMES = ['张', '王', '李', '赵', '刘', '陈', '杨', '黄', '周', '吴', '徐', '孙', '马', '朱', '胡', '郭', '何', '林',
+            '欧阳', '司马', '诸葛', '上官']
+GIVEN_CHARS = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华建国文玉兰红梅志'
+CITIES = ['北京', '上海', '广州', '深圳', '天津', '重庆', '成都', '武汉', '南京', '西安', '杭州', '长沙', '沈阳', '郑州']
+HOSPITAL_WORDS = ['协和', '人民', '中医', '友谊', '同仁', '仁济', '华山', '湘雅', '齐鲁', '中山', '第一', '第二', '第三',
+                  '妇幼', '儿童', '肿瘤', '胸科', '口腔', '眼科', '骨科']
+HOSPITAL_SUFFIXES = ['医院', '人民医院', '中医院', '妇幼保健院', '卫生院', '诊所', '医疗中心', '附属医院']
+DEPARTMENTS = ['心内科', '呼吸内科', '消化内科', '神经内科', '胸外科', '普外科', '骨科', '妇产科', '儿科', '急诊科',
+               '肿瘤科', '影像科', '检验科']
+TITLES = ['主任医师', '副主任医师', '主治医师', '住院医师', '护士长', '主管护师', '护师', '技师']
+SYMPTOMS = ['胸闷气短', '反复咳嗽', '上腹部疼痛', '头晕乏力', '发热伴寒战', '双下肢水肿', '心悸', '恶心呕吐']
+FINDINGS = ['双肺呼吸音清', '心律齐，未闻及杂音', '腹软，无压痛', '神志清楚，对答切题', '血压130/85mmHg']
+PLANS = ['完善相关检查', '予抗感染治疗', '建议门诊随访', '择期手术', '低盐低脂饮食', '监测血糖']
+
+
+class CorpusGenerator(object):
+    '''
+    确定性病历生成器
+    '''
+
+    def __init__(self, seed: int = 0, n_hospitals: int = 200):
+        '''
+        :param seed: 随机种子
+        :param n_hospitals: 医院词典规模
+        '''
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.hospitals = self.make_hospitals(n_hospitals)
+
+    def make_hospitals(self, n: int) -> List[str]:
+        rng = random.Random(self.seed + 1)
+        names = set()
+        while len(names) < n:
+            # 组合数有限，词典较大时加分院编号保证不重复
+            branch = f'第{len(names)}分院' if len(names) >= 2000 else ''
+            names.add(rng.choice(CITIES) + rng.choice(HOSPITAL_WORDS) + rng.choice(HOSPITAL_WORDS)
+                      + rng.choice(HOSPITAL_SUFFIXES) + branch)
+        return sorted(names)
+
+    def name(self) -> str:
+        rng = self.rng
+        return rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_CHARS) for _ in range(rng.randint(1, 2)))
+
+    def id_card(self) -> str:
+        rng = self.rng
+        body = '%06d%04d%02d%02d%03d' % (rng.randint(110000, 659999), rng.randint(1940, 2020), rng.randint(1, 12),
+                                         rng.randint(1, 28), rng.randint(0, 999))
+        return body + rng.choice('0123456789X')
+
+    def phone(self) -> str:
+        return '1' + self.rng.choice('3456789') + ''.join(self.rng.choice('0123456789') for _ in range(9))
+
+    def date(self) -> str:
+        rng = self.rng
+        y, m, d = rng.randint(2015, 2025), rng.randint(1, 12), rng.randint(1, 28)
+        return rng.choice(['%d-%02d-%02d', '%d年%d月%d日', '%d/%02d/%02d']) % (y, m, d)
+
+    def note(self) -> str:
+        '''
+        生成一份病历（约 400~600 字节）
+        '''
+        rng = self.rng
+        return ''.join([
+            f"姓名：{self.name()}，性别：{rng.choice('男女')}，年龄：{rng.randint(1, 95)}岁。",
+            f"身份证号：{self.id_card()}，联系电话：{self.phone()}。",
+            f"患者于{self.date()}因{rng.choice(SYMPTOMS)}就诊于{rng.choice(self.hospitals)}{rng.choice(DEPARTMENTS)}。",
+            f"查体：{rng.choice(FINDINGS)}。处理：{rng.choice(PLANS)}。",
+            f"住院号：{rng.randint(100000, 999999)}，床号：{rng.randint(1, 60)}床。",
+            f"{self.name()}{rng.choice(TITLES)}查房后签名，{self.date()}复诊。\n",
+        ])
+
+    def text(self, size_bytes: int) -> str:
+        '''
+        生成 UTF-8 编码后约 size_bytes 字节的文本（由整份病历拼接，末尾截断到目标大小）
+        '''
+        parts = []
+        total = 0
+        while total < size_bytes:
+            note = self.note()
+            parts.append(note)
+            total += len(note.encode('utf-8'))
+        text = ''.join(parts)
+        return text.encode('utf-8')[:size_bytes].decode('utf-8', errors='ignore')
+
+    def records(self, n: int) -> List[Dict[str, str]]:
+        '''
+        生成 n 条结构化记录（CSV/JSONL 加载基准用）
+        '''
+        rng = self.rng
+        return [{
+            '姓名': self.name(),
+            '年龄': str(rng.randint(1, 95)),
+            '身份证号': self.id_card(),
+            '电话': self.phone(),
+            '就诊日期': self.date(),
+            '医院': rng.choice(self.hospitals),
+            '主诉': rng.choice(SYMPTOMS) + '，' + rng.choice(FINDINGS),
+        } for _ in range(n)]
+
+    def custom_terms(self) -> Dict[str, List[str]]:
+        '''
+        与 config/custom_terms.json 同结构的词典，供 FallbackRuleEngine 使用
+        '''
+        return {
+            'hospitals': list(self.hospitals),
+            'hospital_suffixes': list(HOSPITAL_SUFFIXES),
+            'departments': list(DEPARTMENTS),
+            'surnames': list(SURNAMES),
+            'custom_sensitive': [],
+        }
+
+    def write_ner_dicts(self, out_dir: Path) -> Dict[str, str]:
+        '''
+        写出 NERRules 所需的四个词典文件
+        :return: {参数名: 路径}，可直接 NERRules(**paths)
+        '''
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        files = {
+            'titles_path': TITLES,
+            'common_surnames_path': SURNAMES,
+            'hospitals_path': self.hospitals,
+            'hospital_suffixes_path': HOSPITAL_SUFFIXES,
+        }
+        paths = {}
+        for key, words in files.items():
+            path = out_dir / f'{key[:-5]}.txt'
+            path.write_text('\n'.join(words) + '\n', encoding='utf-8')
+            paths[key] = str(path)
+        return paths
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17 15:40
+# @File    : run.py
+# @brief: 脱敏引擎与加载器的性能基准
+'''
+用法：
+    python -m benchmarks --sizes 1k,100k,1m --dict-sizes 100,10000 --out results.json
+    python -m benchmarks --out results.json --baseline benchmarks/baseline.json --tolerance 0.2
+
+每项基准在同一份确定性语料上重复 repeat 次取最短耗时；结果写为 JSON，
+指定 --baseline 时与基线逐项对比，耗时超出 (1 + tolerance) 倍的项视为回退，退出码为 1。
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.corpus import CorpusGenerator
+
+CASES = ['ner_extract', 'fallback_deidentify', 'text_anonymize', 'load_text', 'load_csv', 'load_jsonl',
+         'iter_csv_chunks', 'iter_jsonl', 'get_hash_many']
+# 与词典规模无关的基准只在第一个词典规模下运行
+DICT_INDEPENDENT = {'load_text', 'load_csv', 'load_jsonl', 'iter_csv_chunks', 'iter_jsonl', 'get_hash_many'}
+
+
+def parse_size(value: str) -> int:
+    '''
+    解析 1k / 100k / 1m / 10m / 2048 形式的字节数
+    '''
+    value = value.strip().lower()
+    units = {'k': 1024, 'm': 1024 * 1024}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def time_best(fn: Callable[[], object], repeat: int) -> float:
+    '''
+    重复执行取最短耗时（秒），屏蔽被测函数的打印输出
+    '''
+    best = float('inf')
+    for _ in range(max(1, repeat)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def build_case(case: str, text: str, generator: CorpusGenerator, work_dir: Path) -> Callable[[], object]:
+    '''
+    准备被测函数（构建引擎、写出临时文件等准备工作不计入耗时）
+    '''
+    if case == 'ner_extract':
+        from ner.ner_rules import NERRules
+        rules = NERRules(**generator.write_ner_dicts(work_dir / 'dicts'))
+        return lambda: rules.extract_entities(content=text)
+
+    if case == 'text_anonymize':
+        from ner.ner_rules import NERRules
+        from safe_text.safe_mdt import text_anonymize
+        rules = NERRules(**generator.write_ner_dicts(work_dir / 'dicts'))
+        return lambda: text_anonymize(text, ner_rules=rules)
+
+    if case == 'fallback_deidentify':
+        from safe_med_ui.rule_fallback import FallbackRuleEngine
+        categories = {k: True for k in ['date', 'id_like', 'phone', 'email', 'age', 'doctor_title', 'hospital_dict',
+                                        'surnames', 'hospital_suffixes', 'departments', 'custom_sensitive']}
+        engine = FallbackRuleEngine(custom_terms=generator.custom_terms(), enable_categories=categories)
+        return lambda: engine.deidentify(text)
+
+    from safe_med_ui.io_utils import iter_df_chunks, iter_jsonl, load_file, save_df, save_jsonl
+    import pandas as pd
+
+    if case == 'load_text':
+        path = work_dir / 'corpus.txt'
+        path.write_text(text, encoding='utf-8')
+        return lambda: load_file(str(path))
+
+    # 结构化数据的行数按文本大小折算，使各加载器处理的字节数相近
+    n_rows = max(1, len(text.encode('utf-8')) // 200)
+    if case == 'get_hash_many':
+        from anonymizers.id_anonymizer import get_hash_many, hash_code
+        # 身份证列：每个号码重复 10 次；每轮清空缓存，计入唯一值的哈希耗时
+        ids = [r['身份证号'] for r in CorpusGenerator(generator.seed).records(max(1, n_rows // 10))] * 10
+
+        def hash_ids():
+            hash_code.cache_clear()
+            return get_hash_many(ids)
+        return hash_ids
+
+    if case in ('load_csv', 'iter_csv_chunks'):
+        path = work_dir / 'records.csv'
+        if not path.exists():
+            save_df(path, pd.DataFrame(CorpusGenerator(generator.seed).records(n_rows)))
+        if case == 'load_csv':
+            return lambda: load_file(str(path))
+        return lambda: sum(len(chunk) for chunk in iter_df_chunks(path))
+
+    if case in ('load_jsonl', 'iter_jsonl'):
+        path = work_dir / 'records.jsonl'
+        if not path.exists():
+            save_jsonl(path, CorpusGenerator(generator.seed).records(n_rows))
+        if case == 'load_jsonl':
+            return lambda: load_file(str(path))
+        return lambda: sum(1 for _ in iter_jsonl(path))
+
+    raise ValueError(f'未知基准: {case}')
+
+
+def run(sizes: List[int], dict_sizes: List[int], cases: List[str], repeat: int = 3, seed: int = 0,
+        log: Optional[Callable[[str], None]] = print) -> Dict:
+    '''
+    运行全部基准
+    :return: {"meta": {...}, "results": {"case/size/dict_size": {...}}}
+    '''
+    results = {}
+    # 预热：jieba 词典加载、惰性导入等一次性开销不计入各项耗时
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        generator = CorpusGenerator(seed=seed)
+        for case in cases:
+            build_case(case, generator.text(1024), generator, Path(tmp))()
+
+    for size in sizes:
+        for d_index, dict_size in enumerate(dict_sizes):
+            generator = CorpusGenerator(seed=seed, n_hospitals=dict_size)
+            text = generator.text(size)
+            n_bytes = len(text.encode('utf-8'))
+            with tempfile.TemporaryDirectory() as tmp:
+                for case in cases:
+                    if case in DICT_INDEPENDENT and d_index > 0:
+                        continue
+                    fn = build_case(case, text, generator, Path(tmp))
+                    seconds = time_best(fn, repeat)
+                    key = f'{case}/{size}/{dict_size}'
+                    results[key] = {
+                        'case': case,
+                        'size': size,
+                        'dict_size': dict_size,
+                        'seconds': round(seconds, 6),
+                        'mb_per_s': round(n_bytes / 1024 / 1024 / seconds, 3) if seconds > 0 else None,
+                    }
+                    if log:
+                        log(f'{key:<42} {seconds * 1000:>10.2f} ms  {results[key]["mb_per_s"]} MB/s')
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': seed,
+            'repeat': repeat,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.2) -> List[Dict]:
+    '''
+    与基线逐项对比
+    :param tolerance: 允许的耗时增长比例，0.2 表示慢 20% 以内不算回退
+    :return: 回退项列表 [{"key", "baseline", "current", "ratio"}]
+    '''
+    regressions = []
+    base_results = baseline.get('results', {})
+    for key, item in current.get('results', {}).items():
+        base = base_results.get(key)
+        if not base or not base.get('seconds'):
+            continue
+        ratio = item['seconds'] / base['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append({'key': key, 'baseline': base['seconds'], 'current': item['seconds'],
+                                'ratio': round(ratio, 3)})
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='SafeMed 脱敏性能基准')
+    parser.add_argument('--sizes', default='1k,100k,1m', help='文档大小列表，如 1k,100k,1m,10m')
+    parser.add_argument('--dict-sizes', default='100,10000', help='医院词典规模列表')
+    parser.add_argument('--cases', default=','.join(CASES), help='要运行的基准，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数（取最短耗时）')
+    parser.add_argument('--seed', type=int, default=0, help='语料随机种子')
+    parser.add_argument('--out', type=Path, default=None, help='结果 JSON 输出路径')
+    parser.add_argument('--baseline', type=Path, default=None, help='基线 JSON，用于检测性能回退')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的耗时增长比例')
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    cases = [c for c in args.cases.split(',') if c]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        print(f'✗ 未知基准: {", ".join(sorted(unknown))}', file=sys.stderr)
+        return 2
+
+    report = run(
+        sizes=[parse_size(s) for s in args.sizes.split(',') if s],
+        dict_sizes=[int(s) for s in args.dict_sizes.split(',') if s],
+        cases=cases,
+        repeat=args.repeat,
+        seed=args.seed,
+    )
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f'结果已写入: {args.out}')
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions = compare(report, baseline, args.tolerance)
+        for r in regressions:
+            print(f'✗ 性能回退 {r["key"]}: {r["baseline"]:.4f}s → {r["current"]:.4f}s (×{r["ratio"]})')
+        if regressions:
+            return 1
+        print(f'✓ 与基线相比无回退（容差 {args.tolerance:.0%}）')
+    return 0
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Shared pytest fixtures: de-identification engines for the test modules"""
+
+from pathlib import Path
+
+import pytest
+
+from safe_med_ui.config_store import ConfigStore
+from safe_med_ui.engine import DeidEngine
+from safe_med_ui.rule_fallback import FallbackRuleEngine
+
+REPO_ROOT = Path(__file__).resolve().parent
+
+
+@pytest.fixture
+def repo_terms():
+    """仓库自带的词典（config/custom_terms.json）"""
+    return ConfigStore(repo_root=REPO_ROOT).load_terms()
+
+
+@pytest.fixture
+def sample_config():
+    """小词表 + 常用类别开关：(custom_terms, enable_categories)，每个测试各自一份，可原地修改"""
+    return {"hospitals": ["协和医院"]}, {"id_like": True, "phone": True, "date": True, "hospital_dict": True}
+
+
+@pytest.fixture
+def make_engine(repo_terms):
+    """
+    DeidEngine 工厂：词典缺省为仓库词典，类别缺省全部关闭，不使用 native 实现
+    其余关键字参数（date_offsets、pseudonym_store 等）原样传给 DeidEngine
+    """
+    def make(custom_terms=None, enable_categories=None, **kwargs):
+        kwargs.setdefault("prefer_native_safe_med", False)
+        return DeidEngine(custom_terms=repo_terms if custom_terms is None else custom_terms,
+                          enable_categories=enable_categories or {}, **kwargs)
+    return make
+
+
+@pytest.fixture
+def make_fallback(repo_terms):
+    """FallbackRuleEngine 工厂：词典缺省为仓库词典"""
+    def make(enable_categories, custom_terms=None):
+        return FallbackRuleEngine(custom_terms=repo_terms if custom_terms is None else custom_terms,
+                                  enable_categories=enable_categories)
+    return make
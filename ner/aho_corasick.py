@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17 10:20
+# @File    : aho_corasick.py
+# @brief: 词典多模式匹配（Aho-Corasick 自动机，最左最长匹配）
+'''
+词典匹配工具
+
+- AhoCorasick：一次线性扫描找出文本中所有词典词条（最左最长、互不重叠），
+  适用于医院、科室、自定义敏感词等大词表；安装了 pyahocorasick 时自动使用其 C 实现。
+- trie_regex：把词表压缩成前缀树形式的正则片段，用于仍需嵌入正则上下文的词表
+  （如姓氏、职称），避免数百个分支的线性尝试。
+'''
+import re
+
+try:
+    import ahocorasick as _pyahocorasick  # 可选加速：pip install pyahocorasick
+except ImportError:
+    _pyahocorasick = None
+
+
+class AhoCorasick(object):
+    def __init__(self, terms=None, use_native=True):
+        '''
+
+        :param terms: 词条列表，或 {词条: 附带值} 字典；同一词条重复出现时保留先加入的值
+        :param use_native: 是否在可用时使用 pyahocorasick 加速
+        '''
+        self.values = {}
+        self.use_native = use_native and _pyahocorasick is not None
+
+        # 纯 Python 自动机：goto 转移表、失败指针、节点深度、节点可输出的最长词条
+        self._goto = [{}]
+        self._fail = [0]
+        self._depth = [0]
+        self._output = [None]
+        self._native = None
+        self._built = False
+
+        if terms:
+            items = terms.items() if isinstance(terms, dict) else ((t, t) for t in terms)
+            for term, value in items:
+                self.add(term, value)
+        self.build()
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, term):
+        return term in self.values
+
+    def add(self, term: str, value=None):
+        '''
+        添加词条（添加后需重新 build）
+        :param term:
+        :param value: 匹配时返回的附带值，默认为词条本身
+        :return:
+        '''
+        if not term or term in self.values:
+            return
+        self.values[term] = term if value is None else value
+        self._built = False
+        if self.use_native:
+            return
+
+        state = 0
+        for ch in term:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._depth.append(self._depth[state] + 1)
+                self._output.append(None)
+            state = nxt
+        self._output[state] = term
+
+    def build(self):
+        '''
+        计算失败指针（BFS），并把每个节点的输出设为“以该节点结尾的最长词条”
+        :return:
+        '''
+        if self.use_native:
+            automaton = _pyahocorasick.Automaton()
+            for term, value in self.values.items():
+                automaton.add_word(term, (len(term), value))
+            if len(automaton):
+                automaton.make_automaton()
+            self._native = automaton
+            self._built = True
+            return
+
+        queue = []
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = fail
+                if self._output[nxt] is None:
+                    # 自身不是词条时，继承后缀链上的最长词条
+                    self._output[nxt] = self._output[fail]
+        self._built = True
+
+    def finditer(self, text: str):
+        '''
+        最左最长、互不重叠地匹配词条
+        :param text:
+        :return: 迭代 (start, end, value)
+        '''
+        if not self._built:
+            self.build()
+        if not text or not self.values:
+            return
+
+        if self.use_native:
+            # pyahocorasick 的 iter_long 在文本末尾会漏掉最后一个匹配，这里取全部匹配后自行做最左最长选择
+            hits = sorted((end_index + 1 - length, -length, value)
+                          for end_index, (length, value) in self._native.iter(text))
+            last_end = 0
+            for start, neg_length, value in hits:
+                if start >= last_end:
+                    last_end = start - neg_length
+                    yield start, last_end, value
+            return
+
+        goto, fail, depth, output = self._goto, self._fail, self._depth, self._output
+        n = len(text)
+        i = 0
+        state = 0
+        pending = None  # (start, end, term)
+        while True:
+            if i >= n:
+                if pending is None:
+                    break
+                # 文本结束：输出 pending，并从其结尾继续扫描剩余部分
+                yield pending[0], pending[1], self.values[pending[2]]
+                i = pending[1]
+                state = 0
+                pending = None
+                continue
+
+            ch = text[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            i += 1
+
+            if pending is not None and i - depth[state] > pending[0]:
+                # 当前路径已不可能再覆盖 pending 的起点：pending 确定，从其结尾重新扫描
+                yield pending[0], pending[1], self.values[pending[2]]
+                i = pending[1]
+                state = 0
+                pending = None
+                continue
+
+            term = output[state]
+            if term is not None:
+                start = i - len(term)
+                if pending is None or start < pending[0] or (start == pending[0] and i > pending[1]):
+                    pending = (start, i, term)
+
+    def findall(self, text: str) -> list:
+        return list(self.finditer(text))
+
+    def replace(self, text: str, repl) -> tuple:
+        '''
+        单次扫描替换所有词条
+        :param text:
+        :param repl: 替换字符串，或 callable(value) -> str
+        :return: (替换后文本, 替换次数)
+        '''
+        pieces = []
+        last = 0
+        n = 0
+        for start, end, value in self.finditer(text):
+            pieces.append(text[last:start])
+            pieces.append(repl(value) if callable(repl) else repl)
+            last = end
+            n += 1
+        if not n:
+            return text, 0
+        pieces.append(text[last:])
+        return ''.join(pieces), n
+
+
+def trie_regex(terms) -> str:
+    '''
+    把词表编译为前缀树结构的正则片段（非捕获组），同一位置优先匹配更长的词条
+    例：['张', '欧阳', '欧'] → (?:欧阳?|张)
+    :param terms:
+    :return: 正则字符串
+    '''
+    trie = {}
+    for term in terms:
+        if not term:
+            continue
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def _to_regex(node):
+        terminal = '' in node
+        leaves = []
+        branches = []
+        for ch in sorted(k for k in node if k):
+            child = node[ch]
+            if len(child) == 1 and '' in child:
+                leaves.append(re.escape(ch))
+            else:
+                branches.append(re.escape(ch) + _to_regex(child))
+
+        # 单个字符或字符类是原子，可直接加 ? 量词
+        atom = not branches and bool(leaves)
+        if len(leaves) == 1:
+            branches.append(leaves[0])
+        elif leaves:
+            branches.append('[' + ''.join(leaves) + ']')
+
+        if len(branches) == 1 and (atom or not terminal):
+            body = branches[0]
+        else:
+            body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if terminal else body
+
+    pattern = _to_regex(trie)
+    if not pattern:
+        return '(?!)'
+    if pattern.startswith('(?:') and pattern.endswith(')'):
+        return pattern
+    return '(?:' + pattern + ')'
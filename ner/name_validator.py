@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17 16:30
+# @File    : name_validator.py
+# @brief: 姓名候选校验（jieba 词性标注 + LRU 缓存 + 批量）
+'''
+正则找出的姓名候选（如 "患者张三"、"陈佛平主治医师"）需要经过 jieba 词性标注确认包含人名（nr）。
+- 结果按候选串缓存（LRU），同一候选在整个语料中只标注一次
+- 一篇文档的所有候选去重后拼成一段文本，一次 pseg.cut 完成标注
+- jieba 在第一次真正需要标注时才加载词典；缓存可序列化到文件，下次启动直接复用
+'''
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+# 批量标注时候选之间的分隔符：jieba 按空白切分文本块，分词不会跨越分隔符
+_SEPARATOR = '\n'
+
+
+class NameValidator(object):
+    def __init__(self, maxsize: int = 100000, cache_path: Optional[str] = None):
+        '''
+        :param maxsize: 缓存的候选数上限
+        :param cache_path: 序列化缓存文件（JSON），存在时在构建时加载
+        '''
+        self.maxsize = maxsize
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self._memo: "OrderedDict[str, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pseg = None
+        if cache_path and os.path.exists(cache_path):
+            self.load_cache(cache_path)
+
+    def _posseg(self):
+        # 惰性导入 jieba：不需要校验姓名时不承担词典加载开销
+        if self._pseg is None:
+            import jieba.posseg as pseg
+            self._pseg = pseg
+        return self._pseg
+
+    def warm_up(self):
+        '''
+        预先加载 jieba 词典（如在工作进程初始化时调用）
+        :return:
+        '''
+        pseg = self._posseg()
+        pseg.dt.tokenizer.check_initialized()
+
+    def tag_many(self, words: List[str]) -> List[bool]:
+        '''
+        不经缓存，一次 pseg.cut 标注多个候选
+        :param words: 不含分隔符的候选串
+        :return: 每个候选是否含人名（nr）
+        '''
+        if not words:
+            return []
+        results = [False] * len(words)
+        # 每个候选在拼接文本中的结束位置，按位置把分词结果归回对应候选
+        ends = []
+        offset = 0
+        for word in words:
+            offset += len(word)
+            ends.append(offset)
+            offset += len(_SEPARATOR)
+
+        index = 0
+        pos = 0
+        for word, flag in self._posseg().cut(_SEPARATOR.join(words)):
+            while index < len(ends) and pos >= ends[index]:
+                index += 1
+            if flag == 'nr' and index < len(ends):
+                results[index] = True
+            pos += len(word)
+        return results
+
+    def validate_many(self, candidates: Iterable[str]) -> List[bool]:
+        '''
+        批量校验：先查缓存，未命中的候选去重后一次标注
+        :param candidates:
+        :return: 与 candidates 等长的 bool 列表
+        '''
+        candidates = list(candidates)
+        known: Dict[str, bool] = {}
+        missing = []
+        with self._lock:
+            for word in candidates:
+                if word in known:
+                    continue
+                value = self._memo.get(word)
+                if value is None:
+                    known[word] = None
+                    missing.append(word)
+                else:
+                    self._memo.move_to_end(word)
+                    known[word] = value
+            self.hits += len(candidates) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            # 含分隔符的候选无法安全拼接，单独标注
+            plain = [w for w in missing if _SEPARATOR not in w]
+            tagged = dict(zip(plain, self.tag_many(plain)))
+            for word in missing:
+                if word not in tagged:
+                    tagged[word] = self._tag_one(word)
+            known.update(tagged)
+            with self._lock:
+                for word, value in tagged.items():
+                    self._memo[word] = value
+                    self._memo.move_to_end(word)
+                while len(self._memo) > self.maxsize:
+                    self._memo.popitem(last=False)
+
+        return [known[word] for word in candidates]
+
+    def _tag_one(self, word: str) -> bool:
+        return any(flag == 'nr' for _, flag in self._posseg().cut(word))
+
+    def is_name(self, candidate: str) -> bool:
+        return self.validate_many([candidate])[0]
+
+    def load_cache(self, path: str):
+        '''
+        加载序列化缓存 {候选: bool}
+        :param path:
+        :return:
+        '''
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        with self._lock:
+            for word, value in data.items():
+                self._memo[word] = bool(value)
+            while len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+
+    def save_cache(self, path: Optional[str] = None):
+        '''
+        序列化缓存到 JSON 文件
+        :param path: 缺省时使用 cache_path
+        :return:
+        '''
+        path = path or self.cache_path
+        if not path:
+            raise ValueError('未指定缓存文件路径')
+        with self._lock:
+            data = dict(self._memo)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self._memo)
+
+
+_DEFAULT_VALIDATOR = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_name_validator() -> NameValidator:
+    '''
+    进程内共享的 NameValidator，所有 NERRules 实例共用同一份缓存
+    :return:
+    '''
+    global _DEFAULT_VALIDATOR
+    if _DEFAULT_VALIDATOR is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT_VALIDATOR is None:
+                _DEFAULT_VALIDATOR = NameValidator()
+    return _DEFAULT_VALIDATOR
@@ -22,19 +22,65 @@ ner好坏的评价指标
 12. doctor_signature - 医生签名/姓名
 13. hospital_name - 医院名称
 '''
+import json
+import os
 import re
-import jieba
-import jieba.posseg as pseg
+import threading
+from ner.aho_corasick import AhoCorasick, trie_regex
+from ner.name_validator import default_name_validator
+
+# OTHER 类实体：触发关键词 + 紧随其后的取值模式（从关键词末尾开始 match）
+# 所有关键词合并为一个前瞻正则只扫描全文一次，找出每个关键词起点（关键词互相重叠时也不遗漏，
+# 如“身份证件号”中的“证件号”），命中后仅对对应规则的取值模式做 match；
+# 新增编号类型只需追加一条规则（或通过 other_rules 配置文件），不会增加全文扫描次数
+DEFAULT_OTHER_RULES = [
+    {'name': 'meeting_no', 'keywords': ['腾讯会议号'], 'pattern': r"：[0-9]+[。,]*"},  # 示例匹配：腾讯会议号：123456、腾讯会议号：7890,
+    {'name': 'id_card', 'keywords': ['身份证', '证件号'], 'pattern': r'[：:]\s*(\d{15}|\d{17}[\dXx])'},
+    {'name': 'phone', 'keywords': ['电话', '手机', '联系方式'], 'pattern': r'[：:]\s*(1[3-9]\d{9}|\d{3,4}-\d{7,8})'},
+    {'name': 'medical_card', 'keywords': ['医疗卡', '就诊卡'], 'pattern': r'[：:]\s*(\d{8,20})'},
+    {'name': 'insurance_no', 'keywords': ['医保号', '社保号'], 'pattern': r'[：:]\s*(\d{8,20})'},
+    {'name': 'admission_no', 'keywords': ['住院号', '入院号'], 'pattern': r'[：:]\s*(\d{6,15})'},
+    {'name': 'outpatient_no', 'keywords': ['门诊号', '挂号'], 'pattern': r'[：:]\s*(\d{6,15})'},
+    {'name': 'report_no', 'keywords': ['报告号', '检查号'], 'pattern': r'[：:]\s*([A-Z0-9]{8,20})'},
+    {'name': 'bed_no', 'keywords': ['床号'], 'pattern': r'[：:]\s*([A-Z0-9]{1,5})'},
+]
+
+
+def load_other_rules(path) -> list:
+    '''
+    读取 OTHER 规则配置（JSON 列表，每项 {"name", "keywords", "pattern"}），与默认规则合并
+    同名规则覆盖默认规则，新名称追加在末尾
+    :param path: 配置文件路径，为空时返回默认规则
+    :return:
+    '''
+    rules = [dict(rule) for rule in DEFAULT_OTHER_RULES]
+    if not path:
+        return rules
+    with open(path, 'r', encoding='utf-8') as f:
+        extra = json.load(f)
+    index = {rule['name']: i for i, rule in enumerate(rules)}
+    for rule in extra:
+        if not rule.get('name') or not rule.get('keywords') or not rule.get('pattern'):
+            raise ValueError(f'OTHER 规则缺少 name/keywords/pattern: {rule}')
+        if rule['name'] in index:
+            rules[index[rule['name']]] = dict(rule)
+        else:
+            index[rule['name']] = len(rules)
+            rules.append(dict(rule))
+    return rules
 
 
 class NERRules(object):
-    def __init__(self, titles_path, common_surnames_path, hospitals_path, hospital_suffixes_path):
+    def __init__(self, titles_path, common_surnames_path, hospitals_path, hospital_suffixes_path,
+                 name_validator=None, other_rules=None):
         '''
 
         :param titles_path:
         :param common_surnames_path:
         :param locations_path:
         :param location_suffixes_path:
+        :param name_validator: 姓名候选校验器（NameValidator），缺省时使用进程内共享的实例
+        :param other_rules: OTHER 类规则列表（见 DEFAULT_OTHER_RULES），缺省时使用默认规则
         '''
 
         self.titles = self.load_dict(dict_path=titles_path)
@@ -42,6 +88,16 @@ class NERRules(object):
         self.hospitals = self.load_dict(dict_path=hospitals_path)
         self.hospital_suffixes = self.load_dict(dict_path=hospital_suffixes_path)
 
+        # 正则编译次数，构建完成后在 extract_* 调用过程中应保持不变
+        self.compile_count = 0
+        self.patterns = self.build_patterns()
+        self.other_rules = other_rules if other_rules is not None else DEFAULT_OTHER_RULES
+        self.other_trigger, self.other_values = self.build_other_scanner(self.other_rules)
+        # 医院全称词典：Aho-Corasick 一次线性扫描，词表规模增大时不再拖慢正则
+        self.hospital_matcher = AhoCorasick(self.hospitals)
+        # 姓名候选的词性校验：带缓存、按文档批量标注
+        self.name_validator = name_validator or default_name_validator()
+
         self.entity_types = {'AGE': self.extract_age,
                              'DATE': self.extract_date,
                              'NAME': self.extract_name,
@@ -61,15 +117,76 @@ class NERRules(object):
 
         return line_list
 
-    def get_matches(self, entity_type: str, pattern: str, text: str) -> list:
+    def compile(self, pattern: str):
+        '''
+        编译正则并计数
+        :param pattern:
+        :return: re.Pattern
+        '''
+        self.compile_count += 1
+        return re.compile(pattern)
+
+    def build_patterns(self) -> dict:
+        '''
+        构建所有 extract_* 使用的正则，并一次性编译
+        :return: {模式名: re.Pattern}
+        '''
+        # 姓氏、职称、医疗机构后缀词表压缩为前缀树正则，避免数百个分支逐一尝试
+        surnames = trie_regex(self.common_surnames)
+        titles = trie_regex(self.titles)
+        hospital_suffixes = trie_regex(self.hospital_suffixes)
+        # 构建姓氏正则部分；姓名模式：姓 + 名（1~2个汉字）
+        name_pattern = surnames + r"[\u4e00-\u9fa5]{1,2}"
+
+        pattern_strings = {
+            # 日期时间格式（如 2025-10-01 或 2025-10-01 12:30）
+            'date': r"(\d{4})[-.]\d{1,2}[-.]\d{1,2}(?:[ Tt]?\d{1,2}:\d{1,2}(?::\d{1,2})?)?",
+            'date_cn': r"(\d{4})年\d{1,2}月\d{1,2}日(?:[ Tt]?\d{1,2}:\d{1,2}(?::\d{1,2})?)?",
+            # 年龄（如 30岁）
+            'age': r"\b(\d{1,3})岁\b",
+            # 医护人员：姓 + 名 + 职称
+            'doctor_title': r"(" + surnames + r")\s*([\u4e00-\u9fa5]{1,2})\s*(" + titles + ")",
+            # 医护人员：签名
+            'doctor_signature': r"(?:医生|医师|签名)[：:]\s*(" + surnames + r")\s*([\u4e00-\u9fa5]{1,2})",
+            # 患者姓名：含提示词的完整匹配
+            'name': r"(?:姓名|患者|病人|就诊人|家属)[:：\s]*(" + name_pattern + ")",
+            # 医院：“1~10个汉字 + 医疗机构后缀”（医院全称由 hospital_matcher 匹配）
+            'hospital': r"([\u4e00-\u9fa5]{1,10}\s*" + hospital_suffixes + ")",
+            'hospital_floor': r"([一二三四五六七八九十]+(层|楼|诊室)|\d+(层|楼|诊室))",
+            # 地点
+            'location': r'(?:住址|地址|居住地)[：:]\s*([^，,。\n]{10,50})',
+        }
+        return {name: self.compile(pattern) for name, pattern in pattern_strings.items()}
+
+    def build_other_scanner(self, rules: list) -> tuple:
+        '''
+        构建 OTHER 类实体的组合扫描器
+        触发正则是零宽前瞻，finditer 会在每个可能的关键词起点各命中一次，重叠的关键词互不吞并
+        :param rules: [{"name", "keywords", "pattern"}]
+        :return: (触发关键词正则, {关键词首字: [(规则序号, 关键词, 取值正则)]})，同一首字下按规则及关键词顺序排列
+        '''
+        values = {}
+        keywords = []
+        for index, rule in enumerate(rules):
+            value_pattern = self.compile(rule['pattern'])
+            for keyword in rule['keywords']:
+                values.setdefault(keyword[0], []).append((index, keyword, value_pattern))
+                keywords.append(keyword)
+        trigger = self.compile('(?=' + trie_regex(keywords) + ')') if values else None
+        return trigger, values
+
+    def get_matches(self, entity_type: str, pattern, text: str) -> list:
         '''
         匹配命名实体
         :param entity_type:
+        :param pattern: 预编译的 re.Pattern；传入字符串时会临时编译（计入 compile_count）
         :param text:
         :return:
         '''
+        if isinstance(pattern, str):
+            pattern = self.compile(pattern)
         match_list = []
-        matches = re.finditer(pattern, text)
+        matches = pattern.finditer(text)
         for match in matches:
             (start, end) = match.span()
             word = match.group()
@@ -83,6 +200,21 @@ class NERRules(object):
 
         return match_list
 
+    @staticmethod
+    def leftmost_longest(match_list: list) -> list:
+        '''
+        多来源匹配结果去重叠：起点靠前优先，起点相同取更长者
+        :param match_list:
+        :return:
+        '''
+        res_list = []
+        last_end = -1
+        for match in sorted(match_list, key=lambda m: (m["start"], -m["end"])):
+            if match["start"] >= last_end:
+                res_list.append(match)
+                last_end = match["end"]
+        return res_list
+
     def extract_date(self, entity_type: str, text: str) -> list:
         '''
         匹配日期时间格式（如 2025-10-01 或 2025-10-01 12:30）
@@ -92,12 +224,10 @@ class NERRules(object):
         '''
 
         res_list = []
-        pattern = r"(\d{4})[-.]\d{1,2}[-.]\d{1,2}(?:[ Tt]?\d{1,2}:\d{1,2}(?::\d{1,2})?)?"
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
+        matches = self.get_matches(entity_type=entity_type, pattern=self.patterns['date'], text=text)
         res_list.extend(matches)
 
-        pattern = r"(\d{4})年\d{1,2}月\d{1,2}日(?:[ Tt]?\d{1,2}:\d{1,2}(?::\d{1,2})?)?"
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
+        matches = self.get_matches(entity_type=entity_type, pattern=self.patterns['date_cn'], text=text)
         res_list.extend(matches)
 
         return res_list
@@ -111,8 +241,7 @@ class NERRules(object):
         '''
 
         res_list = []
-        pattern = r"\b(\d{1,3})岁\b"
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
+        matches = self.get_matches(entity_type=entity_type, pattern=self.patterns['age'], text=text)
         res_list.extend(matches)
         return res_list
 
@@ -124,18 +253,12 @@ class NERRules(object):
         :return:
         '''
         res_list = []
-        # 医院常见职称列表（可根据实际医院扩展）
-        pattern = r"(" + '|'.join(self.common_surnames) + r")\s*([\u4e00-\u9fa5]{1,2})\s*(" + "|".join(
-            self.titles) + ")"
-        #
-        # pattern = r"(" + '|'.join(
-        #     self.common_surnames) + r")\s*(" + "|".join(self.titles) + ")"
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        for match in matches:
+        matches = self.get_matches(entity_type=entity_type, pattern=self.patterns['doctor_title'], text=text)
+        # 所有候选一次批量校验是否含人名（“nr”表示人名）
+        is_names = self.name_validator.validate_many(match.get("text", "") for match in matches)
+        for match, is_name in zip(matches, is_names):
             word = match.get("text", "")
-            words = pseg.cut(word)
-            candidates = [word for word, flag in words if flag in ["nr"]]  # “nr”表示人名
-            if not candidates:
+            if not is_name:
                 print(f"skip doctor candidates:{word}")
                 continue
 
@@ -147,9 +270,7 @@ class NERRules(object):
 
         # res_list.extend(matches)
 
-        pattern = r"(?:医生|医师|签名)[：:]\s*(" + '|'.join(
-            self.common_surnames) + r")\s*([\u4e00-\u9fa5]{1,2})"
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
+        matches = self.get_matches(entity_type=entity_type, pattern=self.patterns['doctor_signature'], text=text)
 
         res_list.extend(matches)
 
@@ -166,21 +287,12 @@ class NERRules(object):
         res_list = []
         # *****姓名*****
         # 完整的姓名正则表达式：匹配单字姓氏和复姓，并跟随1或2个汉字作为名字
-        # 构建姓氏正则部分
-        surname_pattern = "(?:" + "|".join(self.common_surnames) + ")"
-
-        # 姓名模式：姓 + 名（1~2个汉字）
-        name_pattern = surname_pattern + r"[\u4e00-\u9fa5]{1,2}"
-
-        # 含提示词的完整匹配
-        pattern = r"(?:姓名|患者|病人|就诊人|家属)[:：\s]*(" + name_pattern + ")"
-
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        for match in matches:
+        matches = self.get_matches(entity_type=entity_type, pattern=self.patterns['name'], text=text)
+        # 所有候选一次批量校验是否含人名（“nr”表示人名）
+        is_names = self.name_validator.validate_many(match.get("text", "") for match in matches)
+        for match, is_name in zip(matches, is_names):
             word = match.get("text", "")
-            words = pseg.cut(word)
-            candidates = [word for word, flag in words if flag in ["nr"]]  # “nr”表示人名
-            if not candidates:
+            if not is_name:
                 print(f"skip name candidates :{word}")
                 continue
 
@@ -202,16 +314,11 @@ class NERRules(object):
         '''
         res_list = []
 
-        # 完全匹配
-        # pattern = r"(" + "|".join(self.hospitals) + ")"
-        # matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        # res_list.extend(matches)
-
-        pattern = r"(" + "|".join(self.hospitals) + r"|[\u4e00-\u9fa5]{1,10}\s*(?:" + "|".join(
-            self.hospital_suffixes) + r"))"
-
-        # pattern = r"([\u4e00-\u9fa5]{1,10}\s*" + "|".join(self.hospital_suffixes) + ")"
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
+        # 词典全称与后缀规则的结果合并，按最左最长保留互不重叠的匹配
+        matches = [{"start": start, "end": end, "entity_type": entity_type, "text": word}
+                   for start, end, word in self.hospital_matcher.finditer(text)]
+        matches.extend(self.get_matches(entity_type=entity_type, pattern=self.patterns['hospital'], text=text))
+        matches = self.leftmost_longest(matches)
 
         # 后处理
         for match in matches:
@@ -224,8 +331,7 @@ class NERRules(object):
 
         # res_list.extend(matches)
 
-        pattern = r"([一二三四五六七八九十]+(层|楼|诊室)|\d+(层|楼|诊室))"
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
+        matches = self.get_matches(entity_type=entity_type, pattern=self.patterns['hospital_floor'], text=text)
         res_list.extend(matches)
 
         return res_list
@@ -239,55 +345,43 @@ class NERRules(object):
         '''
         res_list = []
 
-        pattern = r'(?:住址|地址|居住地)[：:]\s*([^，,。\n]{10,50})'
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
+        matches = self.get_matches(entity_type=entity_type, pattern=self.patterns['location'], text=text)
         res_list.extend(matches)
 
         return res_list
 
     def extract_other(self, entity_type: str, text: str) -> list:
         '''
-        其他
+        其他：住院号、身份证号、电话等“关键词 + 编号”类实体
+        一次扫描找出所有触发关键词（含相互重叠的关键词），只在命中位置对相应规则的取值模式做 match
         :param entity_type: OTHER
         :param text:
         :return:
         '''
-        res_list = []
-        pattern = r"腾讯会议号：[0-9]+[。,]*"  # 示例匹配：腾讯会议号：123456、腾讯会议号：7890,
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        res_list.extend(matches)
-
-        pattern = r'(?:身份证|证件号)[：:]\s*(\d{15}|\d{17}[\dXx])'
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        res_list.extend(matches)
-
-        pattern = r'(?:电话|手机|联系方式)[：:]\s*(1[3-9]\d{9}|\d{3,4}-\d{7,8})'
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        res_list.extend(matches)
-
-        pattern = r'(?:医疗卡|就诊卡)[：:]\s*(\d{8,20})'
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        res_list.extend(matches)
-
-        pattern = r'(?:医保号|社保号)[：:]\s*(\d{8,20})'
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        res_list.extend(matches)
-
-        pattern = r'(?:住院号|入院号)[：:]\s*(\d{6,15})'
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        res_list.extend(matches)
-
-        pattern = r'(?:门诊号|挂号)[：:]\s*(\d{6,15})'
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        res_list.extend(matches)
-
-        pattern = r'(?:报告号|检查号)[：:]\s*([A-Z0-9]{8,20})'
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        res_list.extend(matches)
-        pattern = r'(?:床号)[：:]\s*([A-Z0-9]{1,5})'
-        matches = self.get_matches(entity_type=entity_type, pattern=pattern, text=text)
-        res_list.extend(matches)
+        if self.other_trigger is None:
+            return []
+        hits = []
+        for trigger in self.other_trigger.finditer(text):
+            start = trigger.start()
+            matched = set()
+            for index, keyword, value_pattern in self.other_values[text[start]]:
+                # 同一规则在同一起点只取第一个能匹配的关键词，与 (?:关键词1|关键词2)取值 的正则语义一致
+                if index in matched or not text.startswith(keyword, start):
+                    continue
+                match = value_pattern.match(text, start + len(keyword))
+                if match:
+                    matched.add(index)
+                    hits.append((index, start, match.end()))
 
+        # 与逐条规则扫描时的结果一致：按规则顺序，再按位置；同一规则的结果互不重叠
+        hits.sort(key=lambda hit: (hit[0], hit[1]))
+        res_list = []
+        last_index, last_end = None, 0
+        for index, start, end in hits:
+            if index == last_index and start < last_end:
+                continue
+            last_index, last_end = index, end
+            res_list.append({"start": start, "end": end, "entity_type": entity_type, "text": text[start:end]})
         return res_list
 
     def extract_entities(self, content):
@@ -298,6 +392,66 @@ class NERRules(object):
         return res_list
 
 
+# 进程级 NERRules 缓存：{词典路径元组: (词典文件签名, NERRules实例)}
+_RULES_CACHE = {}
+_RULES_LOCK = threading.Lock()
+
+
+def _dict_signature(paths) -> tuple:
+    '''
+    词典文件签名（mtime + 文件大小），任一词典变化即触发重建
+    :param paths: 词典路径元组
+    :return:
+    '''
+    signature = []
+    for path in paths:
+        st = os.stat(path)
+        signature.append((st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def get_ner_rules(titles_path, common_surnames_path, hospitals_path, hospital_suffixes_path,
+                  other_rules_path=None) -> NERRules:
+    '''
+    获取共享的 NERRules 实例
+    同一组词典只加载、构建一次；词典文件发生变化（mtime/大小）时重新构建。
+    返回的实例在多次调用间共享，调用方只读使用，不要修改其词表属性。
+    :param titles_path:
+    :param common_surnames_path:
+    :param hospitals_path:
+    :param hospital_suffixes_path:
+    :param other_rules_path: 可选的 OTHER 规则配置（JSON），见 load_other_rules
+    :return: NERRules
+    '''
+    paths = tuple(os.path.abspath(p) for p in
+                  (titles_path, common_surnames_path, hospitals_path, hospital_suffixes_path))
+    if other_rules_path:
+        paths += (os.path.abspath(other_rules_path),)
+    signature = _dict_signature(paths)
+
+    cached = _RULES_CACHE.get(paths)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with _RULES_LOCK:
+        # 双重检查：等待锁期间可能已被其他线程构建
+        cached = _RULES_CACHE.get(paths)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        ner_rules = NERRules(*paths[:4], other_rules=load_other_rules(other_rules_path))
+        _RULES_CACHE[paths] = (signature, ner_rules)
+        return ner_rules
+
+
+def clear_ner_rules_cache():
+    '''
+    清空 NERRules 缓存（词典在同一 mtime 精度内被改写时可手动调用）
+    :return:
+    '''
+    with _RULES_LOCK:
+        _RULES_CACHE.clear()
+
+
 if __name__ == '__main__':
     # 输入文本
     test1 = """
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17 11:05
+# @File    : spans.py
+# @brief: 基于片段（span）的单次改写
+'''
+所有检测器都针对原文输出 Span(start, end, entity_type, replacement, priority)，
+统一解决重叠后一次拼接得到脱敏文本，代价与文本长度线性相关，与实体数量无关。
+'''
+from typing import Iterable, List, NamedTuple, Tuple
+
+
+class Span(NamedTuple):
+    start: int
+    end: int
+    entity_type: str
+    replacement: str
+    priority: int = 0
+
+
+def resolve_overlaps(spans: Iterable[Span], length: int = None) -> List[Span]:
+    '''
+    解决片段重叠：优先级高者优先，同优先级时更长者优先，仍相同则先检测到者优先
+    :param spans:
+    :param length: 原文长度（缺省时取片段最大终点）
+    :return: 互不重叠、按起点排序的片段列表
+    '''
+    spans = [s for s in spans if s.end > s.start]
+    if not spans:
+        return []
+    if length is None:
+        length = max(s.end for s in spans)
+
+    # 逐字符占用表：检查、标记的代价只与片段长度相关
+    occupied = bytearray(length)
+    accepted = []
+    for span in sorted(spans, key=lambda s: (-s.priority, s.start - s.end)):
+        if occupied.find(1, span.start, span.end) != -1:
+            continue
+        occupied[span.start:span.end] = b'\x01' * (span.end - span.start)
+        accepted.append(span)
+
+    accepted.sort(key=lambda s: s.start)
+    return accepted
+
+
+def apply_spans(text: str, spans: Iterable[Span]) -> Tuple[str, List[Span]]:
+    '''
+    解决重叠后一次拼接改写文本
+    :param text: 原文
+    :param spans: 针对原文的候选片段
+    :return: (改写后文本, 实际生效的片段)
+    '''
+    accepted = resolve_overlaps(spans, length=len(text))
+    if not accepted:
+        return text, accepted
+
+    pieces = []
+    last = 0
+    for span in accepted:
+        pieces.append(text[last:span.start])
+        pieces.append(span.replacement)
+        last = span.end
+    pieces.append(text[last:])
+    return ''.join(pieces), accepted
@@ -1,4 +1,10 @@
-from safe_med_ui.main import main
+import sys
 
 if __name__ == "__main__":
+    if "--profile-startup" in sys.argv[1:]:
+        # 只测量界面模块的导入耗时，不创建窗口
+        from safe_med_ui.startup import print_startup_report
+        sys.exit(print_startup_report("safe_med_ui.ui_app"))
+
+    from safe_med_ui.main import main
     main()
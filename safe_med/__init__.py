@@ -0,0 +1,3 @@
+"""
+SafeMed 命令行入口：python -m safe_med
+"""
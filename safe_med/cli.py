@@ -0,0 +1,106 @@
+"""
+无界面批量脱敏命令行
+
+用法：
+    python -m safe_med 输入目录 输出目录 [--config 配置目录] [--workers N]
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from safe_med_ui.batch import load_job, run_batch
+from safe_med_ui.manifest import MANIFEST_NAME
+from safe_med_ui.scanner import ScanFilter
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m safe_med", description="SafeMed 医学文本批量脱敏")
+    parser.add_argument("input_dir", type=Path, nargs="?", help="输入目录（递归扫描 txt/docx/csv/xlsx/json/jsonl）")
+    parser.add_argument("output_dir", type=Path, nargs="?", help="输出目录（保留输入目录的相对结构）")
+    parser.add_argument("--config", type=Path, default=None,
+                        help="配置目录，包含 custom_terms.json 和 app_settings.json（默认项目 config/）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="并行工作进程数（默认 CPU 核数，1 表示单进程）")
+    parser.add_argument("--chunksize", type=int, default=4, help="每次分发给工作进程的文件数")
+    parser.add_argument("--io-threads", type=int, default=4,
+                        help="单进程（--workers 1）流水线中读取线程和写出线程各自的数量")
+    parser.add_argument("--flush-rows", type=int, default=1000, help="jsonl 流式写出时每批写盘的行数")
+    parser.add_argument("--chunk-rows", type=int, default=10000, help="csv/xlsx 分块读取时每块的行数")
+    parser.add_argument("--pseudonym-db", default=None,
+                        help="ID 映射的 SQLite 文件，多次运行、多个进程共享同一映射（默认取配置中的 pseudonym_db）")
+    parser.add_argument("--patient-column", default=None,
+                        help="患者 ID 列/字段名，配合 date_shift_key 按患者偏移日期（默认取配置中的 patient_id_column）")
+    parser.add_argument("--manifest", type=Path, default=None,
+                        help=f"增量处理清单（SQLite），已处理且未变化的文件再次运行时跳过（默认 输出目录/{MANIFEST_NAME}）")
+    parser.add_argument("--no-manifest", action="store_true", help="不使用清单，每次处理全部文件")
+    parser.add_argument("--force", action="store_true", help="忽略清单重新处理全部文件（处理结果仍写入清单）")
+    parser.add_argument("--include", action="append", default=[], metavar="PATTERN",
+                        help="只处理相对路径匹配该通配符的文件（可多次指定），如 --include '*.docx'")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                        help="跳过相对路径匹配该通配符的文件或目录（可多次指定），如 --exclude 'archive'")
+    parser.add_argument("--max-size-mb", type=float, default=None, help="跳过大于该大小（MB）的文件")
+    parser.add_argument("--no-native", action="store_true", help="不尝试调用 safe_med 原生脱敏入口，只用规则引擎")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不逐个打印文件进度")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="在新进程中测量命令行启动（导入 + 构建引擎）各包的导入耗时后退出")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.profile_startup:
+        from safe_med_ui.startup import print_startup_report
+        config = repr(str(args.config)) if args.config else "None"
+        return print_startup_report("safe_med.cli", f"from safe_med_ui.batch import load_job\n"
+                                                    f"load_job('.', '.', config_dir={config}).build_engine()")
+    if args.input_dir is None or args.output_dir is None:
+        parser.error("需要指定输入目录和输出目录")
+    if not args.input_dir.is_dir():
+        print(f"✗ 输入目录不存在: {args.input_dir}", file=sys.stderr)
+        return 2
+
+    manifest_path = None if args.no_manifest else str(args.manifest or args.output_dir / MANIFEST_NAME)
+    job = load_job(args.input_dir, args.output_dir, config_dir=args.config,
+                   prefer_native_safe_med=not args.no_native, flush_rows=args.flush_rows,
+                   chunksize=args.chunk_rows, pseudonym_db=args.pseudonym_db,
+                   patient_column=args.patient_column, manifest_path=manifest_path,
+                   scan_filter=ScanFilter(
+                       include=args.include, exclude=args.exclude,
+                       max_size=int(args.max_size_mb * 1024 * 1024) if args.max_size_mb is not None else None,
+                   ))
+
+    if job.prefer_native_safe_med and job.native_entry_point:
+        # 配置的入口无法加载时在主进程直接报错，而不是在每个工作进程里初始化失败
+        from safe_med_ui.safe_med_adapter import SafeMedAdapter
+        try:
+            SafeMedAdapter(entry_point=job.native_entry_point).discover()
+        except RuntimeError as e:
+            print(f"✗ {e}（可在配置中删除 native_entry_point 或使用 --no-native）", file=sys.stderr)
+            return 2
+
+    def progress(done, total, result):
+        if args.quiet:
+            return
+        mark = "✗" if result.error else "✓"
+        detail = result.error or f"{sum(result.stats.values())} 处替换"
+        if result.rows and not result.error:
+            detail += f" | {result.rows} 行, {result.rows_per_sec:.0f} 行/s"
+        print(f"[{done}/{total}] {mark} {result.rel_path} | {detail}")
+
+    summary = run_batch(job, workers=args.workers, chunksize=args.chunksize, progress=progress, force=args.force,
+                        io_threads=args.io_threads)
+
+    skipped = f"，未变化跳过 {summary.skipped} 个" if summary.skipped else ""
+    print(f"完成：{summary.succeeded}/{summary.files} 个文件，失败 {summary.failed} 个{skipped}，"
+          f"耗时 {summary.seconds:.2f}s，输出目录: {args.output_dir}")
+    if summary.stats:
+        print("脱敏统计 | " + " | ".join(f"{k}:{v}" for k, v in sorted(summary.stats.items())))
+    if summary.pipeline is not None and summary.succeeded + summary.failed:
+        peak = summary.pipeline.max_depth
+        print(f"流水线 | 队列峰值 读取:{peak['read']} 脱敏:{peak['process']} 写出:{peak['write']}"
+              f"（容量 {summary.pipeline.queue_size}）| 瓶颈阶段: {summary.pipeline.bottleneck()}")
+    for result in summary.errors:
+        print(f"  ✗ {result.rel_path}: {result.error}", file=sys.stderr)
+    return 1 if summary.failed else 0
@@ -0,0 +1,583 @@
+"""
+无界面批量脱敏
+- 复用 io_utils 的扫描/加载/保存，输出保留输入目录的相对结构（与界面批量导出一致）
+- 多进程并行：每个工作进程只构建一次 DeidEngine，按文件分发任务
+- 单进程时走 读取 → 脱敏 → 写出 线程流水线（pipeline.py），磁盘/网络等待与脱敏重叠
+"""
+import dataclasses
+import glob
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from anonymizers.date_offset import DateOffsetTable, key_fingerprint
+from anonymizers.pseudonym_store import open_store
+
+from .columns import deidentify_dataframe, engine_deidentify, patient_shift_days
+from .config_store import ConfigStore
+from .docx_rewrite import deidentify_document, deidentify_docx, load_document
+from .engine import DeidEngine, config_fingerprint
+from .io_utils import (
+    LoadedData, detect_kind, load_file, get_relative_path,
+    iter_jsonl, JsonlWriter, iter_df_chunks, TableWriter,
+    save_text, save_docx, save_df, save_json, save_jsonl,
+)
+from .manifest import Manifest, ManifestEntry, file_sha256
+from .pipeline import Pipeline, PipelineMetrics
+from .scanner import ScanFilter, iter_file_batches
+
+
+def merge_stats(total: Dict[str, int], stats: Dict[str, int]) -> Dict[str, int]:
+    for k, v in stats.items():
+        total[k] = total.get(k, 0) + v
+    return total
+
+
+def _collect_strings(node: Any, strings: List[str]) -> None:
+    if isinstance(node, str):
+        strings.append(node)
+    elif isinstance(node, dict):
+        for v in node.values():
+            _collect_strings(v, strings)
+    elif isinstance(node, list):
+        for v in node:
+            _collect_strings(v, strings)
+
+
+def _fill_strings(node: Any, outputs: Iterator[str]) -> Any:
+    """按 _collect_strings 的顺序把脱敏结果填回，保持原有结构"""
+    if isinstance(node, str):
+        return next(outputs)
+    if isinstance(node, dict):
+        return {k: _fill_strings(v, outputs) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_fill_strings(v, outputs) for v in node]
+    return node
+
+
+def deidentify_json(obj: Any, engine: DeidEngine, shift_days: Optional[int] = None) -> Tuple[Any, Dict[str, int]]:
+    """
+    脱敏 JSON 对象中的所有字符串（一次 deidentify_many 调用），保持原有结构
+    shift_days: 日期偏移天数（按患者），缺省为引擎默认值
+    return: (脱敏后的对象, stats)
+    """
+    strings: List[str] = []
+    _collect_strings(obj, strings)
+    outputs, stats = engine.deidentify_many(strings, shift_days=shift_days)
+    return _fill_strings(obj, iter(outputs)), stats
+
+
+def deidentify_json_rows(rows: List[Any], engine: DeidEngine,
+                         patient_column: Optional[str] = None) -> Tuple[List[Any], Dict[str, int]]:
+    """
+    脱敏一批 jsonl 行：所有行中的字符串一次交给 deidentify_many，各自按所在行的患者偏移日期
+    return: (脱敏后的行, stats)
+    """
+    strings: List[str] = []
+    shifts: List[Optional[int]] = []
+    for row in rows:
+        start = len(strings)
+        _collect_strings(row, strings)
+        shifts.extend([row_shift_days(row, engine, patient_column)] * (len(strings) - start))
+    outputs, stats = engine.deidentify_many(strings, shift_days=shifts)
+    outputs = iter(outputs)
+    return [_fill_strings(row, outputs) for row in rows], stats
+
+
+def row_shift_days(row: Any, engine: DeidEngine, patient_column: Optional[str]) -> Optional[int]:
+    """jsonl 单行的日期偏移天数：行中有患者 ID 字段且引擎配置了偏移量表时按患者取，否则为 None（引擎默认）"""
+    if not patient_column or engine.date_offsets is None or not isinstance(row, dict) or patient_column not in row:
+        return None
+    return engine.date_offsets.offset_for(row[patient_column])
+
+
+def table_shift_days(df, engine: DeidEngine, patient_column: Optional[str]):
+    """表格的日期偏移：有患者 ID 列时为逐行天数，否则为引擎的统一天数"""
+    if patient_column and patient_column in df.columns:
+        return patient_shift_days(df[patient_column], engine.date_offsets, engine.date_shift_days)
+    return engine.date_shift_days
+
+
+def deidentify_loaded(loaded: LoadedData, engine: DeidEngine,
+                      patient_column: Optional[str] = None) -> Tuple[str, Any, Dict[str, int]]:
+    """
+    对已加载的文件脱敏
+    patient_column: 患者 ID 字段/列名，存在时按患者偏移日期（需引擎配置 date_offsets）
+    return: (输出类型, 输出内容, stats)，输出类型与 save_output 对应
+    """
+    stats: Dict[str, int] = {}
+
+    if loaded.kind == "text":
+        out, s, _ = engine.deidentify_text(loaded.text)
+        return "text", out, merge_stats(stats, s)
+
+    if loaded.kind == "docx":
+        # 原位改写（正文、表格、页眉页脚），所有段落一次调用引擎；未预先解析时重新打开原文档
+        doc = loaded.docx_doc if loaded.docx_doc is not None else load_document(loaded.path)
+        _, s = deidentify_document(doc, engine)
+        return "docx", doc, merge_stats(stats, s)
+
+    if loaded.kind == "df" and loaded.json_obj is not None:
+        obj, s = deidentify_json(loaded.json_obj, engine)
+        return "json", obj, merge_stats(stats, s)
+
+    if loaded.kind == "df":
+        df, s = deidentify_dataframe(loaded.df, engine_deidentify(engine), use_roles=False,
+                                     date_shift_days=table_shift_days(loaded.df, engine, patient_column))
+        return "df", df, merge_stats(stats, s)
+
+    if loaded.kind == "jsonl":
+        rows, s = deidentify_json_rows(loaded.jsonl_rows, engine, patient_column)
+        return "jsonl", rows, merge_stats(stats, s)
+
+    raise ValueError(f"不支持的类型: {loaded.kind}")
+
+
+def save_output(out_path: Path, kind: str, content: Any) -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if kind == "text":
+        save_text(out_path, content)
+    elif kind == "docx":
+        save_docx(out_path, content)
+    elif kind == "df":
+        save_df(out_path, content)
+    elif kind == "json":
+        save_json(out_path, content)
+    elif kind == "jsonl":
+        save_jsonl(out_path, content)
+    else:
+        raise ValueError(f"不支持写出类型: {kind}")
+
+
+@dataclass
+class StreamResult:
+    rows: int = 0
+    seconds: float = 0.0
+    stats: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def deidentify_jsonl_stream(in_path: Path, out_path: Path, engine: DeidEngine, flush_rows: int = 1000,
+                            progress=None, progress_every: int = 10000,
+                            patient_column: Optional[str] = None) -> StreamResult:
+    """
+    流式脱敏 jsonl：逐行读取，每 flush_rows 行一批脱敏（一次 deidentify_many）并写出
+    峰值内存只与单行大小和 flush_rows 有关，与文件大小无关
+    progress: 可选回调 progress(StreamResult)，每处理约 progress_every 行调用一次（在批边界上）
+    patient_column: 患者 ID 字段名，存在时按患者偏移日期
+    """
+    result = StreamResult()
+    t0 = time.perf_counter()
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    batch: List[Any] = []
+    reported = 0
+
+    def flush_batch():
+        nonlocal reported
+        new_rows, s = deidentify_json_rows(batch, engine, patient_column)
+        for new_row in new_rows:
+            writer.write(new_row)
+        merge_stats(result.stats, s)
+        result.rows += len(batch)
+        batch.clear()
+        if progress and result.rows // progress_every > reported:
+            reported = result.rows // progress_every
+            result.seconds = time.perf_counter() - t0
+            progress(result)
+
+    with JsonlWriter(out_path, flush_rows=flush_rows) as writer:
+        for row in iter_jsonl(in_path):
+            batch.append(row)
+            if len(batch) >= flush_rows:
+                flush_batch()
+        if batch:
+            flush_batch()
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+def deidentify_table_stream(in_path: Path, out_path: Path, engine: DeidEngine,
+                            chunksize: int = 10000, patient_column: Optional[str] = None) -> StreamResult:
+    """
+    分块脱敏 csv/xlsx：每块按列去重后脱敏，再追加写出
+    峰值内存只与 chunksize 有关，与文件大小无关
+    patient_column: 患者 ID 列名，存在时按患者偏移日期（每块对患者 ID 去重后一次查偏移量表）
+    """
+    result = StreamResult()
+    t0 = time.perf_counter()
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    deidentify = engine_deidentify(engine)
+    with TableWriter(out_path) as writer:
+        for chunk in iter_df_chunks(in_path, chunksize=chunksize):
+            df, s = deidentify_dataframe(chunk, deidentify, use_roles=False,
+                                         date_shift_days=table_shift_days(chunk, engine, patient_column))
+            writer.write(df)
+            merge_stats(result.stats, s)
+            result.rows += len(df)
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+# 按块流式读写的表格类型（xls 不支持分块读取，整体加载）
+STREAMED_TABLE_EXTS = {".csv", ".xlsx"}
+
+
+def is_streamed(file_path: Path) -> bool:
+    """jsonl/csv/xlsx 边读边脱敏边写，读取和写出不能与脱敏拆开"""
+    return detect_kind(file_path) == "jsonl" or file_path.suffix.lower() in STREAMED_TABLE_EXTS
+
+
+def read_input(file_path: Path) -> LoadedData:
+    """整体加载文件；docx 直接解析为 Document 供原位改写（不另外提取段落文本）"""
+    if detect_kind(file_path) == "docx":
+        return LoadedData(kind="docx", path=file_path, docx_doc=load_document(file_path))
+    return load_file(str(file_path))
+
+
+def process_file(file_path: Path, input_base: Path, output_base: Path, engine: DeidEngine,
+                 flush_rows: int = 1000, chunksize: int = 10000,
+                 patient_column: Optional[str] = None) -> Tuple[Dict[str, int], int]:
+    """
+    加载 → 脱敏 → 写出单个文件，输出路径 = output_base / 相对路径
+    jsonl 逐行、csv/xlsx 分块流式处理，不整体载入内存；docx 原位改写，保留格式
+    return: (stats, 处理的行数；文本/docx/json 为 0)
+    """
+    rel_path = get_relative_path(file_path, input_base)
+    out_path = output_base / rel_path
+    if detect_kind(file_path) == "jsonl":
+        result = deidentify_jsonl_stream(file_path, out_path, engine, flush_rows=flush_rows,
+                                         patient_column=patient_column)
+        return result.stats, result.rows
+    if file_path.suffix.lower() in STREAMED_TABLE_EXTS:
+        result = deidentify_table_stream(file_path, out_path, engine, chunksize=chunksize,
+                                         patient_column=patient_column)
+        return result.stats, result.rows
+    if detect_kind(file_path) == "docx":
+        return deidentify_docx(file_path, out_path, engine), 0
+    loaded = load_file(str(file_path))
+    kind, content, stats = deidentify_loaded(loaded, engine, patient_column)
+    save_output(out_path, kind, content)
+    return stats, 0
+
+
+def run_file_pipeline(file_paths: Iterable[Path], input_base: Path, output_base: Path, engine: DeidEngine,
+                      flush_rows: int = 1000, chunksize: int = 10000, patient_column: Optional[str] = None,
+                      record_state: bool = False, readers: int = 4, workers: int = 2, writers: int = 2,
+                      queue_size: int = 16, metrics: Optional[PipelineMetrics] = None) -> Iterator["FileResult"]:
+    """
+    流水线版 process_file：读取线程（load_file / Document 解析）→ 脱敏线程（engine）→ 写出线程（save_*），
+    段间为有界队列，读写等待期间脱敏不停顿
+    jsonl/csv/xlsx 本身已是分块流式处理，整个文件在脱敏阶段完成
+    record_state: 读取阶段同时记录处理前的大小/修改时间/内容哈希（写入增量清单用）
+    metrics: 传入时记录队列深度、各段耗时
+    按完成顺序产出 FileResult
+    """
+    def read(file_path: Path):
+        size = mtime_ns = None
+        sha256 = ""
+        if record_state:
+            st = os.stat(file_path)
+            size, mtime_ns, sha256 = st.st_size, st.st_mtime_ns, file_sha256(file_path)
+        loaded = None if is_streamed(file_path) else read_input(file_path)
+        return (size, mtime_ns, sha256), loaded
+
+    def process(file_path: Path, read_out):
+        state, loaded = read_out
+        if loaded is None:
+            stats, rows = process_file(file_path, input_base, output_base, engine, flush_rows=flush_rows,
+                                       chunksize=chunksize, patient_column=patient_column)
+            return state, None, stats, rows
+        kind, content, stats = deidentify_loaded(loaded, engine, patient_column)
+        return state, (kind, content), stats, 0
+
+    def write(file_path: Path, processed) -> FileResult:
+        (size, mtime_ns, sha256), output, stats, rows = processed
+        rel_path = get_relative_path(file_path, input_base)
+        if output is not None:
+            save_output(output_base / rel_path, *output)
+        return FileResult(rel_path, stats=stats, rows=rows, size=size, mtime_ns=mtime_ns, sha256=sha256)
+
+    pipeline = Pipeline(read, process, write, readers=readers, workers=workers, writers=writers,
+                        queue_size=queue_size)
+    for res in pipeline.run(file_paths, metrics):
+        if res.error:
+            yield FileResult(get_relative_path(res.item, input_base), error=res.error, seconds=res.seconds)
+        else:
+            res.value.seconds = res.seconds
+            yield res.value
+
+
+def output_fingerprint(custom_terms: Dict[str, List[str]], enable_categories: Dict[str, bool],
+                       replacement_mode: str = "tag", prefer_native_safe_med: bool = True,
+                       native_entry_point: Optional[str] = None, date_shift_key: Optional[str] = None,
+                       patient_column: Optional[str] = None) -> str:
+    """
+    增量处理清单中记录的配置指纹，命令行（BatchJob）与界面共用，
+    同一输出目录交替使用两者时，配置相同的文件不会重复处理
+    date_shift_key 只以不可逆指纹参与计算
+    """
+    return config_fingerprint(
+        custom_terms, enable_categories,
+        replacement_mode=replacement_mode,
+        prefer_native_safe_med=prefer_native_safe_med,
+        native_entry_point=native_entry_point,
+        date_shift_key=key_fingerprint(date_shift_key) if date_shift_key else None,
+        patient_column=patient_column,
+    )
+
+
+@dataclass
+class BatchJob:
+    """工作进程所需的全部参数（需可 pickle）"""
+    input_base: Path
+    output_base: Path
+    custom_terms: Dict[str, List[str]]
+    enable_categories: Dict[str, bool]
+    replacement_mode: str = "tag"
+    prefer_native_safe_med: bool = True
+    flush_rows: int = 1000  # jsonl 流式写出的批大小
+    chunksize: int = 10000  # csv/xlsx 分块读取的行数
+    pseudonym_db: Optional[str] = None  # ID 映射的 SQLite 文件，各工作进程共享；为空时每个进程各自在内存中映射
+    date_shift_key: Optional[str] = None  # 按患者偏移日期的 HMAC 密钥；为空时所有日期统一偏移
+    patient_column: Optional[str] = None  # 患者 ID 列/字段名（csv/xlsx/jsonl）
+    native_entry_point: Optional[str] = None  # native 脱敏入口 "模块:函数"，None 时自动扫描
+    manifest_path: Optional[str] = None  # 增量处理清单（SQLite），为空时每次处理全部文件
+    scan_filter: Optional[ScanFilter] = None  # 扫描输入目录时的 include/exclude 通配符和大小限制
+
+    def build_engine(self) -> DeidEngine:
+        store = open_store(self.pseudonym_db)
+        return DeidEngine(
+            custom_terms=self.custom_terms,
+            enable_categories=self.enable_categories,
+            replacement_mode=self.replacement_mode,
+            prefer_native_safe_med=self.prefer_native_safe_med,
+            native_entry_point=self.native_entry_point,
+            pseudonym_store=store,
+            # 偏移量表与 ID 映射共用同一存储（按 namespace 区分），配置 pseudonym_db 时落盘
+            date_offsets=DateOffsetTable(self.date_shift_key, store=store) if self.date_shift_key else None,
+        )
+
+    def fingerprint(self) -> str:
+        """影响输出内容的配置指纹：变化后清单中的记录失效，文件重新处理"""
+        return output_fingerprint(
+            self.custom_terms, self.enable_categories,
+            replacement_mode=self.replacement_mode,
+            prefer_native_safe_med=self.prefer_native_safe_med,
+            native_entry_point=self.native_entry_point,
+            date_shift_key=self.date_shift_key,
+            patient_column=self.patient_column,
+        )
+
+
+@dataclass
+class FileResult:
+    rel_path: str
+    stats: Dict[str, int] = field(default_factory=dict)
+    error: str = ""
+    seconds: float = 0.0
+    rows: int = 0  # jsonl/csv/xlsx 行数
+    # 处理前输入文件的状态，写入增量清单（未启用清单时为空）
+    size: Optional[int] = None
+    mtime_ns: Optional[int] = None
+    sha256: str = ""
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class BatchSummary:
+    files: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0  # 清单中记录为未变化而跳过的文件
+    seconds: float = 0.0
+    stats: Dict[str, int] = field(default_factory=dict)
+    errors: List[FileResult] = field(default_factory=list)
+    pipeline: Optional[PipelineMetrics] = None  # 单进程流水线的队列深度/各段耗时
+
+
+# 工作进程内的全局状态：每个进程只构建一次引擎
+_worker_job: Optional[BatchJob] = None
+_worker_engine: Optional[DeidEngine] = None
+
+
+def _init_worker(job: BatchJob) -> None:
+    global _worker_job, _worker_engine
+    _worker_job = job
+    _worker_engine = job.build_engine()
+
+
+def _run_one(file_path: Path) -> FileResult:
+    rel_path = get_relative_path(file_path, _worker_job.input_base)
+    t0 = time.perf_counter()
+    size = mtime_ns = None
+    sha256 = ""
+    try:
+        if _worker_job.manifest_path:
+            # 记录处理前的状态：处理期间文件被改动时，下次运行会重新处理
+            st = os.stat(file_path)
+            size, mtime_ns, sha256 = st.st_size, st.st_mtime_ns, file_sha256(file_path)
+        stats, rows = process_file(file_path, _worker_job.input_base, _worker_job.output_base, _worker_engine,
+                                   flush_rows=_worker_job.flush_rows, chunksize=_worker_job.chunksize,
+                                   patient_column=_worker_job.patient_column)
+        return FileResult(rel_path, stats=stats, seconds=time.perf_counter() - t0, rows=rows,
+                          size=size, mtime_ns=mtime_ns, sha256=sha256)
+    except Exception as e:
+        return FileResult(rel_path, error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - t0)
+
+
+def load_job(input_dir: Path, output_dir: Path, config_dir: Optional[Path] = None,
+             prefer_native_safe_med: bool = True, flush_rows: int = 1000,
+             chunksize: int = 10000, pseudonym_db: Optional[str] = None,
+             patient_column: Optional[str] = None, manifest_path: Optional[str] = None,
+             scan_filter: Optional[ScanFilter] = None) -> BatchJob:
+    """
+    从配置目录（custom_terms.json / app_settings.json）构建批处理参数
+    pseudonym_db: 缺省时取 app_settings.json 中的 pseudonym_db
+    patient_column: 缺省时取 app_settings.json 中的 patient_id_column
+    manifest_path: 增量处理清单文件，为空时不跳过任何文件（命令行默认为 输出目录/.safe_med_manifest.db）
+    日期偏移密钥取 app_settings.json 中的 date_shift_key，或环境变量 SAFE_MED_DATE_KEY
+    """
+    repo_root = Path(__file__).resolve().parents[1]
+    store = ConfigStore(repo_root, config_dir=config_dir)
+    settings = store.load_settings() or {}
+    return BatchJob(
+        input_base=Path(input_dir),
+        output_base=Path(output_dir),
+        custom_terms=store.load_terms(),
+        enable_categories=dict(settings.get("enable_categories", {})),
+        replacement_mode=settings.get("replacement_mode", "tag"),
+        prefer_native_safe_med=prefer_native_safe_med,
+        flush_rows=flush_rows,
+        chunksize=chunksize,
+        pseudonym_db=pseudonym_db or settings.get("pseudonym_db"),
+        date_shift_key=settings.get("date_shift_key") or os.environ.get("SAFE_MED_DATE_KEY"),
+        patient_column=patient_column or settings.get("patient_id_column"),
+        native_entry_point=settings.get("native_entry_point"),
+        manifest_path=manifest_path,
+        scan_filter=scan_filter,
+    )
+
+
+def scan_filter_for(job: BatchJob) -> ScanFilter:
+    """
+    扫描输入目录用的过滤条件：输出目录位于输入目录之内时整个排除，
+    否则边扫描边写出时刚写出的结果会被再次扫描到并脱敏（out/out/...）
+    """
+    flt = job.scan_filter or ScanFilter()
+    try:
+        rel = Path(job.output_base).resolve().relative_to(Path(job.input_base).resolve())
+    except ValueError:
+        return flt
+    if not rel.parts:
+        # 输出目录即输入目录：原位覆盖，每个相对路径仍只扫描到一次
+        return flt
+    return dataclasses.replace(flt, exclude=[*flt.exclude, glob.escape(rel.as_posix())])
+
+
+def _run_many(file_paths: List[Path]) -> List[FileResult]:
+    return [_run_one(file_path) for file_path in file_paths]
+
+
+def run_batch(job: BatchJob, workers: Optional[int] = None, chunksize: int = 4,
+              progress=None, force: bool = False, io_threads: int = 4) -> BatchSummary:
+    """
+    并行处理 job.input_base 下的所有文本类文件；边扫描边处理，不等整棵目录树扫描完
+    workers: 进程数，默认 CPU 核数；为 1 时在当前进程内用线程流水线处理
+    io_threads: 单进程流水线中读取线程和写出线程各自的数量
+    chunksize: 每次分发给工作进程的文件数
+    progress: 可选回调 progress(done, total, FileResult)，total 为目前已发现且需要处理的文件数（扫描期间会增长）
+    force: 配置了清单时仍重新处理全部文件（并更新清单）
+    """
+    t0 = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    summary = BatchSummary()
+    manifest = Manifest(job.manifest_path) if job.manifest_path else None
+    fingerprint = job.fingerprint() if manifest is not None else ""
+    done = 0
+
+    def out_path_of(rel_path: str) -> Path:
+        return job.output_base / rel_path
+
+    def pending_files():
+        for batch in iter_file_batches(job.input_base, scan_filter_for(job)):
+            summary.files += len(batch)
+            for file_path in batch:
+                if manifest is not None and not force:
+                    rel_path = get_relative_path(file_path, job.input_base)
+                    if manifest.is_current(rel_path, file_path, fingerprint, out_path_of(rel_path)):
+                        summary.skipped += 1
+                        continue
+                yield file_path
+
+    def collect(result: FileResult):
+        nonlocal done
+        done += 1
+        if result.error:
+            summary.failed += 1
+            summary.errors.append(result)
+        else:
+            summary.succeeded += 1
+            merge_stats(summary.stats, result.stats)
+            if manifest is not None:
+                # 每个文件完成后立即提交，中途崩溃后重新运行从未完成的文件继续
+                manifest.record(ManifestEntry(
+                    rel_path=result.rel_path, size=result.size, mtime_ns=result.mtime_ns, sha256=result.sha256,
+                    config=fingerprint, output=str(out_path_of(result.rel_path)), stats=result.stats,
+                    rows=result.rows))
+        if progress:
+            progress(done, summary.files - summary.skipped, result)
+
+    try:
+        if workers <= 1:
+            summary.pipeline = PipelineMetrics()
+            engine = job.build_engine()
+            for result in run_file_pipeline(pending_files(), job.input_base, job.output_base, engine,
+                                            flush_rows=job.flush_rows, chunksize=job.chunksize,
+                                            patient_column=job.patient_column,
+                                            record_state=manifest is not None, readers=io_threads,
+                                            writers=io_threads, metrics=summary.pipeline):
+                collect(result)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(job,)) as pool:
+                # 扫描到的文件按 chunksize 分组提交；在途任务数有上限，百万级文件不会一次性排队
+                in_flight = set()
+                chunk: List[Path] = []
+
+                def submit(paths: List[Path]):
+                    nonlocal in_flight
+                    in_flight.add(pool.submit(_run_many, paths))
+                    if len(in_flight) >= workers * 4:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            for result in future.result():
+                                collect(result)
+
+                for file_path in pending_files():
+                    chunk.append(file_path)
+                    if len(chunk) >= chunksize:
+                        submit(chunk)
+                        chunk = []
+                if chunk:
+                    submit(chunk)
+                while in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        for result in future.result():
+                            collect(result)
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    summary.seconds = time.perf_counter() - t0
+    return summary
@@ -0,0 +1,217 @@
+"""
+表格按列脱敏
+- 列角色（姓名/年龄/自由文本）按列名只判断一次，不再逐单元格重复关键词检查
+- 每列只对去重后的取值调用引擎，再按 factorize 编码映射回整列（ID、姓名列重复度很高）
+- 上下文标签的添加/还原用 pandas 字符串向量化操作完成
+- 整格是日期的值（如就诊日期列）用 NumPy 批量偏移，不再逐个调用引擎
+pandas / NumPy 在第一次按列脱敏时才导入，界面和命令行启动时不加载
+"""
+import numbers
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from anonymizers.date_anonymizer import shift_dates
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 列名包含这些关键词时按姓名列处理：值前补 "姓名：" 以触发姓名规则，脱敏后去掉
+NAME_COLUMN_KEYWORDS = ["姓名", "患者名", "医生", "护士", "联系人"]
+# 列名包含这些关键词时按年龄列处理：纯数字补 "岁" 以触发年龄规则，脱敏后只保留区间
+AGE_COLUMN_KEYWORDS = ["年龄", "age"]
+
+ROLE_NAME = "name"
+ROLE_AGE = "age"
+ROLE_TEXT = "text"
+
+NAME_HINT = "姓名："
+
+# text -> (脱敏后文本, stats)；按患者偏移日期时另以关键字参数 shift_days 调用
+DeidentifyFn = Callable[..., Tuple[str, Dict[str, int]]]
+# 日期偏移：统一天数，或与行等长的逐行天数（按患者）
+ShiftDays = Optional[Union[int, Sequence[int]]]
+
+
+def column_role(col: str) -> str:
+    """根据列名判断列角色：name | age | text"""
+    col = str(col)
+    if any(kw in col for kw in NAME_COLUMN_KEYWORDS):
+        return ROLE_NAME
+    if any(kw in col for kw in AGE_COLUMN_KEYWORDS):
+        return ROLE_AGE
+    return ROLE_TEXT
+
+
+def _add_hint(values: "pd.Series", role: str) -> "pd.Series":
+    if role == ROLE_NAME:
+        return NAME_HINT + values
+    if role == ROLE_AGE:
+        return values.where(~values.str.isdigit(), values + "岁")
+    return values
+
+
+def _strip_hint(values: "pd.Series", role: str) -> "pd.Series":
+    if role == ROLE_NAME:
+        return values.str.replace(NAME_HINT, "", regex=False)
+    if role == ROLE_AGE:
+        # 年龄脱敏后为 "XX～YY岁"，只保留区间
+        rng = values.str.extract(r"(\d+)～(\d+)岁")
+        hit = rng[0].notna()
+        return values.where(~hit, rng[0] + "～" + rng[1])
+    return values
+
+
+def _is_per_row(date_shift_days) -> bool:
+    return date_shift_days is not None and not isinstance(date_shift_days, numbers.Integral)
+
+
+def deidentify_column(values: "pd.Series", deidentify: DeidentifyFn, role: str = ROLE_TEXT,
+                      date_shift_days: ShiftDays = None) -> Tuple["pd.Series", Dict[str, int]]:
+    """
+    脱敏一整列：去重 → 只对唯一值调用 deidentify → 映射回原列
+    stats 按出现次数计数，与逐单元格处理的统计一致
+    date_shift_days: 不为 None 时，整格是日期的唯一值直接批量偏移（结果与规则引擎一致），其余值仍交给 deidentify；
+                     为与 values 等长的序列时按行偏移（按患者），此时按 (取值, 偏移) 去重，
+                     并以 deidentify(text, shift_days=偏移) 调用
+    """
+    import numpy as np
+    import pandas as pd
+
+    texts = values.astype(str)
+    per_row = _is_per_row(date_shift_days)
+    if per_row:
+        shifts = np.asarray(date_shift_days, dtype=np.int64)
+        keys = texts + "\x1f" + pd.Series(shifts, index=values.index).astype(str)
+        codes, _ = pd.factorize(keys, sort=False)
+        # factorize 按首次出现的顺序编码，各编码首次出现的位置即对应的 (取值, 偏移)
+        _, first = np.unique(codes, return_index=True)
+        uniques = texts.to_numpy(dtype=object)[first]
+        unique_shifts = shifts[first]
+    else:
+        codes, uniques = pd.factorize(texts, sort=False)
+        uniques = np.asarray(uniques, dtype=object)
+        unique_shifts = date_shift_days
+    if len(uniques) == 0:
+        return texts, {}
+    counts = np.bincount(codes, minlength=len(uniques))
+
+    dates = shift_dates(uniques, unique_shifts) if date_shift_days is not None else [None] * len(uniques)
+    inputs = _add_hint(pd.Series(uniques, dtype=object), role)
+    outputs = list(inputs)
+    stats: Dict[str, int] = {}
+    pending = []  # 需要交给引擎的唯一值下标
+    for i, text in enumerate(inputs):
+        if dates[i] is not None:
+            outputs[i] = dates[i]
+            stats["date"] = stats.get("date", 0) + int(counts[i])
+        elif text:
+            pending.append(i)
+
+    many = getattr(deidentify, "many", None)
+    if many is not None and pending:
+        # 引擎批量接口：统计按出现次数加权
+        new_texts, s = many([inputs[i] for i in pending],
+                            shift_days=[int(unique_shifts[i]) for i in pending] if per_row else None,
+                            weights=[int(counts[i]) for i in pending])
+        for i, out in zip(pending, new_texts):
+            outputs[i] = out
+        for k, v in s.items():
+            stats[k] = stats.get(k, 0) + v
+    else:
+        for i in pending:
+            out, s = deidentify(inputs[i], shift_days=int(unique_shifts[i])) if per_row else deidentify(inputs[i])
+            outputs[i] = out
+            for k, v in s.items():
+                stats[k] = stats.get(k, 0) + v * int(counts[i])
+
+    outputs = _strip_hint(pd.Series(outputs, dtype=object), role).to_numpy(dtype=object)
+    return pd.Series(outputs[codes], index=values.index, name=values.name, dtype=object), stats
+
+
+def deidentify_dataframe(df: "pd.DataFrame", deidentify: DeidentifyFn, columns: Optional[Iterable[str]] = None,
+                         use_roles: bool = True,
+                         date_shift_days: ShiftDays = None) -> Tuple["pd.DataFrame", Dict[str, int]]:
+    """
+    按列脱敏 DataFrame（返回副本）
+    columns: 需要处理的列，默认全部列；不存在的列忽略
+    use_roles: 是否按列名识别姓名/年龄列并补充上下文标签
+    date_shift_days: 日期批量偏移天数，通常取 engine.date_shift_days；为 None 时日期也交给 deidentify；
+                     按患者偏移时为与 df 行数相同的逐行天数（见 patient_shift_days）
+    """
+    df = df.copy()
+    stats: Dict[str, int] = {}
+    for col in (df.columns if columns is None else columns):
+        if col not in df.columns:
+            continue
+        role = column_role(col) if use_roles else ROLE_TEXT
+        df[col], s = deidentify_column(df[col], deidentify, role, date_shift_days)
+        for k, v in s.items():
+            stats[k] = stats.get(k, 0) + v
+    return df, stats
+
+
+def deidentify_records(rows: List[Any], deidentify: DeidentifyFn, use_roles: bool = True,
+                       date_shift_days: ShiftDays = None) -> Tuple[List[Any], Dict[str, int]]:
+    """
+    按字段脱敏一批 JSONL 记录：同一字段在整批记录中去重后处理
+    与 DataFrame 不同，记录中缺失的字段不会被补齐；非对象行中的字符串直接脱敏，其它类型原样保留
+    date_shift_days: 同 deidentify_dataframe，逐行天数与 rows 等长
+    """
+    import pandas as pd
+
+    per_row = _is_per_row(date_shift_days)
+    out: List[Any] = list(rows)
+    stats: Dict[str, int] = {}
+    positions: Dict[str, List[int]] = {}
+    for i, row in enumerate(rows):
+        if isinstance(row, dict):
+            out[i] = dict(row)
+            for key in row:
+                positions.setdefault(key, []).append(i)
+        elif isinstance(row, str):
+            out[i], s = deidentify(row, shift_days=int(date_shift_days[i])) if per_row else deidentify(row)
+            for k, v in s.items():
+                stats[k] = stats.get(k, 0) + v
+
+    for key, idx in positions.items():
+        role = column_role(key) if use_roles else ROLE_TEXT
+        values = pd.Series([rows[i][key] for i in idx], dtype=object)
+        shifts = [date_shift_days[i] for i in idx] if per_row else date_shift_days
+        new_values, s = deidentify_column(values, deidentify, role, shifts)
+        for i, v in zip(idx, new_values):
+            out[i][key] = v
+        for k, v in s.items():
+            stats[k] = stats.get(k, 0) + v
+    return out, stats
+
+
+def patient_shift_days(patient_ids: Iterable, date_offsets, default: Optional[int]) -> ShiftDays:
+    """
+    按患者 ID 取逐行的日期偏移天数
+    date_offsets: DateOffsetTable；为 None 或 default 为 None（日期类别未启用/native 后端）时返回 default
+    """
+    if date_offsets is None or default is None:
+        return default
+    return date_offsets.offsets_for(patient_ids)
+
+
+class EngineDeidentify(object):
+    """
+    把 DeidEngine.deidentify_text 适配为 DeidentifyFn（丢弃后端名）
+    另提供 many()：列中去重后的取值一次交给 DeidEngine.deidentify_many
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __call__(self, text: str, shift_days: Optional[int] = None) -> Tuple[str, Dict[str, int]]:
+        out, stats, _ = self.engine.deidentify_text(text, shift_days)
+        return out, stats
+
+    def many(self, texts: Sequence[str], shift_days: ShiftDays = None,
+             weights: Optional[Sequence[int]] = None) -> Tuple[List[str], Dict[str, int]]:
+        outputs, stats = self.engine.deidentify_many(texts, shift_days=shift_days, weights=weights)
+        return list(outputs), stats
+
+
+def engine_deidentify(engine) -> DeidentifyFn:
+    return EngineDeidentify(engine)
@@ -1,7 +1,7 @@
 import json
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 
 def _read_json(path: Path, default: Any):
@@ -20,12 +20,15 @@ def _write_json(path: Path, obj: Any):
 @dataclass
 class ConfigStore:
     repo_root: Path
+    config_dir: Optional[Path] = None  # 默认 repo_root/config
     terms_path: Path = field(init=False)
     settings_path: Path = field(init=False)
 
     def __post_init__(self):
-        self.terms_path = self.repo_root / "config" / "custom_terms.json"
-        self.settings_path = self.repo_root / "config" / "app_settings.json"
+        if self.config_dir is None:
+            self.config_dir = self.repo_root / "config"
+        self.terms_path = self.config_dir / "custom_terms.json"
+        self.settings_path = self.config_dir / "app_settings.json"
 
     def load_terms(self) -> Dict[str, List[str]]:
         return _read_json(self.terms_path, default={})
@@ -0,0 +1,155 @@
+"""
+DOCX 原位脱敏（保留格式）
+- 遍历正文段落、表格单元格（含嵌套表格）、各节的页眉页脚，按文档顺序收集所有文本段落
+- 所有段落用分隔符拼成一段文本，一次调用引擎完成脱敏，再按分隔符拆回各段
+- 脱敏结果按字符对齐写回原有的 run：未改动的字符保留原 run 的格式，
+  跨 run 的实体（如姓名一半加粗）替换文本写入实体起点所在的 run，其余 run 中的部分删除
+python-docx 在第一次处理 DOCX 时才导入
+"""
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    from docx.document import Document as DocxDocument
+    from docx.text.paragraph import Paragraph
+    from docx.text.run import Run
+
+# 段落之间的分隔符：XML 1.0 不允许出现该控制字符，文档文本中不会出现；也不属于 \s / \w，不会被规则跨段匹配
+SEPARATOR = "\x07"
+
+
+def load_document(path: Path) -> "DocxDocument":
+    from docx import Document
+    return Document(str(path))
+
+
+def _iter_block_paragraphs(container, seen: set) -> Iterator["Paragraph"]:
+    """按文档顺序遍历容器（正文/单元格/页眉页脚）中的段落，递归进入表格"""
+    from docx.table import Table
+
+    for block in container.iter_inner_content():
+        if isinstance(block, Table):
+            for row in block.rows:
+                for cell in row.cells:
+                    # 合并单元格在 row.cells 中重复出现，只处理一次
+                    if id(cell._tc) in seen:
+                        continue
+                    seen.add(id(cell._tc))
+                    yield from _iter_block_paragraphs(cell, seen)
+        else:
+            yield block
+
+
+def iter_paragraphs(doc: "DocxDocument") -> Iterator["Paragraph"]:
+    """
+    正文（含表格）→ 各节页眉页脚 的全部段落
+    与上一节链接的页眉页脚与上一节共用同一部分，跳过以免重复处理
+    """
+    seen: set = set()
+    yield from _iter_block_paragraphs(doc, seen)
+    for section in doc.sections:
+        for part in (section.header, section.first_page_header, section.even_page_header,
+                     section.footer, section.first_page_footer, section.even_page_footer):
+            if part.is_linked_to_previous:
+                continue
+            yield from _iter_block_paragraphs(part, seen)
+
+
+def paragraph_runs(paragraph: "Paragraph") -> List["Run"]:
+    """段落中的全部 run（含超链接内的 run），按顺序"""
+    from docx.text.hyperlink import Hyperlink
+
+    runs = []
+    for item in paragraph.iter_inner_content():
+        if isinstance(item, Hyperlink):
+            runs.extend(item.runs)
+        else:
+            runs.append(item)
+    return runs
+
+
+def paragraph_texts(doc: "DocxDocument") -> List[str]:
+    """文档中全部段落的文本（与 iter_paragraphs 顺序一致）"""
+    return ["".join(run.text for run in paragraph_runs(p)) for p in iter_paragraphs(doc)]
+
+
+def rewrite_runs(runs: List["Run"], new_text: str) -> None:
+    """
+    把段落的新文本写回各 run：按字符对齐原文与新文本，相同的字符留在原 run，
+    替换/插入的文本归入改动起点所在的 run
+    """
+    texts = [run.text for run in runs]
+    old_text = "".join(texts)
+    if old_text == new_text or not runs:
+        return
+    if len(runs) == 1:
+        runs[0].text = new_text
+        return
+
+    owner = [i for i, t in enumerate(texts) for _ in t]  # 原文每个字符所属的 run
+    pieces: List[List[str]] = [[] for _ in runs]
+    matcher = SequenceMatcher(None, old_text, new_text, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for k in range(i1, i2):
+                pieces[owner[k]].append(old_text[k])
+        elif j2 > j1:
+            # 纯插入时归入前一个字符所在的 run
+            target = owner[i1] if i1 < i2 else (owner[i1 - 1] if i1 > 0 else 0)
+            pieces[target].append(new_text[j1:j2])
+
+    for run, old, piece in zip(runs, texts, pieces):
+        text = "".join(piece)
+        if text != old:
+            run.text = text
+
+
+def deidentify_texts(texts: List[str], engine: Any) -> Tuple[List[str], Dict[str, int]]:
+    """
+    一次引擎调用脱敏多段文本（空白段落不参与）
+    后端改动了分隔符导致段数对不上时，退回逐段调用
+    return: (与 texts 等长的脱敏结果, stats)
+    """
+    out = list(texts)
+    indices = [i for i, t in enumerate(texts) if t.strip()]
+    if not indices:
+        return out, {}
+
+    joined, stats, _ = engine.deidentify_text(SEPARATOR.join(texts[i] for i in indices))
+    parts = joined.split(SEPARATOR)
+    if len(parts) != len(indices):
+        stats = {}
+        parts = []
+        for i in indices:
+            text, s, _ = engine.deidentify_text(texts[i])
+            parts.append(text)
+            for k, v in s.items():
+                stats[k] = stats.get(k, 0) + v
+    for i, text in zip(indices, parts):
+        out[i] = text
+    return out, stats
+
+
+def deidentify_document(doc: "DocxDocument", engine: Any) -> Tuple[List[str], Dict[str, int]]:
+    """
+    原位脱敏整个文档（正文、表格、页眉页脚），格式保持不变
+    engine: 提供 deidentify_text(text) -> (text, stats, backend) 的引擎（DeidEngine）
+    return: (脱敏后的段落文本列表, stats)
+    """
+    runs = [paragraph_runs(p) for p in iter_paragraphs(doc)]
+    texts = ["".join(run.text for run in rs) for rs in runs]
+    new_texts, stats = deidentify_texts(texts, engine)
+    for rs, old, new in zip(runs, texts, new_texts):
+        if old != new:
+            rewrite_runs(rs, new)
+    return new_texts, stats
+
+
+def deidentify_docx(in_path: Path, out_path: Path, engine: Any) -> Dict[str, int]:
+    """读取 → 原位脱敏 → 另存为 out_path"""
+    doc = load_document(in_path)
+    _, stats = deidentify_document(doc, engine)
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(out_path))
+    return stats
@@ -1,8 +1,35 @@
+import copy
+import hashlib
+import itertools
+import json
+import numbers
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Tuple, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from anonymizers.date_offset import DateOffsetTable
+from anonymizers.pseudonym_store import MemoryStore, PseudonymStore
 
 from .safe_med_adapter import SafeMedAdapter
-from .rule_fallback import FallbackRuleEngine
+from .rule_fallback import DATE_SHIFT_DAYS, FallbackRuleEngine
+
+BACKENDS = ("thread", "process")
+
+
+class DeidStats(dict):
+    """类别 → 替换次数；多段文本的统计累加到同一个对象"""
+
+    def add(self, stats: Dict[str, int], weight: int = 1) -> "DeidStats":
+        """weight: 该段文本代表的条数（如去重后的取值按出现次数计）"""
+        for k, v in stats.items():
+            self[k] = self.get(k, 0) + v * weight
+        return self
+
+    @property
+    def total(self) -> int:
+        return sum(self.values())
 
 
 @dataclass
@@ -11,17 +38,37 @@ class DeidEngine:
     enable_categories: Dict[str, bool]
     replacement_mode: str = "tag"
     prefer_native_safe_med: bool = True
+    pseudonym_store: Optional[PseudonymStore] = None  # 共享/持久化的ID映射，缺省时每个引擎各自一份
+    shift_days: int = DATE_SHIFT_DAYS  # 默认日期偏移天数
+    date_offsets: Optional[DateOffsetTable] = None  # 按患者的日期偏移量表，配置了患者ID列时使用
+    native_entry_point: Optional[str] = None  # native 入口 "模块:函数"；None 自动扫描，"" 不使用
 
     def __post_init__(self):
-        self.adapter = SafeMedAdapter().discover()
+        # 发现结果在进程内缓存；不优先 native 时不扫描、不导入任何模块
+        if self.prefer_native_safe_med:
+            self.adapter = SafeMedAdapter(entry_point=self.native_entry_point).discover()
+        else:
+            self.adapter = SafeMedAdapter()
         self.fallback = FallbackRuleEngine(
             custom_terms=self.custom_terms,
             enable_categories=self.enable_categories,
             replacement_mode=self.replacement_mode,
+            hash_mapping=self.pseudonym_store,
+            shift_days=self.shift_days,
         )
 
-    def deidentify_text(self, text: str) -> Tuple[str, Dict[str, int], str]:
+    @property
+    def date_shift_days(self) -> Optional[int]:
         """
+        可按列批量偏移日期时的偏移天数；native 后端可能有自己的日期规则，此时为 None
+        """
+        if self.prefer_native_safe_med and self.adapter.found:
+            return None
+        return self.fallback.date_shift_days
+
+    def deidentify_text(self, text: str, shift_days: Optional[int] = None) -> Tuple[str, Dict[str, int], str]:
+        """
+        shift_days: 本段文本的日期偏移天数（按患者），缺省为 self.shift_days；native 后端不支持时忽略
         return: (text_out, stats, backend_name)
         """
         if self.prefer_native_safe_med and self.adapter.found:
@@ -37,5 +84,164 @@ class DeidEngine:
                 # native 调用失败则回退
                 pass
 
-        out, stats = self.fallback.deidentify(text)
+        out, stats = self.fallback.deidentify(text, shift_days)
         return out, stats, "fallback_rules"
+
+    def deidentify_many(self, texts: Iterable[str], workers: int = 1, chunk_size: int = 256,
+                        backend: str = "thread", shift_days: Union[None, int, Sequence[Optional[int]]] = None,
+                        weights: Optional[Iterable[int]] = None) -> Tuple[Iterator[str], DeidStats]:
+        """
+        批量脱敏：按 chunk_size 条分块交给 workers 个线程/进程，按输入顺序产出结果
+        texts 按需读取（在途分块数有上限），可以是生成器
+        shift_days: 统一的日期偏移天数，或与 texts 等长的逐条天数（按患者；其中 None 为引擎默认）
+        weights: 与 texts 等长的统计权重，缺省每条计 1
+        backend: "thread" 各线程共用本引擎和映射存储（native 后端、SQLite 映射等释放 GIL 的场景）；
+                 "process" 每个进程按本引擎的配置构建一次引擎（纯规则引擎 CPU 密集时）。ID 代码由哈希确定，
+                 各进程结果一致；配置了 SQLite 映射存储时各进程写入同一文件，内存映射则各进程各自一份
+        return: (脱敏结果迭代器, 合计统计)；统计随迭代累加，迭代结束后为全部文本的合计
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"不支持的后端: {backend}（可选 {', '.join(BACKENDS)}）")
+        stats = DeidStats()
+        return self._iter_many(texts, workers, max(chunk_size, 1), backend, shift_days, weights, stats), stats
+
+    def _iter_many(self, texts, workers, chunk_size, backend, shift_days, weights, stats: DeidStats) -> Iterator[str]:
+        per_item = shift_days is not None and not isinstance(shift_days, numbers.Integral)
+        items = zip(texts, iter(shift_days) if per_item else itertools.repeat(shift_days))
+        chunks = iter(lambda: list(itertools.islice(items, chunk_size)), [])
+        weights = iter(weights) if weights is not None else itertools.repeat(1)
+
+        if workers <= 1:
+            results: Iterator[List[Tuple[str, Dict[str, int]]]] = (_deidentify_chunk(self, chunk) for chunk in chunks)
+            for chunk_out in results:
+                for out, s in chunk_out:
+                    stats.add(s, next(weights))
+                    yield out
+            return
+
+        if backend == "process":
+            pool: Executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_many_worker,
+                                                 initargs=(self._spawn_kwargs(),))
+            fn: Callable = _deidentify_chunk_in_worker
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deid")
+            fn = lambda chunk: _deidentify_chunk(self, chunk)
+        with pool:
+            for chunk_out in _ordered_map(pool, fn, chunks, window=workers * 2):
+                for out, s in chunk_out:
+                    stats.add(s, next(weights))
+                    yield out
+
+    def _spawn_kwargs(self) -> Dict[str, Any]:
+        """在其它进程中重建同配置引擎的参数；进程内的内存映射不能共享，不传递"""
+        return dict(
+            custom_terms=self.custom_terms,
+            enable_categories=self.enable_categories,
+            replacement_mode=self.replacement_mode,
+            prefer_native_safe_med=self.prefer_native_safe_med,
+            shift_days=self.shift_days,
+            native_entry_point=self.native_entry_point,
+            pseudonym_store=None if isinstance(self.pseudonym_store, (MemoryStore, type(None))) else self.pseudonym_store,
+        )
+
+
+def _deidentify_chunk(engine: DeidEngine, chunk: List[Tuple[str, Optional[int]]]) -> List[Tuple[str, Dict[str, int]]]:
+    results = []
+    for text, shift_days in chunk:
+        out, stats, _ = engine.deidentify_text(text, None if shift_days is None else int(shift_days))
+        results.append((out, stats))
+    return results
+
+
+def _ordered_map(pool: Executor, fn: Callable, chunks: Iterator, window: int) -> Iterator:
+    """按提交顺序取回结果；在途任务最多 window 个，输入不会被一次性读完"""
+    pending: deque = deque()
+    try:
+        for chunk in chunks:
+            pending.append(pool.submit(fn, chunk))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+# deidentify_many 进程后端：每个工作进程只构建一次引擎
+_many_engine: Optional[DeidEngine] = None
+
+
+def _init_many_worker(kwargs: Dict[str, Any]) -> None:
+    global _many_engine
+    _many_engine = DeidEngine(**kwargs)
+
+
+def _deidentify_chunk_in_worker(chunk: List[Tuple[str, Optional[int]]]) -> List[Tuple[str, Dict[str, int]]]:
+    return _deidentify_chunk(_many_engine, chunk)
+
+
+def config_fingerprint(custom_terms: Dict[str, List[str]], enable_categories: Dict[str, bool], **options: Any) -> str:
+    """
+    词典内容 + 类别开关 + 其它引擎选项的内容哈希，相同配置得到相同指纹
+    """
+    payload = {"terms": custom_terms, "categories": enable_categories, "options": options}
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class EngineManager:
+    """
+    会话级的 DeidEngine：配置指纹不变时复用同一个引擎（已编译的正则/自动机），
+    词典或开关变化时在锁外构建新引擎，再在锁内整体替换，正在使用旧引擎的线程不受影响。
+    所有引擎共用同一个 pseudonym_store，重建后哈希映射保持一致。
+    """
+
+    def __init__(self, pseudonym_store: Optional[PseudonymStore] = None):
+        self.pseudonym_store = pseudonym_store if pseudonym_store is not None else MemoryStore()
+        self.builds = 0
+        self._engine: Optional[DeidEngine] = None
+        self._fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get(self, custom_terms: Dict[str, List[str]], enable_categories: Dict[str, bool],
+            replacement_mode: str = "tag", prefer_native_safe_med: bool = True,
+            native_entry_point: Optional[str] = None) -> DeidEngine:
+        fingerprint = config_fingerprint(
+            custom_terms, enable_categories,
+            replacement_mode=replacement_mode,
+            prefer_native_safe_med=prefer_native_safe_med,
+            native_entry_point=native_entry_point,
+        )
+        with self._lock:
+            if self._engine is not None and self._fingerprint == fingerprint:
+                return self._engine
+
+        # 词典在 UI 中会被原地修改，引擎持有一份快照，避免与指纹不一致
+        engine = DeidEngine(
+            custom_terms=copy.deepcopy(custom_terms),
+            enable_categories=dict(enable_categories),
+            replacement_mode=replacement_mode,
+            prefer_native_safe_med=prefer_native_safe_med,
+            native_entry_point=native_entry_point,
+            pseudonym_store=self.pseudonym_store,
+        )
+        with self._lock:
+            # 并发构建同一配置时只保留先完成的那个
+            if self._engine is not None and self._fingerprint == fingerprint:
+                return self._engine
+            self._engine = engine
+            self._fingerprint = fingerprint
+            self.builds += 1
+        return engine
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        """当前引擎的配置指纹（尚未构建时为 None），可用作增量处理清单的配置标识"""
+        return self._fingerprint
+
+    def invalidate(self) -> None:
+        """丢弃当前引擎，下次 get 时重建"""
+        with self._lock:
+            self._engine = None
+            self._fingerprint = None
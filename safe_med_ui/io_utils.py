@@ -1,10 +1,12 @@
 import json
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Optional, Tuple
 
-import pandas as pd
-from docx import Document
+# pandas / python-docx 导入耗时较长，只在第一次读写对应格式时导入
+if TYPE_CHECKING:
+    import pandas as pd
+    from .scanner import ScanFilter
 
 
 STRUCTURED_EXT = {".csv", ".xlsx", ".xls", ".json"}
@@ -15,11 +17,13 @@ SEMI_STRUCTURED_EXT = {".txt", ".docx", ".jsonl"}
 class LoadedData:
     kind: str  # "text" | "docx" | "df" | "jsonl"
     path: Path
-    df: Optional[pd.DataFrame] = None
+    df: Optional["pd.DataFrame"] = None
     text: Optional[str] = None
     docx_paragraphs: Optional[List[str]] = None
+    docx_doc: Optional[Any] = None  # 已解析的 Document（batch.read_input 读取，脱敏时原位改写，只能脱敏一次）
     jsonl_rows: Optional[List[Dict[str, Any]]] = None
     json_obj: Optional[Any] = None
+    truncated: bool = False  # jsonl/csv/xlsx 仅加载了前 max_rows 行（预览用）；xls 总是整体加载
 
 
 def detect_kind(path: Path) -> str:
@@ -35,7 +39,10 @@ def detect_kind(path: Path) -> str:
     raise ValueError(f"不支持的文件类型: {ext}")
 
 
-def load_file(path: str) -> LoadedData:
+def load_file(path: str, max_rows: Optional[int] = None) -> LoadedData:
+    """
+    max_rows: 对 jsonl/csv/xlsx 生效，只读取前 max_rows 行用于预览，避免大文件整体载入内存
+    """
     p = Path(path)
     kind = detect_kind(p)
 
@@ -43,15 +50,20 @@ def load_file(path: str) -> LoadedData:
         return LoadedData(kind="text", path=p, text=p.read_text(encoding="utf-8", errors="ignore"))
 
     if kind == "docx":
-        doc = Document(str(p))
-        paras = [para.text for para in doc.paragraphs]
+        from .docx_rewrite import load_document, paragraph_texts
+        # 包含表格单元格和页眉页脚中的段落
+        paras = paragraph_texts(load_document(p))
         return LoadedData(kind="docx", path=p, docx_paragraphs=paras)
 
     if kind == "df":
+        import pandas as pd
         ext = p.suffix.lower()
         if ext == ".csv":
-            df = pd.read_csv(p, dtype=str, keep_default_na=False)
-        elif ext in {".xlsx", ".xls"}:
+            df = pd.read_csv(p, dtype=str, keep_default_na=False, nrows=max_rows)
+        elif ext == ".xlsx":
+            df = pd.read_excel(p, dtype=str, keep_default_na=False, nrows=max_rows)
+        elif ext == ".xls":
+            # xls 无法分块读取，导出时也不走流式写出，始终整体载入（不受 max_rows 限制）
             df = pd.read_excel(p, dtype=str, keep_default_na=False)
         elif ext == ".json":
             # 更鲁棒地处理 JSON：支持 list[dict], list[scalar], dict[list], dict[scalar]
@@ -89,17 +101,18 @@ def load_file(path: str) -> LoadedData:
         # 如果是 JSON 文件，保留原始解析对象以便导出时保持结构
         if ext == ".json":
             return LoadedData(kind="df", path=p, df=df, json_obj=obj)
-        return LoadedData(kind="df", path=p, df=df)
+        return LoadedData(kind="df", path=p, df=df,
+                          truncated=max_rows is not None and ext != ".xls" and len(df) >= max_rows)
 
     if kind == "jsonl":
         rows: List[Dict[str, Any]] = []
-        with p.open("r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                rows.append(json.loads(line))
-        return LoadedData(kind="jsonl", path=p, jsonl_rows=rows)
+        truncated = False
+        for row in iter_jsonl(p):
+            if max_rows is not None and len(rows) >= max_rows:
+                truncated = True
+                break
+            rows.append(row)
+        return LoadedData(kind="jsonl", path=p, jsonl_rows=rows, truncated=truncated)
 
     raise ValueError("未知 kind")
 
@@ -115,14 +128,21 @@ def save_text(out_path: Path, text: str) -> None:
     out_path.write_text(text, encoding="utf-8")
 
 
-def save_docx(out_path: Path, paragraphs: List[str]) -> None:
+def save_docx(out_path: Path, paragraphs: Any) -> None:
+    """
+    paragraphs: 原位脱敏后的 Document（见 docx_rewrite，保留原格式），或段落文本列表（新建文档）
+    """
+    if hasattr(paragraphs, "save"):
+        paragraphs.save(str(out_path))
+        return
+    from docx import Document
     doc = Document()
     for t in paragraphs:
         doc.add_paragraph(t)
     doc.save(str(out_path))
 
 
-def save_df(out_path: Path, df: pd.DataFrame) -> None:
+def save_df(out_path: Path, df: "pd.DataFrame") -> None:
     ext = out_path.suffix.lower()
     if ext == ".csv":
         df.to_csv(out_path, index=False, encoding="utf-8-sig")
@@ -134,10 +154,146 @@ def save_df(out_path: Path, df: pd.DataFrame) -> None:
         raise ValueError(f"不支持写出类型: {ext}")
 
 
-def save_jsonl(out_path: Path, rows: List[Dict[str, Any]]) -> None:
-    with out_path.open("w", encoding="utf-8") as f:
+def iter_jsonl(path: Path) -> Iterator[Any]:
+    """逐行读取 jsonl（生成器），内存占用与文件大小无关"""
+    with Path(path).open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            yield json.loads(line)
+
+
+class JsonlWriter:
+    """
+    增量写出 jsonl：每累积 flush_rows 行写一次磁盘
+    用法：with JsonlWriter(path) as w: w.write(row)
+    """
+
+    def __init__(self, out_path: Path, flush_rows: int = 1000):
+        self.out_path = Path(out_path)
+        self.flush_rows = max(1, int(flush_rows))
+        self.rows_written = 0
+        self._buf: List[str] = []
+        self._f = self.out_path.open("w", encoding="utf-8")
+
+    def write(self, row: Any) -> None:
+        self._buf.append(json.dumps(row, ensure_ascii=False))
+        if len(self._buf) >= self.flush_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buf:
+            self._f.write("\n".join(self._buf) + "\n")
+            self.rows_written += len(self._buf)
+            self._buf = []
+        self._f.flush()
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self.flush()
+        self._f.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def save_jsonl(out_path: Path, rows: Iterable[Dict[str, Any]], flush_rows: int = 1000) -> None:
+    with JsonlWriter(out_path, flush_rows=flush_rows) as w:
         for r in rows:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            w.write(r)
+
+
+def iter_df_chunks(path: Path, chunksize: int = 10000) -> Iterator["pd.DataFrame"]:
+    """
+    分块读取 csv/xlsx（生成器），每块最多 chunksize 行，所有值按字符串读取
+    csv 使用 pandas chunksize；xlsx 使用 openpyxl 只读模式逐行读取；xls 无流式读取方式，整体读取后切块
+    """
+    import pandas as pd
+    p = Path(path)
+    ext = p.suffix.lower()
+    if ext == ".csv":
+        yield from pd.read_csv(p, dtype=str, keep_default_na=False, chunksize=chunksize)
+        return
+    if ext == ".xlsx":
+        from openpyxl import load_workbook
+        wb = load_workbook(str(p), read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = ["" if c is None else str(c) for c in header]
+            buf: List[List[str]] = []
+            for row in rows:
+                buf.append(["" if v is None else str(v) for v in row[:len(columns)]])
+                if len(buf) >= chunksize:
+                    yield pd.DataFrame(buf, columns=columns, dtype=str)
+                    buf = []
+            if buf:
+                yield pd.DataFrame(buf, columns=columns, dtype=str)
+        finally:
+            wb.close()
+        return
+    if ext == ".xls":
+        df = pd.read_excel(p, dtype=str, keep_default_na=False)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+        return
+    raise ValueError(f"不支持分块读取: {ext}")
+
+
+class TableWriter:
+    """
+    分块写出 csv/xlsx：csv 首块写表头后追加；xlsx 使用 openpyxl 只写模式
+    用法：with TableWriter(path) as w: w.write(chunk_df)
+    """
+
+    def __init__(self, out_path: Path):
+        self.out_path = Path(out_path)
+        self.ext = self.out_path.suffix.lower()
+        self.rows_written = 0
+        self._header_written = False
+        self._wb = None
+        self._ws = None
+        if self.ext == ".xlsx":
+            from openpyxl import Workbook
+            self._wb = Workbook(write_only=True)
+            self._ws = self._wb.create_sheet()
+        elif self.ext != ".csv":
+            raise ValueError(f"不支持分块写出: {self.ext}")
+
+    def write(self, df: "pd.DataFrame") -> None:
+        if self.ext == ".csv":
+            df.to_csv(self.out_path, index=False, header=not self._header_written,
+                      mode="a" if self._header_written else "w",
+                      encoding="utf-8" if self._header_written else "utf-8-sig")
+        else:
+            if not self._header_written:
+                self._ws.append([str(c) for c in df.columns])
+            for row in df.itertuples(index=False, name=None):
+                self._ws.append(list(row))
+        self._header_written = True
+        self.rows_written += len(df)
+
+    def close(self) -> None:
+        if self._wb is not None:
+            if not self._header_written:
+                self._ws.append([])
+            self._wb.save(str(self.out_path))
+            self._wb = None
+        elif self.ext == ".csv" and not self._header_written:
+            self.out_path.write_text("", encoding="utf-8-sig")
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
 
 
 def save_json(out_path: Path, obj: Any) -> None:
@@ -145,7 +301,7 @@ def save_json(out_path: Path, obj: Any) -> None:
         json.dump(obj, f, ensure_ascii=False, indent=2)
 
 
-def get_text_columns(df: pd.DataFrame) -> List[str]:
+def get_text_columns(df: "pd.DataFrame") -> List[str]:
     cols = []
     for c in df.columns:
         # 只要能转成 str 就按可脱敏文本处理
@@ -153,20 +309,14 @@ def get_text_columns(df: pd.DataFrame) -> List[str]:
     return cols
 
 
-def scan_text_files(folder_path: Path) -> List[Path]:
+def scan_text_files(folder_path: Path, scan_filter: Optional["ScanFilter"] = None) -> List[Path]:
     """
-    扫描文件夹，返回所有文本类文件的路径列表
+    扫描文件夹，返回所有文本类文件的路径列表（按路径排序，便于显示）
     支持的文本格式：.txt, .docx, .csv, .xlsx, .json, .jsonl
+    子目录由线程池并行列出；需要边扫描边处理时直接使用 scanner.iter_file_batches
     """
-    TEXT_EXTS = {".txt", ".docx", ".csv", ".xlsx", ".xls", ".json", ".jsonl"}
-    text_files = []
-    
-    for file_path in folder_path.rglob("*"):
-        if file_path.is_file() and file_path.suffix.lower() in TEXT_EXTS:
-            text_files.append(file_path)
-    
-    # 按路径排序便于显示
-    return sorted(text_files)
+    from .scanner import iter_files
+    return sorted(iter_files(folder_path, scan_filter))
 
 
 def get_relative_path(file_path: Path, base_path: Path) -> str:
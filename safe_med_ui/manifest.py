@@ -0,0 +1,131 @@
+"""
+增量批处理清单（SQLite）
+- 每个已成功处理的输入文件记录：大小、修改时间、内容哈希、配置指纹、输出路径和统计
+- 再次运行时，大小和修改时间未变、配置指纹相同且输出仍在的文件直接跳过，不读取内容；
+  修改时间变了但大小相同时再比较内容哈希（如文件被复制/touch），内容未变同样跳过
+- 每处理完一个文件立即提交，批处理中途崩溃后重新运行即从未完成的文件继续
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+# 默认清单文件名（放在输出目录下）
+MANIFEST_NAME = ".safe_med_manifest.db"
+
+_HASH_BLOCK = 1 << 20
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    rel_path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    config: str  # 配置指纹（词典内容 + 类别开关 + 引擎选项）
+    output: str
+    stats: Dict[str, int] = field(default_factory=dict)
+    rows: int = 0
+    updated_at: float = 0.0
+
+    @classmethod
+    def for_file(cls, rel_path: str, file_path: Path, out_path: Path, config: str,
+                 stats: Optional[Dict[str, int]] = None, rows: int = 0,
+                 sha256: Optional[str] = None, size: Optional[int] = None,
+                 mtime_ns: Optional[int] = None) -> "ManifestEntry":
+        """
+        sha256 / size / mtime_ns: 处理前已取得时直接传入（应取处理前的状态），否则此时读取
+        """
+        if size is None or mtime_ns is None:
+            st = os.stat(file_path)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        return cls(rel_path=rel_path, size=size, mtime_ns=mtime_ns, sha256=sha256 or file_sha256(file_path),
+                   config=config, output=str(out_path), stats=dict(stats or {}), rows=rows)
+
+
+class Manifest:
+    """
+    rel_path → ManifestEntry 的持久化清单；只由主进程（或界面线程）读写
+    """
+
+    def __init__(self, path, timeout: float = 30.0):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " rel_path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL,"
+            " config TEXT NOT NULL, output TEXT NOT NULL, stats TEXT NOT NULL, rows INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    def get(self, rel_path: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT rel_path, size, mtime_ns, sha256, config, output, stats, rows, updated_at"
+                " FROM files WHERE rel_path = ?", (rel_path,)).fetchone()
+        if row is None:
+            return None
+        return ManifestEntry(row[0], row[1], row[2], row[3], row[4], row[5], json.loads(row[6]), row[7], row[8])
+
+    def record(self, entry: ManifestEntry) -> None:
+        """写入/覆盖一条记录并立即提交"""
+        entry.updated_at = entry.updated_at or time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (rel_path, size, mtime_ns, sha256, config, output, stats, rows, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (entry.rel_path, entry.size, entry.mtime_ns, entry.sha256, entry.config, entry.output,
+                 json.dumps(entry.stats, ensure_ascii=False), entry.rows, entry.updated_at))
+
+    def is_current(self, rel_path: str, file_path: Path, config: str, out_path: Path) -> bool:
+        """
+        文件自上次成功处理以来是否未变（同一配置、输出仍存在）
+        """
+        entry = self.get(rel_path)
+        if entry is None or entry.config != config or entry.output != str(out_path) or not os.path.exists(out_path):
+            return False
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False
+        if st.st_size != entry.size:
+            return False
+        if st.st_mtime_ns == entry.mtime_ns:
+            return True
+        # 大小相同、修改时间不同：内容哈希相同则只更新修改时间
+        if file_sha256(file_path) != entry.sha256:
+            return False
+        with self._lock:
+            self._conn.execute("UPDATE files SET mtime_ns = ? WHERE rel_path = ?", (st.st_mtime_ns, rel_path))
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "Manifest":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,215 @@
+"""
+读取 → 脱敏 → 写出 三段流水线
+- 每段由若干线程执行，段与段之间是有界队列：下游处理不过来时上游在 put 处阻塞（背压），
+  已读入内存的文件数最多为 队列容量 × 2 + 各段线程数
+- 读取/写出线程在等待磁盘或网络共享盘时，脱敏线程继续处理已读入的文件
+- 单个文件任一阶段出错只影响该文件，错误随结果返回
+- metrics 记录各队列的当前/峰值深度、各段处理数、忙碌时间和因下游队列满而阻塞的时间
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+STAGES = ("read", "process", "write")
+_POLL = 0.1  # 阻塞等待的轮询间隔（秒），用于响应调用方提前停止
+_DONE = object()
+
+
+@dataclass
+class StageMetrics:
+    threads: int = 0
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0  # 执行本段函数的累计时间
+    blocked_seconds: float = 0.0  # 下游队列满、等待放入的累计时间（背压）
+
+
+@dataclass
+class PipelineMetrics:
+    """运行期间可从其他线程读取 snapshot() 观察流水线状态"""
+    queue_size: int = 0
+    stages: Dict[str, StageMetrics] = field(default_factory=lambda: {name: StageMetrics() for name in STAGES})
+    max_depth: Dict[str, int] = field(default_factory=lambda: {name: 0 for name in STAGES})
+    seconds: float = 0.0
+    _queues: Dict[str, "queue.Queue"] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def depth(self) -> Dict[str, int]:
+        """各段输入队列的当前深度"""
+        return {name: q.qsize() for name, q in self._queues.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "depth": self.depth(),
+                "max_depth": dict(self.max_depth),
+                "processed": {name: s.processed for name, s in self.stages.items()},
+                "busy_seconds": {name: round(s.busy_seconds, 3) for name, s in self.stages.items()},
+                "blocked_seconds": {name: round(s.blocked_seconds, 3) for name, s in self.stages.items()},
+            }
+
+    def bottleneck(self) -> str:
+        """平均每线程忙碌时间最长的阶段"""
+        return max(STAGES, key=lambda name: self.stages[name].busy_seconds / max(self.stages[name].threads, 1))
+
+    def _observe(self, stage: str, q: "queue.Queue") -> None:
+        depth = q.qsize()
+        with self._lock:
+            if depth > self.max_depth[stage]:
+                self.max_depth[stage] = depth
+
+    def _add(self, stage: str, busy: float = 0.0, blocked: float = 0.0, failed: bool = False) -> None:
+        with self._lock:
+            s = self.stages[stage]
+            s.busy_seconds += busy
+            s.blocked_seconds += blocked
+            if busy:
+                s.processed += 1
+                s.failed += int(failed)
+
+
+@dataclass
+class PipelineResult:
+    item: Any
+    value: Any = None  # 写出阶段的返回值
+    error: str = ""
+    stage: str = ""  # 出错的阶段
+    seconds: float = 0.0  # 从开始读取到写出完成（含排队）
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+class _Job(object):
+    __slots__ = ("item", "value", "error", "stage", "t0")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.value = None
+        self.error = ""
+        self.stage = ""
+        self.t0 = 0.0
+
+
+class Pipeline(object):
+    """
+    read(item) -> 读取结果；process(item, 读取结果) -> 脱敏结果；write(item, 脱敏结果) -> 最终值
+    三个函数分别在各自的线程中执行，需线程安全
+    """
+
+    def __init__(self, read: Callable[[Any], Any], process: Callable[[Any, Any], Any],
+                 write: Callable[[Any, Any], Any], readers: int = 4, workers: int = 2, writers: int = 2,
+                 queue_size: int = 16):
+        self.funcs = {"read": read, "process": process, "write": write}
+        self.threads = {"read": max(readers, 1), "process": max(workers, 1), "write": max(writers, 1)}
+        self.queue_size = max(queue_size, 1)
+
+    def run(self, items: Iterable[Any], metrics: Optional[PipelineMetrics] = None) -> Iterator[PipelineResult]:
+        """
+        按完成顺序产出每个 item 的结果；items 由单独的线程按需取用（同样受队列容量限制），
+        可以是边扫描边产出的生成器
+        调用方提前停止迭代时，各线程在当前任务完成后退出
+        """
+        metrics = metrics if metrics is not None else PipelineMetrics()
+        metrics.queue_size = self.queue_size
+        for name in STAGES:
+            metrics.stages[name].threads = self.threads[name]
+        queues = {name: queue.Queue(self.queue_size) for name in STAGES}
+        metrics._queues = queues
+        results: "queue.Queue" = queue.Queue()
+        stop = threading.Event()
+        feed_error: List[BaseException] = []
+        t0 = time.perf_counter()
+
+        def put(q: "queue.Queue", obj: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(obj, timeout=_POLL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q: "queue.Queue") -> Any:
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=_POLL)
+                except queue.Empty:
+                    continue
+            return _DONE
+
+        def feed():
+            try:
+                for item in items:
+                    job = _Job(item)
+                    job.t0 = time.perf_counter()
+                    if not put(queues["read"], job):
+                        return
+                    metrics._observe("read", queues["read"])
+            except BaseException as e:
+                feed_error.append(e)
+            finally:
+                for _ in range(self.threads["read"]):
+                    put(queues["read"], _DONE)
+
+        def stage_worker(index: int, remaining: List[int], lock: threading.Lock):
+            name = STAGES[index]
+            func = self.funcs[name]
+            inbox = queues[name]
+            last = index == len(STAGES) - 1
+            outbox = results if last else queues[STAGES[index + 1]]
+            try:
+                while True:
+                    job = get(inbox)
+                    if job is _DONE:
+                        return
+                    if not job.error:
+                        start = time.perf_counter()
+                        try:
+                            job.value = func(job.item) if name == "read" else func(job.item, job.value)
+                        except Exception as e:
+                            job.value = None
+                            job.error = f"{type(e).__name__}: {e}"
+                            job.stage = name
+                        metrics._add(name, busy=time.perf_counter() - start, failed=bool(job.error))
+                    start = time.perf_counter()
+                    if not put(outbox, job):
+                        return
+                    if not last:
+                        metrics._add(name, blocked=time.perf_counter() - start)
+                        metrics._observe(STAGES[index + 1], outbox)
+            finally:
+                # 本段最后一个退出的线程通知下游结束
+                with lock:
+                    remaining[0] -= 1
+                    finished = remaining[0] == 0
+                if finished:
+                    for _ in range(1 if last else self.threads[STAGES[index + 1]]):
+                        put(outbox, _DONE)
+
+        threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+        for index, name in enumerate(STAGES):
+            remaining, lock = [self.threads[name]], threading.Lock()
+            threads += [threading.Thread(target=stage_worker, args=(index, remaining, lock),
+                                         name=f"pipeline-{name}-{i}", daemon=True)
+                        for i in range(self.threads[name])]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                job = get(results)
+                if job is _DONE:
+                    break
+                yield PipelineResult(job.item, value=job.value, error=job.error, stage=job.stage,
+                                     seconds=time.perf_counter() - job.t0)
+            if feed_error:
+                raise feed_error[0]
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            metrics.seconds = time.perf_counter() - t0
@@ -1,11 +1,14 @@
 import re
-from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from anonymizers.age_anonymizer import age_to_range
-from anonymizers.date_anonymizer import normalize_and_shift_date
+from anonymizers.date_anonymizer import shift_date
 from anonymizers.name_anonymizer import anonymize_name, hash_name
-from anonymizers.doctor_anonymizer import anonymize_name_with_title
+from anonymizers.doctor_anonymizer import TITLES, anonymize_name_with_title
 from anonymizers.id_anonymizer import get_hash
+from anonymizers.pseudonym_store import MemoryStore, PseudonymStore
+from ner.aho_corasick import AhoCorasick
+from ner.spans import Span, apply_spans
 
 
 # 你可以把这些规则继续扩展到：住院号/门诊号/医保卡/车牌/地址等
@@ -16,19 +19,87 @@ RE_DATE = re.compile(r"\b(20\d{2}|19\d{2})[-/.年](0?[1-9]|1[0-2])[-/.月](0?[1-
 RE_AGE = re.compile(r"(\d+)\s*[岁]")  # 年龄：如"45岁"
 
 
-def _replace_dict(text: str, terms: List[str], tag: str) -> Tuple[str, int]:
+# 只有以这些词结尾的职称参与 "姓名 + 职称" 匹配；doctor_titles 中的 医生/主任/患者/教授/助理 等普通名词
+# 前面常是普通词语（"今日医生"、"患者由主治医生"），不能据此判断姓名
+PROFESSIONAL_TITLE_SUFFIXES = ("医师", "护师", "技师", "药师", "护士", "护士长")
+
+
+def professional_titles(titles: List[str]) -> List[str]:
+    """从职称表中筛出职业职称（去掉普通名词）"""
+    return [t for t in titles if t and t.endswith(PROFESSIONAL_TITLE_SUFFIXES)]
+
+
+def build_title_pattern(titles: List[str]) -> "re.Pattern":
+    """
+    所有职称合并为一个正则："2-4个汉字 + 职称"，职称捕获在 title 组中（长者优先）
+    姓名部分非贪婪且不能以职称开头，避免把职称当作姓名（如 "副主任医师" 中的 "副主任"）；
+    姓名的确切起点由 FallbackRuleEngine._title_name_start 确定
+    """
+    alternatives = "|".join(re.escape(t) for t in sorted(set(titles), key=len, reverse=True) if t)
+    return re.compile(rf"(?:(?!{alternatives})[\u4e00-\u9fa5]){{2,4}}?(?P<title>{alternatives})")
+
+
+# custom_terms 中没有 doctor_titles（或其中没有职业职称）时使用内置职称表
+DOCTOR_TITLE_PATTERN = build_title_pattern(TITLES)
+
+# 单字姓氏只在这些触发词之后匹配名字：姓名、医生、护士、家族成员、联系人等标签（后接"："），
+# 以及 "患者XX，" 格式（前面不是"从"，名字后接 ，。、），避免"患者从..."这样的误匹配
+SURNAME_LABELS = ['姓名', '患者名字', '病人',
+                  '主治医生', '医生', '护士', '医师', '大夫',
+                  '父亲', '母亲', '父母', '爸爸', '妈妈', '哥哥', '弟弟', '姐姐', '妹妹', '爷爷', '奶奶',
+                  '公公', '婆婆', '儿子', '女儿', '孙子', '孙女', '妻子', '丈夫', '兄弟', '姐妹',
+                  '紧急联系人', '联系人', '推荐医生', '咨询医生']
+# 触发词自动机：一次扫描定位所有候选名字的位置，值为触发类型
+SURNAME_TRIGGERS = AhoCorasick({**{label + '：': "label" for label in SURNAME_LABELS}, '患者': "patient"})
+PATIENT_NAME_END = ('，', '。', '、')
+
+
+def _is_han(ch: str) -> bool:
+    return '\u4e00' <= ch <= '\u9fa5'
+
+
+# 片段重叠时的优先级（数值大者优先），与原先逐类替换的先后顺序一致
+CATEGORY_PRIORITY = {
+    "date": 90,
+    "id_like": 80,
+    "phone": 70,
+    "email": 60,
+    "age": 50,
+    "doctor_title": 40,
+    "hospital_dict": 30,
+    "hospital_suffixes": 30,
+    "departments": 30,
+    "custom_sensitive": 30,
+    "surnames": 20,
+}
+
+# 默认的日期偏移天数（未按患者指定偏移量时使用）
+DATE_SHIFT_DAYS = -100
+
+
+# 词典类脱敏：(类别开关, custom_terms 中的词表名, 替换标签, 默认是否启用)
+# 多个词表合并进同一个 Aho-Corasick 自动机，按最左最长规则一次扫描完成替换
+DICT_CATEGORIES = [
+    ("hospital_dict", "hospitals", "[HOSPITAL]", True),
+    ("hospital_suffixes", "hospital_suffixes", "[FACILITY]", False),
+    ("departments", "departments", "[DEPARTMENT]", False),
+    ("custom_sensitive", "custom_sensitive", "[SENSITIVE]", True),
+]
+
+
+def build_dict_matcher(custom_terms: Dict[str, List[str]], enable_categories: Dict[str, bool]) -> AhoCorasick:
     """
-    简单包含替换（按长词优先），后续你也可替换成 Aho-Corasick 以提升性能
+    用启用的词典类别构建一个自动机，匹配值为 (类别, 替换标签)
+    同一词条出现在多个词表时，以 DICT_CATEGORIES 中靠前的类别为准
     """
-    if not terms:
-        return text, 0
-    terms = sorted({t for t in terms if t}, key=len, reverse=True)
-    n = 0
-    for t in terms:
-        if t in text:
-            text = text.replace(t, tag)
-            n += 1
-    return text, n
+    terms: Dict[str, Tuple[str, str]] = {}
+    for key, terms_key, tag, default in DICT_CATEGORIES:
+        if not enable_categories.get(key, default):
+            continue
+        for t in custom_terms.get(terms_key, []) or []:
+            if t and t not in terms:
+                terms[t] = (key, tag)
+    return AhoCorasick(terms)
 
 
 @dataclass
@@ -36,178 +107,167 @@ class FallbackRuleEngine:
     custom_terms: Dict[str, List[str]]
     enable_categories: Dict[str, bool]
     replacement_mode: str = "tag"  # "tag" | "mask"
-    hash_mapping: Dict[str, str] = None  # 用于保持相同ID的一致性映射
+    # 用于保持相同ID的一致性映射；可传入共享/持久化的 PseudonymStore，传入字典时作为初始映射
+    hash_mapping: Union[PseudonymStore, Dict[str, str]] = None
+    shift_days: int = DATE_SHIFT_DAYS  # 日期偏移天数，可在 deidentify 中按患者覆盖
+    dict_matcher: AhoCorasick = field(init=False, repr=False)
+    title_pattern: "re.Pattern" = field(init=False, repr=False)
+    surname_chars: frozenset = field(init=False, repr=False)
+    compound_surnames: AhoCorasick = field(init=False, repr=False)
+    compound_surname_set: frozenset = field(init=False, repr=False)
 
     def __post_init__(self):
-        if self.hash_mapping is None:
-            self.hash_mapping = {}
+        if not isinstance(self.hash_mapping, PseudonymStore):
+            store = MemoryStore()
+            if self.hash_mapping:
+                store.put_many(self.hash_mapping, namespace="ID")
+            self.hash_mapping = store
+        # 医院/机构后缀/科室/自定义敏感词合并为一个自动机，引擎构建时只编译一次
+        self.dict_matcher = build_dict_matcher(self.custom_terms, self.enable_categories)
+        titles = professional_titles(self.custom_terms.get("doctor_titles") or [])
+        self.title_pattern = build_title_pattern(titles) if titles else DOCTOR_TITLE_PATTERN
+        # 单字姓氏查集合，复姓合并为一个自动机
+        surnames = self.custom_terms.get("surnames", []) or []
+        self.surname_chars = frozenset(s for s in surnames if len(s) == 1)
+        self.compound_surname_set = frozenset(s for s in surnames if len(s) > 1)
+        self.compound_surnames = AhoCorasick(self.compound_surname_set)
 
-    def deidentify(self, text: str) -> Tuple[str, Dict[str, int]]:
-        stats: Dict[str, int] = {}
+    @property
+    def date_shift_days(self) -> Optional[int]:
+        """日期偏移天数；日期类别未启用时为 None（供按列批量偏移日期使用）"""
+        return self.shift_days if self.enable_categories.get("date", True) else None
+
+    def detect(self, text: str, shift_days: Optional[int] = None) -> List[Span]:
+        """
+        在原文上运行所有检测器，返回候选片段 (start, end, 类别, 替换文本, 优先级)
+        每个检测器只扫描一遍文本，替换文本直接由匹配对象的分组生成；
+        片段之间可能重叠，由 deidentify 统一按优先级和长度解决
+        shift_days: 本段文本的日期偏移天数（如按患者的偏移量），缺省为 self.shift_days
+        """
+        spans: List[Span] = list(self._detect_date(text, self.shift_days if shift_days is None else shift_days))
+        for detector in (self._detect_id, self._detect_phone, self._detect_email,
+                         self._detect_age, self._detect_doctor_title, self._detect_dict, self._detect_surnames):
+            spans.extend(detector(text))
+        return spans
+
+    @staticmethod
+    def _span(match, key: str, replacement: str, group: int = 0) -> Span:
+        return Span(match.start(group), match.end(group), key, replacement, CATEGORY_PRIORITY[key])
+
+    # ========== 日期脱敏：日期偏移 ==========
+    def _detect_date(self, text: str, shift_days: int) -> Iterator[Span]:
+        if not self.enable_categories.get("date", True):
+            return
+        for match in RE_DATE.finditer(text):
+            # 年月日直接取自匹配分组（默认向前偏移100天），日期不合法时使用标签
+            year, month, day = match.group(1, 2, 3)
+            yield self._span(match, "date", shift_date(year, month, day, shift_days=shift_days) or "[DATE]")
+
+    # ========== 身份证脱敏：使用get_hash生成唯一代码 ==========
+    def _detect_id(self, text: str) -> Iterator[Span]:
+        if not self.enable_categories.get("id_like", True):
+            return
+        matches = list(RE_ID_LIKE.finditer(text))
+        if not matches:
+            return
+        # 使用哈希保持映射一致性：整段文本的ID一次批量查询/写入映射存储
+        codes = self.hash_mapping.get_or_create_many(
+            (m.group(0) for m in matches), lambda id_str: f"ID_{get_hash(id_str)}", namespace="ID")
+        for match in matches:
+            yield self._span(match, "id_like", codes[match.group(0)])
+
+    # ========== 电话号码脱敏 ==========
+    def _detect_phone(self, text: str) -> Iterator[Span]:
+        if not self.enable_categories.get("phone", True):
+            return
+        for match in RE_PHONE.finditer(text):
+            yield self._span(match, "phone", "[PHONE]")
 
-        def sub(regex, repl, key):
-            nonlocal text
-            if not self.enable_categories.get(key, True):
-                return
-            text2, k = regex.subn(repl, text)
-            text = text2
-            if k:
-                stats[key] = stats.get(key, 0) + k
-
-        # ========== 日期脱敏：使用normalize_and_shift_date进行日期偏移 ==========
-        if self.enable_categories.get("date", True):
-            def replace_date(match):
-                date_str = match.group(0)
-                # 调用date_anonymizer进行日期偏移（默认向前偏移100天）
-                shifted_date = normalize_and_shift_date(date_str, shift_days=-100)
-                if shifted_date:
-                    return shifted_date
-                return "[DATE]"  # 如果偏移失败，返回标签
-            
-            text2 = RE_DATE.sub(replace_date, text)
-            k = len(RE_DATE.findall(text))
-            if text2 != text:
-                text = text2
-                if k:
-                    stats["date"] = stats.get("date", 0) + k
-
-        # ========== 身份证脱敏：使用get_hash生成唯一代码 ==========
-        if self.enable_categories.get("id_like", True):
-            def replace_id(match):
-                id_str = match.group(0)
-                # 使用哈希保持映射一致性
-                if id_str not in self.hash_mapping:
-                    self.hash_mapping[id_str] = f"ID_{get_hash(id_str)}"
-                return self.hash_mapping[id_str]
-            
-            text2 = RE_ID_LIKE.sub(replace_id, text)
-            k = len(RE_ID_LIKE.findall(text))
-            if text2 != text:
-                text = text2
-                if k:
-                    stats["id_like"] = stats.get("id_like", 0) + k
-
-        # ========== 电话号码脱敏 ==========
-        sub(RE_PHONE, "[PHONE]", "phone")
-
-        # ========== 邮箱脱敏 ==========
-        sub(RE_EMAIL, "[EMAIL]", "email")
-
-        # ========== 年龄脱敏：使用age_to_range转换为年龄段 ==========
-        # 例如：45岁 → 40～50岁
-        if self.enable_categories.get("age", False):
-            def replace_age(match):
-                age_str = match.group(1)
-                return age_to_range(age_str)
-            
-            text2 = RE_AGE.sub(replace_age, text)
-            if text2 != text:
-                k = len(RE_AGE.findall(text))
-                text = text2
-                if k:
-                    stats["age"] = stats.get("age", 0) + k
-
-        # ========== 医生职位脱敏：使用anonymize_name_with_title进行智能处理 ==========
-        # 保留职称，医生姓名替换为'某某'，如：李四主治医师 → 某某主治医师
-        if self.enable_categories.get("doctor_title", False):
-            # 只处理 "汉字(2-3个) + 医学职位" 的模式，避免过度替换
-            # 匹配：名字(2-4个汉字) + 医学职称关键词
-            medical_titles = ['主任医师', '副主任医师', '主治医师', '住院医师', '助理医师', '实习医师', 
-                             '教授医师', '博士后医师', '研究员医师', '护士长', '副主任护师', '主任护师', 
-                             '护师', '助理护师', '护士', '实习护士', '技师', '高级技师', '主任技师', '助理技师']
-            
-            for title in sorted(medical_titles, key=len, reverse=True):
-                # 匹配 "2-4个汉字 + 职位" 的模式
-                pattern = re.compile(rf"[\u4e00-\u9fa5]{{2,4}}{re.escape(title)}")
-                matches = list(pattern.finditer(text))
-                for match in reversed(matches):  # 反向遍历避免替换后位置改变
-                    original = match.group(0)
-                    # 调用anonymize_name_with_title进行智能脱敏
-                    anonymized = anonymize_name_with_title(original)
-                    text = text[:match.start()] + anonymized + text[match.end():]
-                    stats["doctor_title"] = stats.get("doctor_title", 0) + 1
-
-        # ========== 医院脱敏：使用医院词典进行替换 ==========
-        # 将医院名称替换为通用标签，如：北京协和医院 → [HOSPITAL]
-        if self.enable_categories.get("hospital_dict", True):
-            # 使用词典匹配医院名称
-            hospitals = self.custom_terms.get("hospitals", [])
-            if hospitals:
-                # 按长度排序，优先匹配长的医院名称
-                for hospital in sorted(hospitals, key=len, reverse=True):
-                    if hospital in text:
-                        text = text.replace(hospital, "[HOSPITAL]")
-                        stats["hospital_dict"] = stats.get("hospital_dict", 0) + 1
-
-        # ========== 姓氏脱敏：使用anonymize_name进行智能处理 ==========
-        # 姓氏处理：保留姓氏+模糊化，如"张三" → "张某"、"欧阳娜娜" → "欧阳某"
-        if self.enable_categories.get("surnames", False):
-            surnames_list = self.custom_terms.get("surnames", [])
-            if surnames_list:
-                # 只处理多字姓氏（复姓）- 避免单字过度匹配的问题
-                # 例：欧阳、司马、诸葛等
-                multi_char_surnames = [s for s in surnames_list if len(s) > 1]
-                
-                for surname in sorted(multi_char_surnames, key=len, reverse=True):
-                    # 匹配 "多字姓氏 + 1-2个汉字"
-                    pattern = re.compile(rf"{re.escape(surname)}[\u4e00-\u9fa5]{{1,2}}")
-                    matches = list(pattern.finditer(text))
-                    for match in reversed(matches):
-                        name = match.group(0)
-                        anonymized = anonymize_name(name)
-                        if anonymized != name:
-                            text = text[:match.start()] + anonymized + text[match.end():]
-                            stats["surnames"] = stats.get("surnames", 0) + 1
-                
-                # 对单字姓氏，仅在特定上下文（标签）中进行替换，避免误匹配
-                single_char_surnames = [s for s in surnames_list if len(s) == 1]
-                
-                if single_char_surnames:
-                    # 只在这些标签之后匹配名字：姓名、患者、医生、护士、家族成员等
-                    # 使用负向前查断言来确保是标签之后，避免"患者从..."这样的误匹配
-                    context_patterns = [
-                        r'(?:姓名|患者名字|病人)：([\u4e00-\u9fa5]{1,2})',  # "姓名："后面
-                        r'(?:主治医生|医生|护士|医师|大夫)：([\u4e00-\u9fa5]{1,2})',   # "医生："后面
-                        r'(?<!从)患者([\u4e00-\u9fa5]{1,2})(?=，|。|、)',    # "患者XX，" 格式
-                        r'(?:父亲|母亲|父母|爸爸|妈妈|哥哥|弟弟|姐姐|妹妹|爷爷|奶奶|公公|婆婆|儿子|女儿|孙子|孙女|妻子|丈夫|兄弟|姐妹)：([\u4e00-\u9fa5]{1,2})',  # 家族成员
-                        r'(?:紧急联系人|联系人)：([\u4e00-\u9fa5]{1,2})',  # 联系人
-                        r'(?:推荐|咨询)医生：([\u4e00-\u9fa5]{1,2})',  # 推荐医生
-                    ]
-                    
-                    for pattern_str in context_patterns:
-                        pattern = re.compile(pattern_str)
-                        matches = list(pattern.finditer(text))
-                        for match in reversed(matches):
-                            # 获取匹配到的名字（可能在第1组或最后一组）
-                            name = match.group(1) if match.lastindex and match.lastindex >= 1 else match.group(0)
-                            if name and len(name) >= 2 and name[0] in single_char_surnames:
-                                anonymized = anonymize_name(name)
-                                start = match.start(1) if match.lastindex and match.lastindex >= 1 else match.start()
-                                end = match.end(1) if match.lastindex and match.lastindex >= 1 else match.end()
-                                text = text[:start] + anonymized + text[end:]
-                                stats["surnames"] = stats.get("surnames", 0) + 1
-
-        # ========== 医疗机构后缀脱敏：使用医疗机构后缀词典进行替换 ==========
-        # 医疗机构后缀脱敏，如：医院、诊所、中心 → [FACILITY_TYPE]
-        if self.enable_categories.get("hospital_suffixes", False):
-            # 使用词典匹配医疗机构后缀
-            suffixes = self.custom_terms.get("hospital_suffixes", [])
-            if suffixes:
-                # 按长度排序，优先匹配长的后缀
-                for suffix in sorted(suffixes, key=len, reverse=True):
-                    if suffix in text:
-                        text = text.replace(suffix, "[FACILITY]")
-                        stats["hospital_suffixes"] = stats.get("hospital_suffixes", 0) + 1
-
-        # ========== 科室脱敏：词典匹配 ==========
-        if self.enable_categories.get("departments", False):
-            text, k = _replace_dict(text, self.custom_terms.get("departments", []), "[DEPARTMENT]")
-            if k:
-                stats["departments"] = stats.get("departments", 0) + k
-
-        # ========== 自定义敏感词脱敏 ==========
-        text, k = _replace_dict(text, self.custom_terms.get("custom_sensitive", []), "[SENSITIVE]")
-        if k:
-            stats["custom_sensitive"] = stats.get("custom_sensitive", 0) + k
+    # ========== 邮箱脱敏 ==========
+    def _detect_email(self, text: str) -> Iterator[Span]:
+        if not self.enable_categories.get("email", True):
+            return
+        for match in RE_EMAIL.finditer(text):
+            yield self._span(match, "email", "[EMAIL]")
 
+    # ========== 年龄脱敏：使用age_to_range转换为年龄段 ==========
+    # 例如：45岁 → 40～50岁
+    def _detect_age(self, text: str) -> Iterator[Span]:
+        if not self.enable_categories.get("age", False):
+            return
+        for match in RE_AGE.finditer(text):
+            yield self._span(match, "age", age_to_range(match.group(1)))
+
+    # ========== 医生职位脱敏：使用anonymize_name_with_title进行智能处理 ==========
+    # 保留职称，医生姓名替换为'某某'，如：李四主治医师 → 某某主治医师
+    def _detect_doctor_title(self, text: str) -> Iterator[Span]:
+        if not self.enable_categories.get("doctor_title", False):
+            return
+        # 匹配：名字(2-4个汉字) + 职称（来自 custom_terms['doctor_titles']），一个正则一次扫描
+        for match in self.title_pattern.finditer(text):
+            start = self._title_name_start(text, match.start(), match.start("title"))
+            if start is None:
+                continue
+            yield Span(start, match.end(), "doctor_title",
+                       anonymize_name_with_title(text[start:match.end()], match.group("title")),
+                       CATEGORY_PRIORITY["doctor_title"])
+
+    def _title_name_start(self, text: str, start: int, title_start: int) -> Optional[int]:
+        """
+        职称前 2-4 个汉字中姓名的起点：配置了姓氏时取以姓氏（含复姓）开头的最长部分，如 "请王小明" → "王小明"；
+        未配置姓氏时要求名字前不是汉字；都不满足时返回 None（不是姓名）
+        """
+        if self.surname_chars or self.compound_surname_set:
+            for k in range(start, title_start - 1):
+                if text[k] in self.surname_chars or text[k:k + 2] in self.compound_surname_set:
+                    return k
+            return None
+        return start if start == 0 or not _is_han(text[start - 1]) else None
+
+    # ========== 词典脱敏：医院、医疗机构后缀、科室、自定义敏感词 ==========
+    # 如：北京协和医院 → [HOSPITAL]、医院/诊所/中心 → [FACILITY]、胸外科 → [DEPARTMENT]
+    # 所有词表共用一个 Aho-Corasick 自动机，一次扫描完成，长词优先
+    def _detect_dict(self, text: str) -> Iterator[Span]:
+        for start, end, (key, tag) in self.dict_matcher.finditer(text):
+            yield Span(start, end, key, tag, CATEGORY_PRIORITY[key])
+
+    # ========== 姓氏脱敏：使用anonymize_name进行智能处理 ==========
+    # 姓氏处理：保留姓氏+模糊化，如"张三" → "张某"、"欧阳娜娜" → "欧阳某"
+    def _detect_surnames(self, text: str) -> Iterator[Span]:
+        if not self.enable_categories.get("surnames", False):
+            return
+        priority = CATEGORY_PRIORITY["surnames"]
+
+        # 多字姓氏（复姓）：欧阳、司马、诸葛等，后接1-2个汉字
+        for start, end, _ in self.compound_surnames.finditer(text):
+            stop = end
+            while stop < len(text) and stop - end < 2 and _is_han(text[stop]):
+                stop += 1
+            if stop == end:
+                continue
+            name = text[start:stop]
+            anonymized = anonymize_name(name)
+            if anonymized != name:
+                yield Span(start, stop, "surnames", anonymized, priority)
+
+        # 对单字姓氏，仅在触发词之后进行替换（两个汉字且首字为姓氏），避免单字过度匹配
+        if not self.surname_chars:
+            return
+        for start, end, kind in SURNAME_TRIGGERS.finditer(text):
+            name = text[end:end + 2]
+            if len(name) < 2 or name[0] not in self.surname_chars or not (_is_han(name[0]) and _is_han(name[1])):
+                continue
+            if kind == "patient" and (text[start - 1:start] == "从" or text[end + 2:end + 3] not in PATIENT_NAME_END):
+                continue
+            yield Span(end, end + 2, "surnames", anonymize_name(name), priority)
+
+    def deidentify(self, text: str, shift_days: Optional[int] = None) -> Tuple[str, Dict[str, int]]:
+        """
+        检测 → 解决重叠 → 一次拼接；统计按实际生效的片段计数
+        shift_days: 日期偏移天数，缺省为 self.shift_days
+        """
+        text, accepted = apply_spans(text, self.detect(text, shift_days))
+        stats: Dict[str, int] = {}
+        for span in accepted:
+            stats[span.entity_type] = stats.get(span.entity_type, 0) + 1
         return text, stats
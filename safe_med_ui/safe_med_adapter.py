@@ -1,6 +1,7 @@
 import importlib
 import inspect
 import pkgutil
+import threading
 from dataclasses import dataclass
 from typing import Callable, Optional, Tuple, Any, Dict
 
@@ -60,27 +61,79 @@ def _find_callable_in_module(mod) -> Optional[Callable]:
     return None
 
 
+def load_entry_point(spec: str) -> Callable:
+    """
+    按配置解析入口："包.模块:函数" 或 "包.模块:类.方法"（类须可无参构造）
+    """
+    module_name, _, attr = spec.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"入口格式应为 模块:函数 或 模块:类.方法，实际为: {spec!r}")
+    parts = attr.split(".")
+    obj = importlib.import_module(module_name)
+    for i, part in enumerate(parts):
+        obj = getattr(obj, part)
+        if inspect.isclass(obj) and i < len(parts) - 1:
+            obj = obj()
+    if not callable(obj):
+        raise TypeError(f"入口不可调用: {spec}")
+    return obj
+
+
+# 发现结果按入口配置缓存，每个进程只扫描/导入一次：{entry_point: (found, fn, where)}
+_DISCOVERY_CACHE: Dict[Optional[str], Tuple[bool, Optional[Callable], str]] = {}
+_DISCOVERY_LOCK = threading.Lock()
+
+
+def clear_discovery_cache() -> None:
+    """清空发现结果（新增/修改了脱敏入口后重新发现）"""
+    with _DISCOVERY_LOCK:
+        _DISCOVERY_CACHE.clear()
+
+
 @dataclass
 class SafeMedAdapter:
     """
     目标：尽量自动调用你 safe_med 仓库现有脱敏实现。
     约定：callable(text: str, **kwargs) -> str 或 -> (str, stats)
+    entry_point: None 时自动扫描候选包；"模块:函数" 时只加载该入口；"" 时不使用 native 入口
     """
     found: bool = False
     fn: Optional[Callable] = None
     where: str = ""
+    entry_point: Optional[str] = None
+
+    def discover(self, refresh: bool = False) -> "SafeMedAdapter":
+        """
+        发现脱敏入口；结果在进程内缓存，之后构建引擎不再导入模块
+        refresh: 忽略缓存重新发现
+        配置了 entry_point 但无法加载时抛出 RuntimeError
+        """
+        key = self.entry_point
+        with _DISCOVERY_LOCK:
+            if refresh or key not in _DISCOVERY_CACHE:
+                if key is None:
+                    _DISCOVERY_CACHE[key] = self._scan()
+                elif key:
+                    # 显式配置的入口加载失败（拼写错误、导入错误）直接报错，不静默退回规则引擎；失败不缓存
+                    try:
+                        _DISCOVERY_CACHE[key] = (True, load_entry_point(key), key)
+                    except Exception as e:
+                        raise RuntimeError(f"无法加载配置的脱敏入口 {key!r}: {type(e).__name__}: {e}") from e
+                else:
+                    _DISCOVERY_CACHE[key] = (False, None, "")
+            self.found, self.fn, self.where = _DISCOVERY_CACHE[key]
+        return self
 
-    def discover(self) -> "SafeMedAdapter":
+    @staticmethod
+    def _scan() -> Tuple[bool, Optional[Callable], str]:
+        """遍历候选包及其子模块，返回第一个可调用的脱敏入口"""
         for pkg_name in CANDIDATE_PACKAGES:
             # 先尝试包本身
             try:
                 mod0 = importlib.import_module(pkg_name)
                 fn0 = _find_callable_in_module(mod0)
                 if fn0:
-                    self.found = True
-                    self.fn = fn0
-                    self.where = pkg_name
-                    return self
+                    return True, fn0, pkg_name
             except Exception:
                 pass
 
@@ -90,17 +143,11 @@ class SafeMedAdapter:
                     mod = importlib.import_module(mod_name)
                     fn = _find_callable_in_module(mod)
                     if fn:
-                        self.found = True
-                        self.fn = fn
-                        self.where = mod_name
-                        return self
+                        return True, fn, mod_name
                 except Exception:
                     continue
 
-        self.found = False
-        self.fn = None
-        self.where = ""
-        return self
+        return False, None, ""
 
     def deidentify(self, text: str, **kwargs) -> Tuple[str, Dict[str, int]]:
         if not self.found or not self.fn:
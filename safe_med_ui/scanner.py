@@ -0,0 +1,113 @@
+"""
+大目录树扫描
+- 基于 os.scandir：目录项自带文件类型，无需对每个条目再 stat；只有设置了大小限制时才取文件大小
+- 各子目录互相独立，由线程池并行列出（网络共享盘上目录列举的延迟可以重叠）
+- 生成器按批产出新发现的文件，调用方无需等整棵树扫描完即可开始处理
+- 支持 include / exclude 通配符（匹配相对路径，如 "*.docx"、"archive/*"）和文件大小上下限
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
+
+# 支持脱敏的文件类型
+TEXT_EXTS = {".txt", ".docx", ".csv", ".xlsx", ".xls", ".json", ".jsonl"}
+
+
+@dataclass
+class ScanFilter:
+    exts: Set[str] = field(default_factory=lambda: set(TEXT_EXTS))
+    include: Sequence[str] = ()  # 非空时只保留相对路径匹配其中任一通配符的文件
+    exclude: Sequence[str] = ()  # 相对路径匹配时排除；匹配的目录整个跳过
+    min_size: Optional[int] = None  # 字节
+    max_size: Optional[int] = None  # 字节
+
+    def excluded(self, rel_path: str) -> bool:
+        return any(fnmatch(rel_path, pattern) for pattern in self.exclude)
+
+    def accept_file(self, rel_path: str, entry: os.DirEntry) -> bool:
+        if os.path.splitext(entry.name)[1].lower() not in self.exts:
+            return False
+        if self.include and not any(fnmatch(rel_path, pattern) for pattern in self.include):
+            return False
+        if self.excluded(rel_path):
+            return False
+        if self.min_size is not None or self.max_size is not None:
+            size = entry.stat().st_size
+            if self.min_size is not None and size < self.min_size:
+                return False
+            if self.max_size is not None and size > self.max_size:
+                return False
+        return True
+
+
+def _scan_dir(directory: str, rel_dir: str, flt: ScanFilter) -> Tuple[List[Path], List[Tuple[str, str]]]:
+    """列出单个目录：返回 (符合条件的文件, [(子目录路径, 子目录相对路径)])；目录无法读取时视为空"""
+    files: List[Path] = []
+    subdirs: List[Tuple[str, str]] = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    # 不跟随目录符号链接，避免循环
+                    if entry.is_dir(follow_symlinks=False):
+                        if not flt.excluded(rel_path):
+                            subdirs.append((entry.path, rel_path))
+                    elif entry.is_file() and flt.accept_file(rel_path, entry):
+                        files.append(Path(entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def iter_file_batches(root: Path, flt: Optional[ScanFilter] = None, workers: int = 8,
+                      batch_size: int = 512) -> Iterator[List[Path]]:
+    """
+    并行扫描 root 下的文件，每发现约 batch_size 个就产出一批（批内、批间都不保证顺序）
+    workers: 并行列目录的线程数，为 1 时在当前线程内逐个目录扫描
+    """
+    flt = flt or ScanFilter()
+    pending: List[Path] = []
+
+    if workers <= 1:
+        stack = [(str(root), "")]
+        while stack:
+            files, subdirs = _scan_dir(*stack.pop(), flt)
+            pending.extend(files)
+            stack.extend(subdirs)
+            if len(pending) >= batch_size:
+                yield pending
+                pending = []
+        if pending:
+            yield pending
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan")
+    try:
+        running: Set[Future] = {pool.submit(_scan_dir, str(root), "", flt)}
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                pending.extend(files)
+                for directory, rel_dir in subdirs:
+                    running.add(pool.submit(_scan_dir, directory, rel_dir, flt))
+            if len(pending) >= batch_size:
+                yield pending
+                pending = []
+        if pending:
+            yield pending
+    finally:
+        # 调用方提前停止迭代时不再列举剩余目录
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_files(root: Path, flt: Optional[ScanFilter] = None, workers: int = 8,
+               batch_size: int = 512) -> Iterator[Path]:
+    for batch in iter_file_batches(root, flt, workers, batch_size):
+        yield from batch
@@ -0,0 +1,86 @@
+"""
+启动耗时分析（--profile-startup）
+在全新的子进程中用 `python -X importtime` 导入入口模块，按顶层包汇总导入耗时，
+并列出 pandas / python-docx / jieba 等重量级依赖是否在启动阶段被加载
+"""
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, TextIO
+
+# 应只在第一次使用对应格式/检测器时才导入的依赖
+HEAVY_MODULES = ["pandas", "numpy", "docx", "openpyxl", "jieba"]
+# 本项目的包按模块分别统计，第三方/标准库按顶层包汇总
+PROJECT_PACKAGES = {"safe_med", "safe_med_ui", "safe_text", "anonymizers", "ner", "benchmarks"}
+
+
+@dataclass
+class StartupReport:
+    target: str
+    seconds: float = 0.0  # 子进程执行 target 的总耗时（含解释器启动）
+    import_seconds: float = 0.0  # 导入阶段累计耗时
+    packages: Dict[str, float] = field(default_factory=dict)  # 模块/顶层包 → 自身导入耗时（秒）
+    heavy_loaded: List[str] = field(default_factory=list)
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """
+    解析 -X importtime 输出（"import time: 自身us | 累计us | 模块"），按模块/顶层包汇总自身耗时（秒）
+    """
+    packages: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        top = name.split(".")[0]
+        key = name if top in PROJECT_PACKAGES else top
+        packages[key] = packages.get(key, 0.0) + int(parts[0]) / 1e6
+    return packages
+
+
+def profile_startup(target: str, statement: Optional[str] = None) -> StartupReport:
+    """
+    target: 入口模块名，如 safe_med_ui.ui_app
+    statement: 导入后额外执行的语句（如构建引擎），计入总耗时
+    """
+    code = f"import sys, {target}\n"
+    if statement:
+        code += statement + "\n"
+    code += f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    seconds = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"退出码 {proc.returncode}")
+    packages = parse_importtime(proc.stderr)
+    loaded = proc.stdout.strip().splitlines()[-1] if proc.stdout.strip() else ""
+    return StartupReport(
+        target=target,
+        seconds=seconds,
+        import_seconds=sum(packages.values()),
+        packages=packages,
+        heavy_loaded=[m for m in loaded.split(",") if m],
+    )
+
+
+def print_startup_report(target: str, statement: Optional[str] = None, top: int = 15,
+                         out: TextIO = sys.stdout) -> int:
+    """打印启动耗时报告，返回退出码（供 --profile-startup 直接使用）"""
+    try:
+        report = profile_startup(target, statement)
+    except RuntimeError as e:
+        print(f"✗ 启动分析失败: {e}", file=out)
+        return 1
+    print(f"启动耗时 | {report.target}：总计 {report.seconds * 1000:.0f} ms，其中导入 {report.import_seconds * 1000:.0f} ms",
+          file=out)
+    for name, sec in sorted(report.packages.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+        print(f"  {name:<28} {sec * 1000:>8.1f} ms", file=out)
+    if report.heavy_loaded:
+        print(f"⚠ 启动阶段已加载重量级依赖: {', '.join(report.heavy_loaded)}", file=out)
+    else:
+        print(f"✓ 启动阶段未加载 {', '.join(HEAVY_MODULES)}", file=out)
+    return 0
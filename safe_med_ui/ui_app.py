@@ -10,11 +10,11 @@
 """
 import threading
 import traceback
+from contextlib import closing
 from pathlib import Path
 from tkinter import Tk, ttk, filedialog, messagebox, StringVar, BooleanVar, Text, END, Listbox, MULTIPLE, SINGLE, scrolledtext, Menu
 from typing import Dict, List, Any, Optional
 import json
-import pandas as pd
 
 from .config_store import ConfigStore
 from .io_utils import (
@@ -23,7 +23,22 @@ from .io_utils import (
     get_text_columns
 )
 from .io_utils import save_json
-from .engine import DeidEngine
+from .engine import DeidStats, EngineManager
+from .batch import (
+    deidentify_json_rows, is_streamed, output_fingerprint, process_file, read_input, run_file_pipeline
+)
+from .manifest import MANIFEST_NAME, Manifest, ManifestEntry
+from .pipeline import Pipeline, PipelineMetrics
+from .columns import deidentify_dataframe, deidentify_records, engine_deidentify
+from .docx_rewrite import (
+    deidentify_document, deidentify_docx, iter_paragraphs, load_document, paragraph_runs, paragraph_texts, rewrite_runs,
+)
+from anonymizers.pseudonym_store import open_store
+
+# jsonl/csv/xlsx 只加载前若干行用于预览，导出时再流式处理整个文件
+PREVIEW_ROWS = 200
+# jsonl 导出时每批按字段去重脱敏的行数
+JSONL_BATCH_ROWS = 1000
 
 
 def _repo_root() -> Path:
@@ -52,6 +67,10 @@ class ModernSafeMedApp(Tk):
         
         self.terms = self.store.load_terms()
         self.settings = self.store.load_settings() or {}
+        # ID 映射在整个会话内共享；配置 pseudonym_db 时持久化到 SQLite
+        self.pseudonym_store = open_store(self.settings.get("pseudonym_db"))
+        # 引擎在整个会话内复用，词典或开关变化时才重建
+        self.engine_manager = EngineManager(self.pseudonym_store)
         
         # UI变量
         self.input_path = StringVar(value="")
@@ -336,12 +355,10 @@ class ModernSafeMedApp(Tk):
                     self._log("✗ 未找到任何文本文件")
                     return
                 
-                # 显示文件列表到"数据列选择"框
+                # 显示文件列表到"数据列选择"框：一次插入全部条目，再一次全选
                 self.cols_list.delete(0, "end")
-                for file_path in self.text_files:
-                    rel_path = get_relative_path(file_path, base_path)
-                    self.cols_list.insert("end", rel_path)
-                    self.cols_list.selection_set("end")  # 默认全选
+                self.cols_list.insert("end", *(get_relative_path(p, base_path) for p in self.text_files))
+                self.cols_list.selection_set(0, "end")  # 默认全选
                 
                 self.loaded = None  # 清除单文件加载
                 self.loaded_folder = base_path
@@ -374,8 +391,10 @@ class ModernSafeMedApp(Tk):
             self.loaded_folder = None
             self.text_files = []
             try:
-                self.loaded = load_file(path)
+                self.loaded = load_file(path, max_rows=PREVIEW_ROWS)
                 self._log(f"✓ 已加载: {Path(path).name} | 类型={self.loaded.kind}")
+                if self.loaded.truncated:
+                    self._log(f"  仅载入前 {PREVIEW_ROWS} 行用于预览，导出时流式处理全部行")
                 self._refresh_columns_ui()
                 self._preview_load_into_left()
             except Exception as e:
@@ -445,7 +464,7 @@ class ModernSafeMedApp(Tk):
         
         try:
             from .io_utils import load_file
-            loaded = load_file(str(file_path))
+            loaded = load_file(str(file_path), max_rows=PREVIEW_ROWS)
             
             # 清空原文本框
             self.txt_in.delete("1.0", "end")
@@ -543,30 +562,43 @@ class ModernSafeMedApp(Tk):
         thread = threading.Thread(target=self._do_export_all_files, daemon=True)
         thread.start()
     
+    def _enable_categories(self) -> Dict[str, bool]:
+        """当前界面上的脱敏类别开关"""
+        return {
+            "id_like": self.enable_id.get(),
+            "phone": self.enable_phone.get(),
+            "email": self.enable_email.get(),
+            "date": self.enable_date.get(),
+            "age": self.enable_age.get(),
+            "hospital_dict": self.enable_hospital.get(),
+            "surnames": self.enable_surnames.get(),
+            "doctor_title": self.enable_doctor_title.get(),
+            "hospital_suffixes": self.enable_suffixes.get(),
+            "custom_terms": self.enable_custom_terms.get(),
+        }
+
+    def _engine_options(self, enable_categories: Dict[str, bool]) -> Dict[str, Any]:
+        """构建脱敏引擎的参数（同时用于计算增量清单的配置指纹）"""
+        return dict(
+            custom_terms=self.terms,
+            enable_categories=enable_categories,
+            replacement_mode=self.replacement_mode.get(),
+            prefer_native_safe_med=self.prefer_native.get(),
+            native_entry_point=self.settings.get("native_entry_point"),
+        )
+    
+    def _get_engine(self, enable_categories: Dict[str, bool]):
+        """会话内复用的脱敏引擎，词典内容或选项变化时自动重建"""
+        return self.engine_manager.get(**self._engine_options(enable_categories))
+
     def _do_export_current_file(self):
         """导出当前选中文件的脱敏结果"""
         self.prog.start()
         try:
             # 获取脱敏选项
-            enable_categories = {
-                "id_like": self.enable_id.get(),
-                "phone": self.enable_phone.get(),
-                "email": self.enable_email.get(),
-                "date": self.enable_date.get(),
-                "age": self.enable_age.get(),
-                "hospital_dict": self.enable_hospital.get(),
-                "surnames": self.enable_surnames.get(),
-                "doctor_title": self.enable_doctor_title.get(),
-                "hospital_suffixes": self.enable_suffixes.get(),
-                "custom_terms": self.enable_custom_terms.get(),
-            }
+            enable_categories = self._enable_categories()
             
-            engine = DeidEngine(
-                custom_terms=self.terms,
-                enable_categories=enable_categories,
-                replacement_mode=self.replacement_mode.get(),
-                prefer_native_safe_med=self.prefer_native.get(),
-            )
+            engine = self._get_engine(enable_categories)
             
             # 获取当前选中的文件
             selection = self.cols_list.curselection()
@@ -579,7 +611,8 @@ class ModernSafeMedApp(Tk):
             file_path = self.text_files[idx]
             
             from .io_utils import load_file, save_text, save_docx, get_relative_path
-            loaded = load_file(str(file_path))
+            # jsonl/csv/xlsx 导出时流式处理，这里只需判断类型
+            loaded = load_file(str(file_path), max_rows=0 if file_path.suffix.lower() in {".jsonl", ".csv", ".xlsx"} else None)
             
             self._log(f"开始导出: {get_relative_path(file_path, self.loaded_folder)}")
             
@@ -591,13 +624,8 @@ class ModernSafeMedApp(Tk):
                 save_text(out_path, deid_text)
                 
             elif loaded.kind == "docx":
-                deidentified_paras = []
-                for para_text in loaded.docx_paragraphs:
-                    deid_para, stats, _ = engine.deidentify_text(para_text)
-                    deidentified_paras.append(deid_para)
                 out_path = self.loaded_folder / get_relative_path(file_path, self.loaded_folder).replace(file_path.name, f"deid_{file_path.name}")
-                out_path.parent.mkdir(parents=True, exist_ok=True)
-                save_docx(out_path, deidentified_paras)
+                stats = deidentify_docx(file_path, out_path, engine)
             elif loaded.kind == "df" and file_path.suffix.lower() == ".json":
                 # JSON 原始对象 -> 递归脱敏并保存为 JSON
                 deid_obj, stats = self._deidentify_json(loaded.json_obj, engine)
@@ -606,17 +634,23 @@ class ModernSafeMedApp(Tk):
                 from .io_utils import save_json
                 save_json(out_path, deid_obj)
             elif loaded.kind == "jsonl":
-                new_rows = []
-                local_stats = {}
-                for row in loaded.jsonl_rows:
-                    new_row, s = self._deidentify_json(row, engine)
-                    new_rows.append(new_row)
-                    for k, v in s.items():
-                        local_stats[k] = local_stats.get(k, 0) + v
+                # 逐行流式脱敏，不整体载入内存
+                from .batch import deidentify_jsonl_stream
                 out_path = self.loaded_folder / get_relative_path(file_path, self.loaded_folder).replace(file_path.name, f"deid_{file_path.name}")
-                out_path.parent.mkdir(parents=True, exist_ok=True)
-                from .io_utils import save_jsonl
-                save_jsonl(out_path, new_rows)
+                result = deidentify_jsonl_stream(file_path, out_path, engine)
+                self._log(f"  {result.rows} 行 | {result.rows_per_sec:.0f} 行/s")
+            elif loaded.kind == "df" and file_path.suffix.lower() in {".csv", ".xlsx"}:
+                # 分块读取，逐块按列去重脱敏后追加写出
+                from .batch import deidentify_table_stream
+                out_path = self.loaded_folder / get_relative_path(file_path, self.loaded_folder).replace(file_path.name, f"deid_{file_path.name}")
+                result = deidentify_table_stream(file_path, out_path, engine)
+                self._log(f"  {result.rows} 行 | {result.rows_per_sec:.0f} 行/s")
+            elif loaded.kind == "df":
+                # xls 无法分块读取，已整体载入
+                from .batch import deidentify_loaded, save_output
+                out_path = self.loaded_folder / get_relative_path(file_path, self.loaded_folder).replace(file_path.name, f"deid_{file_path.name}")
+                kind, content, stats = deidentify_loaded(loaded, engine)
+                save_output(out_path, kind, content)
             
             self._log(f"✓ 导出完成: {out_path}")
             messagebox.showinfo("成功", f"文件已导出到:\n{out_path}")
@@ -632,65 +666,52 @@ class ModernSafeMedApp(Tk):
         self.prog.start()
         try:
             # 获取脱敏选项
-            enable_categories = {
-                "id_like": self.enable_id.get(),
-                "phone": self.enable_phone.get(),
-                "email": self.enable_email.get(),
-                "date": self.enable_date.get(),
-                "age": self.enable_age.get(),
-                "hospital_dict": self.enable_hospital.get(),
-                "surnames": self.enable_surnames.get(),
-                "doctor_title": self.enable_doctor_title.get(),
-                "hospital_suffixes": self.enable_suffixes.get(),
-                "custom_terms": self.enable_custom_terms.get(),
-            }
+            enable_categories = self._enable_categories()
             
-            engine = DeidEngine(
-                custom_terms=self.terms,
-                enable_categories=enable_categories,
-                replacement_mode=self.replacement_mode.get(),
-                prefer_native_safe_med=self.prefer_native.get(),
-            )
+            engine = self._get_engine(enable_categories)
             
-            from .io_utils import load_file, save_text, save_docx, get_relative_path
+            from .io_utils import get_relative_path
             
             output_base = Path(self.output_dir.get())
             input_base = self.loaded_folder
             exported_count = 0
+            skipped_count = 0
+            # 增量导出：清单中记录为未变化（同一配置、输出仍在）的文件直接跳过
+            # 配置指纹与命令行批处理相同，两者可交替处理同一输出目录
+            fingerprint = output_fingerprint(**self._engine_options(enable_categories))
             
             self._log(f"开始导出所有文件 ({len(self.text_files)} 个)...")
             
-            for idx, file_path in enumerate(self.text_files):
-                try:
-                    rel_path = get_relative_path(file_path, input_base)
-                    self._log(f"[{idx+1}/{len(self.text_files)}] 导出: {rel_path}")
-                    
-                    loaded = load_file(str(file_path))
-                    
-                    # 脱敏处理
-                    if loaded.kind == "text":
-                        deid_text, stats, _ = engine.deidentify_text(loaded.text)
-                        out_path = output_base / rel_path
-                        out_path.parent.mkdir(parents=True, exist_ok=True)
-                        save_text(out_path, deid_text)
-                        exported_count += 1
-                        
-                    elif loaded.kind == "docx":
-                        deidentified_paras = []
-                        for para_text in loaded.docx_paragraphs:
-                            deid_para, stats, _ = engine.deidentify_text(para_text)
-                            deidentified_paras.append(deid_para)
-                        out_path = output_base / rel_path
-                        out_path.parent.mkdir(parents=True, exist_ok=True)
-                        save_docx(out_path, deidentified_paras)
+            with Manifest(output_base / MANIFEST_NAME) as manifest:
+                def pending_files():
+                    nonlocal skipped_count
+                    for file_path in self.text_files:
+                        rel_path = get_relative_path(file_path, input_base)
+                        if manifest.is_current(rel_path, file_path, fingerprint, output_base / rel_path):
+                            skipped_count += 1
+                            continue
+                        yield file_path
+                
+                # 与命令行单进程批处理相同：读取 → 脱敏 → 写出 流水线，jsonl/csv/xlsx 流式处理
+                # 出错时先停止流水线线程（其中的扫描线程仍在查询清单），再关闭清单
+                metrics = PipelineMetrics()
+                results = run_file_pipeline(pending_files(), input_base, output_base, engine,
+                                            record_state=True, metrics=metrics)
+                with closing(results):
+                    for idx, result in enumerate(results):
+                        if result.error:
+                            self._log(f"[{idx+1}] ✗ 失败: {result.rel_path} - {result.error}")
+                            continue
+                        manifest.record(ManifestEntry(
+                            rel_path=result.rel_path, size=result.size, mtime_ns=result.mtime_ns,
+                            sha256=result.sha256, config=fingerprint, output=str(output_base / result.rel_path),
+                            stats=result.stats, rows=result.rows))
                         exported_count += 1
-                    
-                    self._log(f"  ✓ 完成: {rel_path}")
-                    
-                except Exception as e:
-                    self._log(f"  ✗ 失败: {str(e)}")
-                    continue
+                        self._log(f"[{idx+1}] ✓ 导出: {result.rel_path}")
             
+            self._log_pipeline(metrics)
+            if skipped_count:
+                self._log(f"  未变化跳过 {skipped_count} 个文件")
             self._log(f"✓ 批量导出完成！共导出 {exported_count} 个文件到: {output_base}")
             messagebox.showinfo("成功", f"共导出 {exported_count} 个脱敏文件到:\n{output_base}")
             
@@ -700,6 +721,11 @@ class ModernSafeMedApp(Tk):
         finally:
             self.prog.stop()
     
+    def _deidentify_json(self, obj, engine):
+        """递归脱敏 JSON 对象（保持结构），返回 (对象, stats)"""
+        from .batch import deidentify_json
+        return deidentify_json(obj, engine)
+    
     def _highlight_modifications(self, text: str, stats: dict):
         """在文本框中高亮所有修改的内容"""
         import re
@@ -732,26 +758,10 @@ class ModernSafeMedApp(Tk):
             user_edited_text = self.txt_out.get("1.0", "end").rstrip() if self.txt_out.get("1.0", "end").strip() else None
             
             # 获取脱敏选项
-            enable_categories = {
-                "id_like": self.enable_id.get(),
-                "phone": self.enable_phone.get(),
-                "email": self.enable_email.get(),
-                "date": self.enable_date.get(),
-                "age": self.enable_age.get(),
-                "hospital_dict": self.enable_hospital.get(),
-                "surnames": self.enable_surnames.get(),
-                "doctor_title": self.enable_doctor_title.get(),
-                "hospital_suffixes": self.enable_suffixes.get(),
-                "custom_terms": self.enable_custom_terms.get(),
-            }
+            enable_categories = self._enable_categories()
             
             # 创建脱敏引擎
-            engine = DeidEngine(
-                custom_terms=self.terms,
-                enable_categories=enable_categories,
-                replacement_mode=self.replacement_mode.get(),
-                prefer_native_safe_med=self.prefer_native.get(),
-            )
+            engine = self._get_engine(enable_categories)
             
             # 对于 DataFrame（JSON）脱敏，直接使用 fallback 引擎确保所有规则生效
             fallback_engine = engine.fallback
@@ -786,13 +796,9 @@ class ModernSafeMedApp(Tk):
 
             # DOCX
             elif self.loaded.kind == "docx":
-                deidentified_paras = []
-                total_stats = {}
-                for para_text in self.loaded.docx_paragraphs:
-                    deid_para, stats, _ = engine.deidentify_text(para_text)
-                    deidentified_paras.append(deid_para)
-                    for k, v in stats.items():
-                        total_stats[k] = total_stats.get(k, 0) + v
+                # 每次重新打开原文档，原位改写正文、表格和页眉页脚，所有段落一次调用引擎
+                doc = load_document(self.loaded.path)
+                deidentified_paras, total_stats = deidentify_document(doc, engine)
 
                 self.deidentified_text = "\n".join(deidentified_paras[:10])
                 self.deidentified_stats = total_stats
@@ -802,10 +808,11 @@ class ModernSafeMedApp(Tk):
                     self.txt_out.insert("end", self.deidentified_text[:5000])
 
                 if not preview_only:
-                    if user_edited_text:
-                        deidentified_paras[0] = user_edited_text
+                    # 用户改动了预览内容时与原先一致写入第一段；未改动时保持原文档结构
+                    if user_edited_text and user_edited_text != self.deidentified_text[:5000].rstrip():
+                        rewrite_runs(paragraph_runs(next(iter_paragraphs(doc))), user_edited_text)
                     out_path = suggest_output_path(self.loaded.path, Path(self.output_dir.get()))
-                    save_docx(out_path, deidentified_paras)
+                    save_docx(out_path, doc)
                     if user_edited_text:
                         self.txt_out.delete("1.0", "end")
                         self.txt_out.insert("end", user_edited_text)
@@ -815,45 +822,13 @@ class ModernSafeMedApp(Tk):
                     self._log(f"✓ DOCX预览完成 | 总替换: {sum(total_stats.values())}")
 
             elif self.loaded.kind == "jsonl":
-                # JSONL 单文件 - 使用列脱敏逻辑
-                df = pd.DataFrame(self.loaded.jsonl_rows)
-                cols_names = df.columns.tolist()
-                total_stats = {}
-                
-                for col in cols_names:
-                    if col not in df.columns:
-                        continue
-                    new_col = []
-                    for val in df[col]:
-                        # 检查列名，为结构化数据添加上下文标签
-                        val_str = str(val)
-                        if any(kw in col for kw in ["姓名", "患者名", "医生", "护士", "联系人"]):
-                            val_str = f"姓名：{val_str}"
-                        elif any(kw in col for kw in ["年龄", "age"]) and val_str.isdigit():
-                            val_str = f"{val_str}岁"
-                        
-                        # 使用 fallback 引擎确保完整脱敏规则
-                        deid_val, stats = fallback_engine.deidentify(val_str)
-                        
-                        # 恢复原始格式
-                        if any(kw in col for kw in ["姓名", "患者名", "医生", "护士", "联系人"]):
-                            deid_val = deid_val.replace("姓名：", "")
-                        elif any(kw in col for kw in ["年龄", "age"]) and "岁" in deid_val:
-                            import re as re_module
-                            match = re_module.search(r'(\d+)～(\d+)岁', deid_val)
-                            if match:
-                                deid_val = f"{match.group(1)}～{match.group(2)}"
-                        
-                        new_col.append(deid_val)
-                        for k, v in stats.items():
-                            total_stats[k] = total_stats.get(k, 0) + v
-                    df[col] = new_col
-                
-                new_rows = df.to_dict(orient='records')
-                self.deidentified_stats = total_stats
-
+                # JSONL 单文件 - 使用列脱敏逻辑；预览只处理已载入的前几行，导出时逐行流式处理整个文件
                 if preview_only:
-                    pretty = "\n".join([json.dumps(r, ensure_ascii=False) for r in new_rows[:10]])
+                    new_rows, total_stats = deidentify_records(self.loaded.jsonl_rows[:10], fallback_engine.deidentify,
+                                                               date_shift_days=fallback_engine.date_shift_days)
+                    self.deidentified_stats = total_stats
+
+                    pretty = "\n".join([json.dumps(r, ensure_ascii=False) for r in new_rows])
                     self.txt_out.delete("1.0", "end")
                     self.txt_out.insert("end", pretty[:5000])
                     # 高亮 JSONL 中的脱敏内容
@@ -861,10 +836,33 @@ class ModernSafeMedApp(Tk):
                     self._log(f"✓ JSONL 预览完成 | 替换数: {sum(total_stats.values())}")
 
                 if not preview_only:
+                    from .io_utils import iter_jsonl, JsonlWriter
+                    import time
                     out_path = suggest_output_path(self.loaded.path, Path(self.output_dir.get()))
-                    from .io_utils import save_jsonl
-                    save_jsonl(out_path, new_rows)
-                    self._log(f"✓ JSONL 脱敏完成！已保存: {out_path}")
+                    total_stats = DeidStats()
+                    rows = 0
+                    t0 = time.perf_counter()
+                    batch = []
+
+                    def flush_batch():
+                        # 按批（每批 JSONL_BATCH_ROWS 行）按字段去重脱敏后写出
+                        new_rows, stats = deidentify_records(batch, fallback_engine.deidentify,
+                                                             date_shift_days=fallback_engine.date_shift_days)
+                        for r in new_rows:
+                            writer.write(r)
+                        total_stats.add(stats)
+                        batch.clear()
+
+                    with JsonlWriter(out_path) as writer:
+                        for row in iter_jsonl(self.loaded.path):
+                            batch.append(row)
+                            rows += 1
+                            if len(batch) >= JSONL_BATCH_ROWS:
+                                flush_batch()
+                        flush_batch()
+                    seconds = time.perf_counter() - t0
+                    self.deidentified_stats = total_stats
+                    self._log(f"✓ JSONL 脱敏完成！已保存: {out_path} | {rows} 行 | {rows / max(seconds, 1e-9):.0f} 行/s")
                     messagebox.showinfo("成功", f"文件已脱敏并保存到:\n{out_path}")
 
             elif self.loaded.kind == "df":
@@ -877,41 +875,9 @@ class ModernSafeMedApp(Tk):
                     cols_names = [self.cols_list.get(i) if i < self.cols_list.size() else self.loaded.df.columns[i] 
                                  for i in cols_to_process]
                     
-                    # 脱敏选择的列（使用 fallback 引擎确保完整规则）
-                    df = self.loaded.df.copy()
-                    total_stats = {}
-                    for col in cols_names:
-                        if col not in df.columns:
-                            continue
-                        new_col = []
-                        for val in df[col]:
-                            # 检查列名，为结构化数据添加上下文标签
-                            val_str = str(val)
-                            # 如果列名含有"姓名"、"患者"等关键词，添加标签帮助姓名脱敏
-                            if any(kw in col for kw in ["姓名", "患者名", "医生", "护士", "联系人"]):
-                                val_str = f"姓名：{val_str}"
-                            # 如果列名含有"年龄"，添加"岁"帮助年龄脱敏
-                            elif any(kw in col for kw in ["年龄", "age"]) and val_str.isdigit():
-                                val_str = f"{val_str}岁"
-                            
-                            # 使用 fallback 引擎直接脱敏，避免 native 适配器不支持的规则丢失
-                            deid_val, stats = fallback_engine.deidentify(val_str)
-                            
-                            # 恢复原始格式（删除临时添加的标签）
-                            if any(kw in col for kw in ["姓名", "患者名", "医生", "护士", "联系人"]):
-                                # 移除前缀"姓名："
-                                deid_val = deid_val.replace("姓名：", "")
-                            elif any(kw in col for kw in ["年龄", "age"]) and "岁" in deid_val:
-                                # 年龄脱敏后应该是"XX～YY岁"格式，提取数字范围
-                                import re as re_module
-                                match = re_module.search(r'(\d+)～(\d+)岁', deid_val)
-                                if match:
-                                    deid_val = f"{match.group(1)}～{match.group(2)}"  # 保留范围，移除"岁"
-                            
-                            new_col.append(deid_val)
-                            for k, v in stats.items():
-                                total_stats[k] = total_stats.get(k, 0) + v
-                        df[col] = new_col
+                    # 脱敏选择的列（使用 fallback 引擎确保完整规则；按列角色补充上下文标签）
+                    df, total_stats = deidentify_dataframe(self.loaded.df, fallback_engine.deidentify, cols_names,
+                                                             date_shift_days=fallback_engine.date_shift_days)
                     
                     # 从脱敏后的 DataFrame 重建 JSON 对象
                     if isinstance(self.loaded.json_obj, list):
@@ -959,17 +925,8 @@ class ModernSafeMedApp(Tk):
                 cols_names = [self.cols_list.get(i) if i < self.cols_list.size() else df.columns[i] 
                              for i in cols_to_process]
                 
-                total_stats = {}
-                for col in cols_names:
-                    if col not in df.columns:
-                        continue
-                    new_col = []
-                    for val in df[col]:
-                        deid_val, stats, _ = engine.deidentify_text(str(val))
-                        new_col.append(deid_val)
-                        for k, v in stats.items():
-                            total_stats[k] = total_stats.get(k, 0) + v
-                    df[col] = new_col
+                df, total_stats = deidentify_dataframe(df, engine_deidentify(engine), cols_names, use_roles=False,
+                                                 date_shift_days=engine.date_shift_days)
                 
                 preview_df = df.head(5)
                 # 仅在预览模式下显示脱敏结果，避免导出时出现闪屏
@@ -983,7 +940,19 @@ class ModernSafeMedApp(Tk):
                 
                 if not preview_only:
                     out_path = suggest_output_path(self.loaded.path, Path(self.output_dir.get()))
-                    save_df(out_path, self.deidentified_df)
+                    if self.loaded.truncated:
+                        # 只载入了预览行（csv/xlsx；xls 总是整体载入）：分块读取整个文件，逐块按列脱敏后追加写出
+                        from .io_utils import iter_df_chunks, TableWriter
+                        total_stats = DeidStats()
+                        with TableWriter(out_path) as writer:
+                            for chunk in iter_df_chunks(self.loaded.path):
+                                chunk, stats = deidentify_dataframe(chunk, engine_deidentify(engine), cols_names, use_roles=False,
+                                                                     date_shift_days=engine.date_shift_days)
+                                writer.write(chunk)
+                                total_stats.add(stats)
+                    else:
+                        save_df(out_path, self.deidentified_df)
+                    self.deidentified_stats = total_stats
                     self._log(f"✓ 表格脱敏完成！已保存: {out_path}")
                     messagebox.showinfo("成功", f"文件已脱敏并保存到:\n{out_path}")
                 else:
@@ -1001,8 +970,12 @@ class ModernSafeMedApp(Tk):
             self.prog.stop()
     
     def _do_deidentify_folder(self, engine, enable_categories, preview_only: bool = False):
-        """批量脱敏文件夹中的文本文件"""
-        from .io_utils import load_file, save_text, save_docx, get_relative_path
+        """
+        批量脱敏文件夹中选中的文件
+        读取线程加载 → 脱敏线程处理 → 写出线程保存（预览模式不写出），各段之间为有界队列
+        jsonl/csv/xlsx 导出时不整体加载，在脱敏线程中边读边写；预览时只读取前 PREVIEW_ROWS 行
+        """
+        from .io_utils import get_relative_path
         
         try:
             # 获取用户选择的文件
@@ -1013,140 +986,54 @@ class ModernSafeMedApp(Tk):
                 return
             
             selected_files = [self.text_files[i] for i in selected_indices]
-            total_stats = {}
+            total_stats = DeidStats()
             all_outputs = []
             
             self._log(f"开始处理 {len(selected_files)} 个文件...")
             
-            for idx, file_path in enumerate(selected_files):
-                try:
-                    self._log(f"[{idx+1}/{len(selected_files)}] 处理: {get_relative_path(file_path, self.loaded_folder)}")
-                    
-                    # 加载文件
-                    loaded = load_file(str(file_path))
-                    
-                    # 脱敏处理
-                    if loaded.kind == "text":
-                        deid_text, stats, _ = engine.deidentify_text(loaded.text)
-                        all_outputs.append((file_path, deid_text, "text"))
-
-                    elif loaded.kind == "docx":
-                        deidentified_paras = []
-                        for para_text in loaded.docx_paragraphs:
-                            deid_para, stats, _ = engine.deidentify_text(para_text)
-                            deidentified_paras.append(deid_para)
-                        all_outputs.append((file_path, deidentified_paras, "docx"))
-
-                    # JSON 文件，通过 DataFrame 脱敏，然后重建 JSON 对象
-                    elif loaded.kind == "df" and file_path.suffix.lower() == ".json":
-                        try:
-                            df = loaded.df.copy()
-                            cols_names = df.columns.tolist()
-                            stats = {}
-                            for col in cols_names:
-                                new_col = []
-                                for val in df[col]:
-                                    # 检查列名，为结构化数据添加上下文标签
-                                    val_str = str(val)
-                                    if any(kw in col for kw in ["姓名", "患者名", "医生", "护士", "联系人"]):
-                                        val_str = f"姓名：{val_str}"
-                                    elif any(kw in col for kw in ["年龄", "age"]) and val_str.isdigit():
-                                        val_str = f"{val_str}岁"
-                                    
-                                    # 使用 fallback 引擎确保完整脱敏规则
-                                    deid_val, s = engine.fallback.deidentify(val_str)
-                                    
-                                    # 恢复原始格式
-                                    if any(kw in col for kw in ["姓名", "患者名", "医生", "护士", "联系人"]):
-                                        deid_val = deid_val.replace("姓名：", "")
-                                    elif any(kw in col for kw in ["年龄", "age"]) and "岁" in deid_val:
-                                        import re as re_module
-                                        match = re_module.search(r'(\d+)～(\d+)岁', deid_val)
-                                        if match:
-                                            deid_val = f"{match.group(1)}～{match.group(2)}"
-                                    
-                                    new_col.append(deid_val)
-                                    for k, v in s.items():
-                                        stats[k] = stats.get(k, 0) + v
-                                df[col] = new_col
-                            
-                            # 从脱敏后的 DataFrame 重建 JSON 对象
-                            if isinstance(loaded.json_obj, list):
-                                if len(loaded.json_obj) > 0 and isinstance(loaded.json_obj[0], dict):
-                                    deid_obj = df.to_dict(orient='records')
-                                else:
-                                    deid_obj = df['value'].tolist() if 'value' in df.columns else []
-                            elif isinstance(loaded.json_obj, dict):
-                                if all(isinstance(v, list) for v in loaded.json_obj.values()):
-                                    deid_obj = df.to_dict(orient='list')
-                                else:
-                                    deid_obj = df.to_dict(orient='records')[0] if len(df) > 0 else {}
-                            else:
-                                deid_obj = df['value'].iloc[0] if 'value' in df.columns and len(df) > 0 else None
-                            
-                            all_outputs.append((file_path, deid_obj, "json"))
-                        except Exception as e:
-                            self._log(f"  ✗ JSON 脱敏失败: {str(e)}")
-                            continue
-
-                    # JSONL 文件
-                    elif loaded.kind == "jsonl":
-                        try:
-                            df = loaded.df if hasattr(loaded, 'df') and loaded.df is not None else pd.DataFrame(loaded.jsonl_rows)
-                            cols_names = df.columns.tolist()
-                            stats = {}
-                            for col in cols_names:
-                                new_col = []
-                                for val in df[col]:
-                                    # 检查列名，为结构化数据添加上下文标签
-                                    val_str = str(val)
-                                    if any(kw in col for kw in ["姓名", "患者名", "医生", "护士", "联系人"]):
-                                        val_str = f"姓名：{val_str}"
-                                    elif any(kw in col for kw in ["年龄", "age"]) and val_str.isdigit():
-                                        val_str = f"{val_str}岁"
-                                    
-                                    # 使用 fallback 引擎确保完整脱敏规则
-                                    deid_val, s = engine.fallback.deidentify(val_str)
-                                    
-                                    # 恢复原始格式
-                                    if any(kw in col for kw in ["姓名", "患者名", "医生", "护士", "联系人"]):
-                                        deid_val = deid_val.replace("姓名：", "")
-                                    elif any(kw in col for kw in ["年龄", "age"]) and "岁" in deid_val:
-                                        import re as re_module
-                                        match = re_module.search(r'(\d+)～(\d+)岁', deid_val)
-                                        if match:
-                                            deid_val = f"{match.group(1)}～{match.group(2)}"
-                                    
-                                    new_col.append(deid_val)
-                                    for k, v in s.items():
-                                        stats[k] = stats.get(k, 0) + v
-                                df[col] = new_col
-                            
-                            new_rows = df.to_dict(orient='records')
-                            all_outputs.append((file_path, new_rows, "jsonl"))
-                        except Exception as e:
-                            self._log(f"  ✗ JSONL 脱敏失败: {str(e)}")
-                            continue
-                    
-                    else:
-                        self._log(f"  ⊘ 跳过: 不支持的格式 {loaded.kind}")
-                        continue
-                    
-                    # 累计统计
-                    for k, v in stats.items():
-                        total_stats[k] = total_stats.get(k, 0) + v
-                    
-                    self._log(f"  ✓ 完成: {len(stats)} 个统计")
-                    
-                except Exception as e:
-                    self._log(f"  ✗ 处理失败: {str(e)}")
+            def read(file_path):
+                if not is_streamed(file_path):
+                    return read_input(file_path)
+                return load_file(str(file_path), max_rows=PREVIEW_ROWS) if preview_only else None
+            
+            def process(file_path, loaded):
+                if loaded is None:
+                    stats, _ = process_file(file_path, self.loaded_folder, Path(self.output_dir.get()), engine)
+                    return None, "stream", stats
+                return self._deidentify_folder_file(file_path, loaded, engine)
+            
+            def write(file_path, output):
+                # 流式处理的文件已在脱敏线程中写出
+                if output is not None and output[1] != "stream" and not preview_only:
+                    content, kind, _ = output
+                    self._save_batch_output(file_path, content, kind)
+                return output
+            
+            metrics = PipelineMetrics()
+            pipeline = Pipeline(read, process, write)
+            for idx, res in enumerate(pipeline.run(selected_files, metrics)):
+                rel_path = get_relative_path(res.item, self.loaded_folder)
+                if res.error:
+                    self._log(f"[{idx+1}/{len(selected_files)}] ✗ 处理失败: {rel_path} - {res.error}")
                     continue
+                if res.value is None:
+                    self._log(f"[{idx+1}/{len(selected_files)}] ⊘ 跳过: 不支持的格式 {rel_path}")
+                    continue
+                content, kind, stats = res.value
+                # 导出模式下已由写出线程保存，不再保留内容
+                all_outputs.append((res.item, content if preview_only else None, kind))
+                
+                total_stats.add(stats)
+                
+                self._log(f"[{idx+1}/{len(selected_files)}] ✓ 完成: {rel_path} | {len(stats)} 个统计")
+            
+            self._log_pipeline(metrics)
             
             self.deidentified_stats = total_stats
             
             if not preview_only:
-                # 导出所有脱敏结果，保留原始目录结构
-                self._export_batch_files(selected_files, all_outputs)
+                self._log(f"✓ 批量导出完成！共导出 {len(all_outputs)} 个文件")
+                messagebox.showinfo("成功", f"共导出 {len(all_outputs)} 个脱敏文件到:\n{self.output_dir.get()}")
             else:
                 # 预览模式：显示当前选中的文件的脱敏结果
                 # 获取用户在列表中选中的第一个文件
@@ -1161,7 +1048,7 @@ class ModernSafeMedApp(Tk):
                                 self.txt_out.insert("end", content[:5000])
                                 self._highlight_modifications(content[:5000], total_stats)
                             elif kind == "docx":
-                                docx_preview = "\n".join(content[:10])  # content 是段落列表
+                                docx_preview = "\n".join(paragraph_texts(content)[:10])  # content 是原位脱敏后的 Document
                                 self.txt_out.insert("end", docx_preview[:5000])
                             elif kind == "json":
                                 pretty = json.dumps(content, ensure_ascii=False, indent=2)
@@ -1169,6 +1056,8 @@ class ModernSafeMedApp(Tk):
                             elif kind == "jsonl":
                                 pretty = "\n".join([json.dumps(r, ensure_ascii=False) for r in content[:10]])
                                 self.txt_out.insert("end", pretty[:5000])
+                            elif kind == "df":
+                                self.txt_out.insert("end", content.head(20).to_string(index=False)[:5000])
                             preview_text = get_relative_path(file_path, self.loaded_folder)
                             self._log(f"✓ 预览: {preview_text}")
                             break
@@ -1186,49 +1075,74 @@ class ModernSafeMedApp(Tk):
         finally:
             self.prog.stop()
     
-    def _export_batch_files(self, selected_files, all_outputs):
-        """导出批量脱敏的文件，保留目录结构"""
-        from .io_utils import save_text, save_docx, get_relative_path
-        from .io_utils import save_json, save_jsonl
-        
-        try:
-            output_base = Path(self.output_dir.get())
-            input_base = self.loaded_folder
-            
-            exported_count = 0
-            for file_path, content, kind in all_outputs:
-                try:
-                    # 构建输出路径，保留相对目录结构
-                    rel_path = get_relative_path(file_path, input_base)
-                    out_path = output_base / rel_path
-                    
-                    # 创建输出目录
-                    out_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # 保存文件
-                    if kind == "text":
-                        save_text(out_path, content)
-                    elif kind == "docx":
-                        save_docx(out_path, content)
-                    elif kind == "json":
-                        save_json(out_path, content)
-                    elif kind == "jsonl":
-                        save_jsonl(out_path, content)
-                    
-                    exported_count += 1
-                    self._log(f"✓ 已导出: {rel_path}")
-                    
-                except Exception as e:
-                    rel_path = get_relative_path(file_path, input_base)
-                    self._log(f"✗ 导出失败: {rel_path} - {str(e)}")
-                    continue
-            
-            self._log(f"✓ 批量导出完成！共导出 {exported_count} 个文件")
-            messagebox.showinfo("成功", f"共导出 {exported_count} 个脱敏文件到:\n{output_base}")
+    def _deidentify_folder_file(self, file_path: Path, loaded, engine):
+        """
+        脱敏文件夹中的单个已加载文件（在流水线的脱敏线程中执行）
+        return: (输出内容, 输出类型, stats)；不支持的格式返回 None
+        """
+        if loaded.kind == "text":
+            deid_text, stats, _ = engine.deidentify_text(loaded.text)
+            return deid_text, "text", stats
+
+        if loaded.kind == "docx":
+            # 读取阶段已解析为 Document，原位脱敏
+            _, stats = deidentify_document(loaded.docx_doc, engine)
+            return loaded.docx_doc, "docx", stats
+
+        # JSON 文件，通过 DataFrame 脱敏，然后重建 JSON 对象
+        if loaded.kind == "df" and file_path.suffix.lower() == ".json":
+            df, stats = deidentify_dataframe(loaded.df, engine.fallback.deidentify,
+                                          date_shift_days=engine.fallback.date_shift_days)
             
-        except Exception as e:
-            self._log(f"✗ 导出错误: {str(e)}")
-            messagebox.showerror("错误", str(e))
+            # 从脱敏后的 DataFrame 重建 JSON 对象
+            if isinstance(loaded.json_obj, list):
+                if len(loaded.json_obj) > 0 and isinstance(loaded.json_obj[0], dict):
+                    deid_obj = df.to_dict(orient='records')
+                else:
+                    deid_obj = df['value'].tolist() if 'value' in df.columns else []
+            elif isinstance(loaded.json_obj, dict):
+                if all(isinstance(v, list) for v in loaded.json_obj.values()):
+                    deid_obj = df.to_dict(orient='list')
+                else:
+                    deid_obj = df.to_dict(orient='records')[0] if len(df) > 0 else {}
+            else:
+                deid_obj = df['value'].iloc[0] if 'value' in df.columns and len(df) > 0 else None
+            return deid_obj, "json", stats
+
+        # JSONL 文件（仅预览模式下加载前 PREVIEW_ROWS 行，导出时流式处理）
+        if loaded.kind == "jsonl":
+            rows, stats = deidentify_json_rows(loaded.jsonl_rows, engine)
+            return rows, "jsonl", stats
+
+        # CSV/XLSX 文件（同上，仅预览）
+        if loaded.kind == "df" and is_streamed(file_path):
+            df, stats = deidentify_dataframe(loaded.df, engine_deidentify(engine),
+                                          date_shift_days=engine.fallback.date_shift_days)
+            return df, "df", stats
+
+        return None
+    
+    def _save_batch_output(self, file_path: Path, content, kind: str):
+        """保存批量脱敏的单个文件，保留相对目录结构（在流水线的写出线程中执行）"""
+        from .io_utils import get_relative_path
+        
+        rel_path = get_relative_path(file_path, self.loaded_folder)
+        out_path = Path(self.output_dir.get()) / rel_path
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        if kind == "text":
+            save_text(out_path, content)
+        elif kind == "docx":
+            save_docx(out_path, content)
+        elif kind == "json":
+            save_json(out_path, content)
+    
+    def _log_pipeline(self, metrics: PipelineMetrics):
+        """记录流水线的队列峰值和瓶颈阶段，便于判断读写还是脱敏拖慢了批处理"""
+        if not metrics.stages["read"].processed:
+            return
+        peak = metrics.max_depth
+        self._log(f"  流水线 | 队列峰值 读取:{peak['read']} 脱敏:{peak['process']} 写出:{peak['write']}"
+                  f"（容量 {metrics.queue_size}）| 瓶颈阶段: {metrics.bottleneck()} | 耗时 {metrics.seconds:.2f}s")
     
     # ========== 词典管理 ===========
     
@@ -7,56 +7,75 @@
 
 import json
 import copy
-from ner.ner_rules import NERRules
-from anonymizers.id_anonymizer import get_hash
+import os
+from ner.ner_rules import get_ner_rules
+from ner.spans import Span, apply_spans
+from anonymizers.id_anonymizer import get_hash_many
 from anonymizers.date_anonymizer import normalize_and_shift_date
 from anonymizers.age_anonymizer import age_to_range
 from anonymizers.name_anonymizer import hash_name
 from anonymizers.doctor_anonymizer import anonymize_name_with_title
 from anonymizers.location_anonymizer import anonymize_hospital,anonymize_location
 from anonymizers.other_anonymizer import anonymize_other
-from conf import titles_path, common_surnames_path, hospitals_path, hospital_suffixes_path
+from anonymizers.pseudonym_store import open_store
+from anonymizers.date_offset import DateOffsetTable
 
-def text_anonymize(content):
+
+def default_ner_rules():
+    '''
+    按 conf 中配置的词典路径获取共享的 NERRules 实例（进程内只构建一次）
+    conf 中可选配置 other_rules_path，用于扩展住院号、身份证号等 OTHER 类规则
+    :return: NERRules
+    '''
+    import conf
+    return get_ner_rules(conf.titles_path, conf.common_surnames_path, conf.hospitals_path, conf.hospital_suffixes_path,
+                         other_rules_path=getattr(conf, 'other_rules_path', None))
+
+
+def text_anonymize(content, ner_rules=None, store=None, shift_days=-100):
     '''
     文本数据脱敏
     :param content:脱敏前文本
+    :param ner_rules:NERRules 实例，缺省时使用共享的默认实例
+    :param store:假名存储（PseudonymStore），缺省时姓名代号直接按哈希生成
+    :param shift_days:日期偏移天数，按患者偏移时传入 DateOffsetTable.offset_for(患者ID)
     :return:脱敏后文本
     '''
     if not content or not isinstance(content, str):
         return ""
-    modifications = []
-    ner_rules = NERRules(titles_path, common_surnames_path, hospitals_path, hospital_suffixes_path)
+    if ner_rules is None:
+        ner_rules = default_ner_rules()
+    # 实体类型顺序即重叠时的优先级（靠前者优先）
+    priorities = {entity_type: -index for index, entity_type in enumerate(ner_rules.entity_types)}
+
+    spans = []
     entity_list = ner_rules.extract_entities(content=content)
     for entity in entity_list:
         entity_type = entity['entity_type']
         text = entity['text']
         if entity_type == 'DATE':
-            text_safe = normalize_and_shift_date(text=text, shift_days=-100)
-            modifications.append((text, text_safe))
+            # 日期不合法（如 2 月 30 日）时无法偏移，替换为标签
+            text_safe = normalize_and_shift_date(text=text, shift_days=shift_days) or '[DATE]'
         elif entity_type == 'AGE':
             text_safe = age_to_range(age=text)
-            modifications.append((text, text_safe))
         elif entity_type == 'NAME':
-            text_safe = hash_name(name=text)
-            modifications.append((text, text_safe))
+            text_safe = hash_name(name=text, store=store)
         elif entity_type == 'HOSPITAL':
             text_safe = anonymize_hospital(text=text)
-            modifications.append((text, text_safe))
         elif entity_type == 'LOCATION':
             text_safe = anonymize_location(text=text)
-            modifications.append((text, text_safe))
         elif entity_type == 'DOCTOR':
             text_safe = anonymize_name_with_title(text)
-            modifications.append((text, text_safe))
         elif entity_type == 'OTHER':
             text_safe = anonymize_other(text=text)
-            modifications.append((text, text_safe))
-    index = 0
-    for text, text_safe in modifications:
-        content = content.replace(text, text_safe)
-        index += 1
-        print(f"序号：{index}---脱敏前:{text}---脱敏后:{text_safe}")
+        else:
+            continue
+        spans.append(Span(entity['start'], entity['end'], entity_type, text_safe, priorities[entity_type]))
+
+    # 所有实体针对原文定位，解决重叠后一次拼接，不再对全文逐个 replace
+    content, accepted = apply_spans(content, spans)
+    for index, span in enumerate(accepted, start=1):
+        print(f"序号：{index}---类型:{span.entity_type}---位置:{span.start}-{span.end}---脱敏后:{span.replacement}")
 
     return content
 
@@ -64,56 +83,64 @@ def text_anonymize(content):
 def mdt_anonymize():
     json_path = '../data/Old_住院会诊脱敏.json'
     json_out = '../data/Old_住院会诊脱敏_v2.json'
-    hash_dict_path = '../data/Old_住院会诊Hashdict.json'
+    hash_db_path = '../data/Old_住院会诊Hashdict.db'
 
     with open(json_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
     datacp = copy.deepcopy(data)
     print(f'待处理数据量：{len(datacp)}')
 
+    # 编号 → 代号的映射边处理边写入 SQLite，重复运行时复用已有代号
+    store = open_store(hash_db_path)
+    # 配置了密钥时按病历号偏移日期（同一患者偏移量相同，偏移量表与代号存于同一库），否则统一偏移 -100 天
+    import conf
+    date_key = getattr(conf, 'date_shift_key', None) or os.environ.get('SAFE_MED_DATE_KEY')
+    offsets = DateOffsetTable(date_key, store=store) if date_key else None
+
+    # 会诊编号、病历号整列去重后批量生成代号，不再逐条哈希
+    consult_codes = get_hash_many([case.get('会诊编号', '') for case in datacp], store=store)
+    record_ids = [case.get('病历号', '') for case in datacp]
+    record_codes = get_hash_many(record_ids, store=store)
+    shifts = offsets.offsets_for(record_ids) if offsets else [-100] * len(datacp)
+
     case_safe_list = []
-    hash_dict = {}
-    for case in datacp:
+    for index, case in enumerate(datacp):
         case_safe = {}
+        shift_days = shifts[index]
 
         # 会诊编号
-        content = case.get('会诊编号', '')
-        case_safe['会诊编号'] = get_hash(text=content)
-        hash_dict.update({content: case_safe['会诊编号']})
+        case_safe['会诊编号'] = consult_codes[index]
 
         # 病历号
-        content = case.get('病历号', '')
-        case_safe['病历号'] = get_hash(text=content)
-        hash_dict.update({content: case_safe['病历号']})
+        case_safe['病历号'] = record_codes[index]
 
         # 邀请科室
         content = case.get('邀请科室', '')
-        case_safe['邀请科室'] = text_anonymize(content=content)
+        case_safe['邀请科室'] = text_anonymize(content=content, store=store, shift_days=shift_days)
 
         # 发起科室
         content = case.get('发起科室', '')
-        case_safe['发起科室'] = text_anonymize(content=content)
+        case_safe['发起科室'] = text_anonymize(content=content, store=store, shift_days=shift_days)
 
         # 会诊目的
         content = case.get('会诊目的', '')
-        case_safe['会诊目的'] = text_anonymize(content=content)
+        case_safe['会诊目的'] = text_anonymize(content=content, store=store, shift_days=shift_days)
 
         # 会诊意见
         content = case.get('会诊意见', '')
-        case_safe['会诊意见'] = text_anonymize(content=content)
+        case_safe['会诊意见'] = text_anonymize(content=content, store=store, shift_days=shift_days)
 
         # 会诊意见提出科室
         content = case.get('会诊意见提出科室', '')
-        case_safe['会诊意见提出科室'] = text_anonymize(content=content)
+        case_safe['会诊意见提出科室'] = text_anonymize(content=content, store=store, shift_days=shift_days)
 
         case_safe_list.append(case_safe)
 
-    # 存储hash_dict和datacp
+    # 存储datacp
     with open(json_out, 'w', encoding='utf-8') as f:
         json.dump(datacp, f, indent=4, ensure_ascii=False)
 
-    with open(hash_dict_path, 'w', encoding='utf-8') as f:
-        json.dump(hash_dict, f)
+    store.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test Aho-Corasick dictionary matcher (leftmost-longest semantics)"""
+
+import random
+import re
+
+from ner.aho_corasick import AhoCorasick, trie_regex
+
+
+def _brute_force(terms, text):
+    out = []
+    i = 0
+    while i < len(text):
+        best = max((t for t in terms if text.startswith(t, i)), key=len, default=None)
+        if best:
+            out.append((i, i + len(best), best))
+            i += len(best)
+        else:
+            i += 1
+    return out
+
+
+def test_leftmost_longest():
+    matcher = AhoCorasick(["医院", "北京协和医院", "协和", "胸外科"], use_native=False)
+    text = "就诊医院：北京协和医院胸外科"
+    assert matcher.findall(text) == [
+        (2, 4, "医院"),
+        (5, 11, "北京协和医院"),
+        (11, 14, "胸外科"),
+    ]
+
+
+def test_values_and_replace():
+    matcher = AhoCorasick({"北京协和医院": "[HOSPITAL]", "心内科": "[DEPARTMENT]"})
+    text, n = matcher.replace("北京协和医院心内科复查", lambda tag: tag)
+    assert text == "[HOSPITAL][DEPARTMENT]复查"
+    assert n == 2
+
+
+def test_matches_brute_force():
+    random.seed(7)
+    for _ in range(500):
+        terms = list({"".join(random.choice("abcd") for _ in range(random.randint(1, 4)))
+                      for _ in range(random.randint(1, 6))})
+        text = "".join(random.choice("abcdx") for _ in range(random.randint(0, 30)))
+        expected = _brute_force(terms, text)
+        assert AhoCorasick(terms, use_native=False).findall(text) == expected
+        assert AhoCorasick(terms).findall(text) == expected
+
+
+def test_trie_regex_prefers_longest():
+    pattern = re.compile(trie_regex(["张", "欧", "欧阳", "司马", "王"]))
+    assert pattern.match("欧阳娜娜").group() == "欧阳"
+    assert pattern.match("欧娜").group() == "欧"
+    assert pattern.match("司马光").group() == "司马"
+    assert pattern.match("司徒") is None
+
+
+if __name__ == "__main__":
+    test_leftmost_longest()
+    test_values_and_replace()
+    test_matches_brute_force()
+    test_trie_regex_prefers_longest()
+    print("✓ Aho-Corasick 测试通过")
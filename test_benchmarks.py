@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test benchmark corpus generator and baseline comparison"""
+
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.run import compare, parse_size, run
+
+
+def test_corpus_is_deterministic():
+    a = CorpusGenerator(seed=3, n_hospitals=50)
+    b = CorpusGenerator(seed=3, n_hospitals=50)
+    assert a.text(4096) == b.text(4096)
+    assert a.hospitals == b.hospitals and len(a.hospitals) == 50
+    assert len(CorpusGenerator(seed=3).text(4096).encode("utf-8")) <= 4096
+
+
+def test_parse_size():
+    assert parse_size("1k") == 1024
+    assert parse_size("10m") == 10 * 1024 * 1024
+    assert parse_size("2048") == 2048
+
+
+def test_compare_flags_regressions():
+    base = {"results": {"a/1/1": {"seconds": 1.0}, "b/1/1": {"seconds": 1.0}}}
+    cur = {"results": {"a/1/1": {"seconds": 1.1}, "b/1/1": {"seconds": 1.5}, "c/1/1": {"seconds": 9.0}}}
+    assert [r["key"] for r in compare(cur, base, tolerance=0.2)] == ["b/1/1"]
+
+
+def test_run_small():
+    report = run(sizes=[1024], dict_sizes=[20], cases=["fallback_deidentify", "load_jsonl"], repeat=1, log=None)
+    assert set(report["results"]) == {"fallback_deidentify/1024/20", "load_jsonl/1024/20"}
+    assert all(r["seconds"] > 0 for r in report["results"].values())
+
+
+if __name__ == "__main__":
+    test_corpus_is_deterministic()
+    test_parse_size()
+    test_compare_flags_regressions()
+    test_run_small()
+    print("✓ 基准工具测试通过")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test column-level de-identification and chunked table IO"""
+
+import re
+
+import pandas as pd
+import pytest
+
+from safe_med_ui.columns import column_role, deidentify_dataframe, deidentify_records
+from safe_med_ui.io_utils import TableWriter, iter_df_chunks
+
+NAME_KWS = ["姓名", "患者名", "医生", "护士", "联系人"]
+
+
+@pytest.fixture
+def engine(make_fallback):
+    return make_fallback({"surnames": True, "age": True})
+
+
+def _per_cell(df, engine):
+    """旧的逐单元格实现，作为对照"""
+    df = df.copy()
+    total = {}
+    for col in df.columns:
+        new_col = []
+        for val in df[col]:
+            val_str = str(val)
+            if any(kw in col for kw in NAME_KWS):
+                val_str = f"姓名：{val_str}"
+            elif any(kw in col for kw in ["年龄", "age"]) and val_str.isdigit():
+                val_str = f"{val_str}岁"
+            out, stats = engine.deidentify(val_str)
+            if any(kw in col for kw in NAME_KWS):
+                out = out.replace("姓名：", "")
+            elif any(kw in col for kw in ["年龄", "age"]) and "岁" in out:
+                m = re.search(r'(\d+)～(\d+)岁', out)
+                if m:
+                    out = f"{m.group(1)}～{m.group(2)}"
+            new_col.append(out)
+            for k, v in stats.items():
+                total[k] = total.get(k, 0) + v
+        df[col] = new_col
+    return df, total
+
+
+def test_column_role():
+    assert column_role("患者姓名") == "name"
+    assert column_role("年龄") == "age"
+    assert column_role("主诉") == "text"
+
+
+def test_matches_per_cell(engine):
+    df = pd.DataFrame({
+        "姓名": ["张三", "欧阳娜娜", "张三", ""],
+        "年龄": ["45", "45", "7岁", "abc"],
+        "备注": ["电话 13812345678", "身份证：110101197812345678", "电话 13812345678", "无"],
+    })
+    out, stats = deidentify_dataframe(df, engine.deidentify)
+    expected, expected_stats = _per_cell(df, engine)
+    assert out.values.tolist() == expected.values.tolist()
+    assert stats == expected_stats
+
+
+def test_records_keep_missing_keys(engine):
+    rows = [{"姓名": "张三", "备注": "电话 13812345678"}, {"备注": "电话 13812345678"}, "电话 13812345678"]
+    out, stats = deidentify_records(rows, engine.deidentify)
+    assert out == [{"姓名": "张某", "备注": "电话 [PHONE]"}, {"备注": "电话 [PHONE]"}, "电话 [PHONE]"]
+    assert stats == {"surnames": 1, "phone": 3}
+
+
+def test_chunked_roundtrip(tmp_path):
+    df = pd.DataFrame({"a": [str(i) for i in range(25)], "b": ["x"] * 25})
+    for ext in (".csv", ".xlsx"):
+        src = tmp_path / f"in{ext}"
+        with TableWriter(src) as w:
+            w.write(df.iloc[:10])
+            w.write(df.iloc[10:])
+        chunks = list(iter_df_chunks(src, chunksize=7))
+        assert [len(c) for c in chunks] == [7, 7, 7, 4]
+        assert pd.concat(chunks).values.tolist() == df.values.tolist()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
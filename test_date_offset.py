@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test per-patient date offsets"""
+
+import json
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from anonymizers.date_offset import DateOffsetTable, hmac_offset
+from anonymizers.pseudonym_store import open_store
+from safe_med_ui.batch import deidentify_jsonl_stream, deidentify_table_stream
+from safe_med_ui.io_utils import iter_jsonl
+from safe_text.safe_mdt import text_anonymize
+
+
+@pytest.fixture
+def engine(make_engine):
+    return make_engine(date_offsets=DateOffsetTable("secret"))
+
+
+def test_hmac_offset_is_keyed_and_bounded():
+    offsets = [hmac_offset("secret", f"P{i}", -30, -1) for i in range(200)]
+    assert all(-30 <= o <= -1 for o in offsets)
+    assert len(set(offsets)) > 10
+    assert hmac_offset("secret", "P1") == hmac_offset(b"secret", "P1")
+    assert [hmac_offset("other", f"P{i}") for i in range(20)] != [hmac_offset("secret", f"P{i}") for i in range(20)]
+
+
+def test_table_persists_and_handles_missing_ids(tmp_path):
+    db = str(tmp_path / "map.db")
+    with open_store(db) as store:
+        first = DateOffsetTable("secret", store=store).offsets_for(["P1", "P2", "P1", None, ""])
+    assert first[0] == first[2] == hmac_offset("secret", "P1") and first[3:] == [-100, -100]
+    with open_store(db) as store:
+        table = DateOffsetTable("secret", store=store)
+        assert len(store) == 2
+        assert table.offsets_for(["P2", "P1"]) == [first[1], first[0]]
+        # 换密钥后使用新的 namespace，不会取到旧偏移量
+        assert DateOffsetTable("new", store=store).namespace != table.namespace
+
+
+def _days(a, b):
+    return (date.fromisoformat(b) - date.fromisoformat(a)).days
+
+
+def test_pandas_missing_ids():
+    table = DateOffsetTable("secret")
+    ids = pd.Series(["P1", pd.NA, None], dtype="string")
+    assert table.offsets_for(ids) == [hmac_offset("secret", "P1"), -100, -100]
+    assert table.offsets_for(pd.Series(["P1", pd.NaT, float("nan")], dtype=object))[1:] == [-100, -100]
+
+
+def test_table_stream_keeps_intervals_within_patient(tmp_path, engine):
+    src = tmp_path / "in.csv"
+    pd.DataFrame({
+        "住院号": ["P1", "P1", "P2", "P2"],
+        "日期": ["2023-05-01", "2023-05-11", "2023-05-01", "2023-05-11"],
+        "备注": ["入院 2023-05-01 ", "出院 2023-05-11 ", "入院 2023-05-01 ", "出院 2023-05-11 "],
+    }).to_csv(src, index=False)
+    deidentify_table_stream(src, tmp_path / "out.csv", engine, chunksize=3, patient_column="住院号")
+    out = pd.read_csv(tmp_path / "out.csv", dtype=str)
+    p1, p2 = engine.date_offsets.offsets_for(["P1", "P2"])
+    assert _days("2023-05-01", out["日期"][0]) == p1 and _days("2023-05-01", out["日期"][2]) == p2
+    assert _days(out["日期"][0], out["日期"][1]) == _days(out["日期"][2], out["日期"][3]) == 10
+    assert out["备注"].str.strip().str[3:].tolist() == out["日期"].tolist()
+
+
+def test_jsonl_stream_per_patient(tmp_path, engine):
+    src = tmp_path / "in.jsonl"
+    rows = [{"pid": "P1", "note": "复查 2023-05-10 "}, {"note": "复查 2023-05-10 "}]
+    src.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in rows), encoding="utf-8")
+    deidentify_jsonl_stream(src, tmp_path / "out.jsonl", engine, patient_column="pid")
+    out = list(iter_jsonl(tmp_path / "out.jsonl"))
+    shifted = date(2023, 5, 10) + timedelta(days=engine.date_offsets.offset_for("P1"))
+    assert out[0]["note"] == f"复查 {shifted.isoformat()} "
+    assert out[1]["note"] == "复查 2023-01-30 "
+
+
+def test_text_anonymize_shift_days():
+    class Rules:
+        entity_types = ["DATE"]
+
+        def extract_entities(self, content):
+            return [{"entity_type": "DATE", "text": "2023-05-10", "start": 3, "end": 13}]
+
+    assert text_anonymize("就诊于2023-05-10", ner_rules=Rules(), shift_days=-10) == "就诊于2023-04-30"
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
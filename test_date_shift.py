@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test memoized and batched date shifting"""
+
+import pandas as pd
+import pytest
+
+from anonymizers.date_anonymizer import normalize_and_shift_date, shift_date, shift_dates
+from safe_med_ui.columns import deidentify_dataframe
+
+DATES = ["2023-05-10", "2023/5/10", "2024-02-29", "2023-02-29", "2023年3月1日", "1899-01-01", "就诊", None]
+
+
+def test_batch_matches_scalar():
+    expected = ["2023-01-30", "2023-01-30", "2023-11-21", None, "2022-11-21", None, None, None]
+    assert shift_dates(DATES) == expected
+    assert shift_dates(DATES, shift_days=10)[0] == shift_date(2023, 5, 10, shift_days=10) == "2023-05-20"
+    assert shift_dates([]) == []
+
+
+def test_batch_keeps_series_index():
+    values = pd.Series(DATES[:3], index=[7, 8, 9], name="就诊日期")
+    out = shift_dates(values)
+    assert isinstance(out, pd.Series)
+    assert out.index.tolist() == [7, 8, 9] and out.name == "就诊日期"
+
+
+def test_scalar_is_cached():
+    normalize_and_shift_date.cache_clear()
+    for _ in range(3):
+        assert normalize_and_shift_date("2025-10-01 11:20") == "2025-06-23"
+    info = normalize_and_shift_date.cache_info()
+    assert info.misses == 1 and info.hits == 2
+
+
+def test_date_column_matches_engine(make_fallback):
+    engine = make_fallback({"date": True})
+    df = pd.DataFrame({"就诊日期": ["2023-05-10", "2023/05/10", "2023-02-30", "2023-05-10 11:20", "不详"]})
+    fast, fast_stats = deidentify_dataframe(df, engine.deidentify, date_shift_days=engine.date_shift_days)
+    slow, slow_stats = deidentify_dataframe(df, engine.deidentify)
+    assert fast.values.tolist() == slow.values.tolist()
+    assert fast_stats == slow_stats
+
+    disabled = make_fallback({"date": False})
+    assert disabled.date_shift_days is None
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test DeidEngine.deidentify_many batching, ordering and aggregated stats"""
+
+import pytest
+
+from safe_med_ui.columns import deidentify_column, engine_deidentify
+from safe_med_ui.engine import DeidStats
+
+
+@pytest.fixture
+def engine(make_engine, sample_config):
+    return make_engine(*sample_config)
+
+
+def _texts(n=300):
+    return [f"患者{i} 于 2024-03-0{i % 9 + 1} 在协和医院就诊, 身份证 11010119900307{i % 50:04d}, 电话 1381234{i:04d}"
+            for i in range(n)]
+
+
+def _expected(engine, texts):
+    stats = DeidStats()
+    outputs = []
+    for text in texts:
+        out, s, _ = engine.deidentify_text(text)
+        outputs.append(out)
+        stats.add(s)
+    return outputs, stats
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"workers": 4, "chunk_size": 16},
+                                    {"workers": 2, "chunk_size": 64, "backend": "process"}])
+def test_matches_one_call_per_text(kwargs, engine):
+    texts = _texts()
+    expected, expected_stats = _expected(engine, texts)
+    outputs, stats = engine.deidentify_many(iter(texts), **kwargs)
+    assert list(outputs) == expected
+    assert stats == expected_stats and stats.total == sum(expected_stats.values())
+
+
+def test_thread_workers_share_one_mapping(engine):
+    outputs, _ = engine.deidentify_many(_texts(), workers=4, chunk_size=8)
+    list(outputs)
+    # 50 个不同的身份证号，各线程写入同一个映射存储
+    assert len(engine.fallback.hash_mapping) == 50
+
+
+def test_per_item_shift_and_weights(engine):
+    outputs, stats = engine.deidentify_many(["2024-03-10", "2024-03-10"], shift_days=[0, 10], weights=[2, 3])
+    assert list(outputs) == ["2024-03-10", "2024-03-20"]
+    assert stats == {"date": 5}
+
+
+def test_column_values_go_through_batch_api(engine):
+    import pandas as pd
+
+    values = pd.Series(["电话：13812345678", "电话：13812345678", "", "协和医院"])
+    calls = []
+    deidentify = engine_deidentify(engine)
+    many = deidentify.many
+    deidentify.many = lambda texts, **kw: calls.append(list(texts)) or many(texts, **kw)
+    out, stats = deidentify_column(values, deidentify)
+    assert calls == [["电话：13812345678", "协和医院"]]
+    assert list(out) == ["电话：[PHONE]", "电话：[PHONE]", "", "[HOSPITAL]"]
+    assert stats == {"phone": 2, "hospital_dict": 1}
+
+
+def test_unknown_backend(engine):
+    with pytest.raises(ValueError):
+        engine.deidentify_many(["x"], backend="gpu")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test format-preserving in-place DOCX de-identification"""
+
+from pathlib import Path
+
+import pytest
+from docx import Document
+
+from safe_med_ui.batch import process_file
+from safe_med_ui.docx_rewrite import SEPARATOR, deidentify_texts, paragraph_texts, rewrite_runs
+
+CATEGORIES = {"hospital_dict": True, "phone": True, "date": True, "surnames": True}
+TERMS = {"hospitals": ["北京协和医院"], "surnames": ["张", "李"]}
+
+
+class CountingEngine:
+    def __init__(self, engine):
+        self.engine = engine
+        self.calls = 0
+
+    def deidentify_text(self, text, shift_days=None):
+        self.calls += 1
+        return self.engine.deidentify_text(text, shift_days)
+
+
+@pytest.fixture
+def engine(make_engine):
+    return make_engine(TERMS, CATEGORIES)
+
+
+def build_sample(path: Path):
+    doc = Document()
+    section = doc.sections[0]
+    section.header.paragraphs[0].text = "北京协和医院 出院小结"
+    section.footer.paragraphs[0].text = "咨询电话 13800138000"
+    para = doc.add_paragraph("姓名：")
+    bold = para.add_run("张")
+    bold.bold = True
+    para.add_run("三，入院 2023-12-15 ")
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "联系电话"
+    table.cell(0, 1).text = "13900139000"
+    doc.save(str(path))
+
+
+def test_rewrite_runs_keeps_unchanged_runs():
+    doc = Document()
+    para = doc.add_paragraph("就诊于")
+    para.add_run("北京协和")
+    para.add_run("医院，").italic = True
+    rewrite_runs(para.runs, "就诊于[HOSPITAL]，")
+    assert [r.text for r in para.runs] == ["就诊于", "[HOSPITAL]", "，"]
+    # 未改动的字符保留原 run（及其格式）
+    assert para.runs[2].italic
+
+
+def test_texts_deidentified_in_one_call(engine):
+    counting = CountingEngine(engine)
+    out, stats = deidentify_texts(["电话 13800138000", "", "北京协和医院"], counting)
+    assert out == ["电话 [PHONE]", "", "[HOSPITAL]"]
+    assert stats == {"phone": 1, "hospital_dict": 1}
+    assert counting.calls == 1
+
+
+def test_separator_change_falls_back_to_per_paragraph():
+    class Stripping:
+        def deidentify_text(self, text, shift_days=None):
+            return text.replace(SEPARATOR, "").upper(), {"x": 1}, "fake"
+
+    out, stats = deidentify_texts(["ab", "cd"], Stripping())
+    assert out == ["AB", "CD"]
+    assert stats == {"x": 2}
+
+
+def test_process_file_rewrites_body_tables_headers_and_footers(tmp_path, engine):
+    src = tmp_path / "in" / "note.docx"
+    src.parent.mkdir()
+    build_sample(src)
+    stats, rows = process_file(src, src.parent, tmp_path / "out", engine)
+    assert rows == 0
+    assert stats == {"hospital_dict": 1, "phone": 2, "date": 1, "surnames": 1}
+
+    doc = Document(str(tmp_path / "out" / "note.docx"))
+    texts = paragraph_texts(doc)
+    assert texts[0] == "姓名：张某，入院 2023-09-06 "
+    assert "[PHONE]" in texts
+    assert doc.sections[0].header.paragraphs[0].text == "[HOSPITAL] 出院小结"
+    assert doc.sections[0].footer.paragraphs[0].text == "咨询电话 [PHONE]"
+    # 跨 run 的姓名：姓氏所在的加粗 run 保留格式
+    runs = doc.paragraphs[0].runs
+    assert runs[1].bold and runs[1].text == "张"
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
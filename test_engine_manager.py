@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test session engine reuse and rebuild on config change"""
+
+import copy
+
+import pytest
+
+from safe_med_ui.engine import EngineManager, config_fingerprint
+
+
+@pytest.fixture
+def get(sample_config):
+    """按 sample_config 从 manager 取引擎，terms/categories 可单独覆盖"""
+    terms, categories = sample_config
+
+    def get(manager, custom_terms=None, enable_categories=None):
+        return manager.get(terms if custom_terms is None else custom_terms,
+                           categories if enable_categories is None else enable_categories,
+                           prefer_native_safe_med=False)
+    return get
+
+
+def test_engine_reused_while_config_unchanged(get, sample_config):
+    manager = EngineManager()
+    engine = get(manager)
+    assert get(manager, *copy.deepcopy(sample_config)) is engine
+    assert manager.builds == 1
+
+
+def test_rebuild_on_terms_or_toggle_change(get, sample_config):
+    manager = EngineManager()
+    terms, categories = sample_config
+    first = get(manager)
+    # UI 中词典是原地修改的
+    terms["hospitals"].append("仁济医院")
+    second = get(manager, terms)
+    assert second is not first
+    out, _, _ = second.deidentify_text("就诊于仁济医院")
+    assert "仁济医院" not in out
+    # 旧引擎持有的是快照，不受后续修改影响
+    assert first.custom_terms["hospitals"] == ["协和医院"]
+
+    third = get(manager, terms, dict(categories, phone=False))
+    assert third is not second
+    assert manager.builds == 3
+
+
+def test_hash_mapping_survives_rebuild(get):
+    manager = EngineManager()
+    text = "身份证 110101199003074518"
+    out1, _, _ = get(manager).deidentify_text(text)
+    out2, _, _ = get(manager, {"hospitals": ["华山医院"]}).deidentify_text(text)
+    assert manager.builds == 2
+    assert out1 == out2
+
+
+def test_fingerprint_ignores_key_order():
+    a = config_fingerprint({"a": ["1"], "b": ["2"]}, {"x": True, "y": False}, mode="tag")
+    b = config_fingerprint({"b": ["2"], "a": ["1"]}, {"y": False, "x": True}, mode="tag")
+    assert a == b
+    assert a != config_fingerprint({"a": ["1"], "b": ["2"]}, {"x": True, "y": False}, mode="mask")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test streaming JSONL read / de-identify / write"""
+
+import json
+
+from safe_med_ui.batch import deidentify_jsonl_stream
+from safe_med_ui.io_utils import JsonlWriter, iter_jsonl, load_file
+
+
+def test_writer_flushes_in_batches(tmp_path):
+    out = tmp_path / "rows.jsonl"
+    with JsonlWriter(out, flush_rows=3) as w:
+        for i in range(7):
+            w.write({"i": i})
+        assert w.rows_written == 6
+    assert [r["i"] for r in iter_jsonl(out)] == list(range(7))
+
+
+def test_load_file_max_rows(tmp_path):
+    src = tmp_path / "in.jsonl"
+    src.write_text("\n".join(json.dumps({"i": i}) for i in range(50)) + "\n", encoding="utf-8")
+    loaded = load_file(str(src), max_rows=10)
+    assert len(loaded.jsonl_rows) == 10 and loaded.truncated
+    assert not load_file(str(src)).truncated
+
+
+def test_load_xls_ignores_max_rows(tmp_path, monkeypatch):
+    # xls 导出时不分块重读，预览加载也必须是全部行，否则只会写出前 max_rows 行
+    import pandas as pd
+
+    calls = []
+
+    def fake_read_excel(path, **kwargs):
+        calls.append(kwargs)
+        return pd.DataFrame({"备注": [f"第{i}行" for i in range(300)]}).head(kwargs.get("nrows"))
+
+    monkeypatch.setattr(pd, "read_excel", fake_read_excel)
+    src = tmp_path / "in.xls"
+    src.write_bytes(b"")
+    loaded = load_file(str(src), max_rows=200)
+    assert len(loaded.df) == 300 and not loaded.truncated
+    assert "nrows" not in calls[0]
+    assert load_file(str(tmp_path / "in.xlsx"), max_rows=200).truncated
+
+
+def test_stream_deidentify(tmp_path, make_engine):
+    src = tmp_path / "in.jsonl"
+    rows = [{"备注": f"电话 13812345678 第{i}行", "n": i} for i in range(25)]
+    src.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in rows), encoding="utf-8")
+    result = deidentify_jsonl_stream(src, tmp_path / "out" / "in.jsonl", make_engine(), flush_rows=4)
+    assert result.rows == 25
+    assert result.stats == {"phone": 25}
+    out_rows = list(iter_jsonl(tmp_path / "out" / "in.jsonl"))
+    assert out_rows[3] == {"备注": "电话 [PHONE] 第3行", "n": 3}
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test incremental batch processing with the content-hash manifest"""
+
+import os
+from pathlib import Path
+
+from safe_med_ui.batch import BatchJob, output_fingerprint, run_batch, scan_filter_for
+from safe_med_ui.manifest import MANIFEST_NAME, Manifest
+from safe_med_ui.scanner import ScanFilter
+
+
+def _job(tmp_path: Path, **kwargs) -> BatchJob:
+    return BatchJob(
+        input_base=tmp_path / "in",
+        output_base=tmp_path / "out",
+        custom_terms={"hospitals": ["北京协和医院"]},
+        enable_categories={"phone": True, "hospital_dict": True},
+        prefer_native_safe_med=False,
+        manifest_path=str(tmp_path / "out" / MANIFEST_NAME),
+        **kwargs,
+    )
+
+
+def _write_inputs(tmp_path: Path):
+    (tmp_path / "in" / "sub").mkdir(parents=True)
+    (tmp_path / "in" / "a.txt").write_text("电话 13812345678", encoding="utf-8")
+    (tmp_path / "in" / "sub" / "b.txt").write_text("就诊于北京协和医院", encoding="utf-8")
+
+
+def test_rerun_skips_unchanged_files(tmp_path):
+    _write_inputs(tmp_path)
+    first = run_batch(_job(tmp_path), workers=1)
+    assert (first.succeeded, first.skipped) == (2, 0)
+    with Manifest(tmp_path / "out" / MANIFEST_NAME) as manifest:
+        assert len(manifest) == 2
+        assert manifest.get("a.txt").stats == {"phone": 1}
+
+    second = run_batch(_job(tmp_path), workers=1)
+    assert (second.succeeded, second.skipped) == (0, 2)
+
+    # 内容改变 → 重新处理；只 touch 不改内容 → 仍跳过
+    (tmp_path / "in" / "a.txt").write_text("电话 13912345678 和 13712345678", encoding="utf-8")
+    b = tmp_path / "in" / "sub" / "b.txt"
+    os.utime(b, ns=(b.stat().st_atime_ns, b.stat().st_mtime_ns + 10 ** 9))
+    third = run_batch(_job(tmp_path), workers=1)
+    assert (third.succeeded, third.skipped) == (1, 1)
+    assert third.stats == {"phone": 2}
+    assert run_batch(_job(tmp_path), workers=1).skipped == 2
+
+
+def test_config_change_deleted_output_or_force_reprocess(tmp_path):
+    _write_inputs(tmp_path)
+    run_batch(_job(tmp_path), workers=1)
+    assert run_batch(_job(tmp_path, replacement_mode="mask"), workers=1).succeeded == 2
+
+    (tmp_path / "out" / "a.txt").unlink()
+    result = run_batch(_job(tmp_path, replacement_mode="mask"), workers=1)
+    assert (result.succeeded, result.skipped) == (1, 1)
+
+    assert run_batch(_job(tmp_path, replacement_mode="mask"), workers=1, force=True).succeeded == 2
+
+
+def test_failed_files_are_retried(tmp_path):
+    _write_inputs(tmp_path)
+    bad = tmp_path / "in" / "bad.json"
+    bad.write_text("{not json", encoding="utf-8")
+    first = run_batch(_job(tmp_path), workers=1)
+    assert (first.succeeded, first.failed) == (2, 1)
+
+    # 只有失败的文件重新处理（相当于从未完成的文件继续）
+    bad.write_text('{"电话": "13812345678"}', encoding="utf-8")
+    second = run_batch(_job(tmp_path), workers=1)
+    assert (second.succeeded, second.failed, second.skipped) == (1, 0, 2)
+
+
+def test_ui_and_cli_share_fingerprint(tmp_path):
+    # 界面按相同配置计算的指纹能识别命令行写入的记录，交替使用时不重复处理
+    _write_inputs(tmp_path)
+    job = _job(tmp_path)
+    run_batch(job, workers=1)
+    ui_fingerprint = output_fingerprint(job.custom_terms, job.enable_categories, replacement_mode="tag",
+                                        prefer_native_safe_med=False, native_entry_point=None)
+    assert ui_fingerprint == job.fingerprint()
+    with Manifest(tmp_path / "out" / MANIFEST_NAME) as manifest:
+        a = tmp_path / "in" / "a.txt"
+        assert manifest.is_current("a.txt", a, ui_fingerprint, tmp_path / "out" / "a.txt")
+    assert output_fingerprint(job.custom_terms, job.enable_categories, date_shift_key="k") != ui_fingerprint
+
+
+def test_output_inside_input_is_not_rescanned(tmp_path):
+    _write_inputs(tmp_path)
+    job = _job(tmp_path, scan_filter=ScanFilter(exclude=["*.bak"]))
+    job.output_base = tmp_path / "in" / "out[1]"
+    job.manifest_path = None
+    for workers in (1, 2):
+        summary = run_batch(job, workers=workers)
+        assert (summary.files, summary.succeeded) == (2, 2)
+    assert sorted(p.relative_to(job.output_base).as_posix() for p in job.output_base.rglob("*.txt")) == \
+        ["a.txt", "sub/b.txt"]
+    assert scan_filter_for(job).exclude == ["*.bak", "out[[]1]"]
+    # 输出目录在输入目录之外时不改动过滤条件
+    assert scan_filter_for(_job(tmp_path)).exclude == ()
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
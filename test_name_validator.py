@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test cached, batched name validation"""
+
+from pathlib import Path
+
+from ner.name_validator import NameValidator
+
+CANDIDATES = ["患者张三", "陈佛平主治医师", "患者从外院", "姓名:谢梓莹", "医生签名", "患者张三"]
+
+
+def test_batched_matches_single():
+    validator = NameValidator()
+    unique = list(dict.fromkeys(CANDIDATES))
+    assert validator.tag_many(unique) == [validator._tag_one(w) for w in unique]
+
+
+def test_memo_hits():
+    validator = NameValidator()
+    first = validator.validate_many(CANDIDATES)
+    assert len(first) == len(CANDIDATES) and first[0] == first[-1]
+    assert validator.misses == len(set(CANDIDATES))
+    assert validator.validate_many(CANDIDATES) == first
+    assert validator.misses == len(set(CANDIDATES))
+
+
+def test_lru_bound_and_cache_file(tmp_path):
+    path = str(tmp_path / "names.json")
+    validator = NameValidator(maxsize=3, cache_path=path)
+    validator.validate_many(CANDIDATES)
+    assert len(validator) == 3
+    validator.save_cache()
+
+    restored = NameValidator(cache_path=path)
+    assert len(restored) == 3
+    restored._posseg = None  # 缓存命中时不应触发 jieba
+    restored.validate_many(list(restored._memo))
+    assert restored._pseg is None and restored.misses == 0
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_batched_matches_single()
+    test_memo_hits()
+    with tempfile.TemporaryDirectory() as d:
+        test_lru_bound_and_cache_file(Path(d))
+    print("✓ 姓名校验测试通过")
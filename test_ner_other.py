@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the single-pass OTHER-entity scanner in NERRules"""
+
+import json
+import random
+import re
+from pathlib import Path
+
+from benchmarks.corpus import CorpusGenerator
+from ner.ner_rules import DEFAULT_OTHER_RULES, NERRules, get_ner_rules, load_other_rules
+
+FRAGMENTS = ["身份证：", "证件号:", "身份证件号：", "电话：", "手机:", "医保号：", "住院号：", "挂号：", "报告号：", "床号：",
+             "腾讯会议号：", "会议号：", "检查", "123456789012345678", "13812345678", "010-12345678", "AB12CD34EF", "12", " ", "，"]
+
+
+def _per_rule_scan(rules, text):
+    """逐条规则全文扫描（旧实现），作为对照"""
+    out = []
+    for rule in rules:
+        pattern = re.compile("(?:" + "|".join(map(re.escape, rule["keywords"])) + ")" + rule["pattern"])
+        out.extend((m.start(), m.end()) for m in pattern.finditer(text))
+    return out
+
+
+def _rules(tmp_path, **kwargs):
+    return NERRules(**CorpusGenerator(seed=0, n_hospitals=20).write_ner_dicts(tmp_path / "dicts"), **kwargs)
+
+
+def test_matches_per_rule_scan(tmp_path):
+    rules = _rules(tmp_path)
+    rng = random.Random(5)
+    text = "".join(rng.choice(FRAGMENTS) for _ in range(3000))
+    got = [(e["start"], e["end"]) for e in rules.extract_other("OTHER", text)]
+    assert got == _per_rule_scan(DEFAULT_OTHER_RULES, text)
+
+
+def test_overlapping_keywords(tmp_path):
+    # “会议号”是“腾讯会议号”的后缀，“检查”是“检查号”的前缀
+    extra = [{"name": "meeting_id", "keywords": ["会议号"], "pattern": r"[：:]\s*(\d{6,12})"},
+             {"name": "exam", "keywords": ["检查"], "pattern": r"号?[：:]\s*([A-Z0-9]{8,20})"}]
+    other_rules = DEFAULT_OTHER_RULES + extra
+    rules = _rules(tmp_path, other_rules=other_rules)
+    texts = [e["text"] for e in rules.extract_other("OTHER", "身份证件号：110101900101123")]
+    assert texts == ["证件号：110101900101123"]
+    texts = [e["text"] for e in rules.extract_other("OTHER", "腾讯会议号：123456，检查号：AB12CD34EF")]
+    assert texts == ["腾讯会议号：123456", "检查号：AB12CD34EF", "会议号：123456", "检查号：AB12CD34EF"]
+
+    rng = random.Random(7)
+    text = "".join(rng.choice(FRAGMENTS) for _ in range(3000))
+    got = [(e["start"], e["end"]) for e in rules.extract_other("OTHER", text)]
+    assert got == _per_rule_scan(other_rules, text)
+
+
+def test_no_compile_per_call(tmp_path):
+    rules = _rules(tmp_path)
+    before = rules.compile_count
+    rules.extract_other("OTHER", "住院号：123456，床号：12")
+    assert rules.compile_count == before
+
+
+def test_extend_from_config(tmp_path):
+    config = tmp_path / "other_rules.json"
+    config.write_text(json.dumps([
+        {"name": "specimen_no", "keywords": ["标本号"], "pattern": r"[：:]\s*([A-Z0-9]{6,12})"},
+        {"name": "bed_no", "keywords": ["床号", "床位"], "pattern": r"[：:]\s*(\d{1,3})"},
+    ], ensure_ascii=False), encoding="utf-8")
+    rules = load_other_rules(str(config))
+    assert [r["name"] for r in rules][-1] == "specimen_no" and len(rules) == len(DEFAULT_OTHER_RULES) + 1
+
+    paths = CorpusGenerator(seed=0, n_hospitals=20).write_ner_dicts(tmp_path / "dicts")
+    ner = get_ner_rules(*paths.values(), other_rules_path=str(config))
+    texts = [e["text"] for e in ner.extract_other("OTHER", "标本号：S12345X，床位：12，住院号：1234567")]
+    assert texts == ["住院号：1234567", "床位：12", "标本号：S12345X"]
+
+
+if __name__ == "__main__":
+    import tempfile
+    for fn in (test_matches_per_rule_scan, test_overlapping_keywords, test_no_compile_per_call, test_extend_from_config):
+        with tempfile.TemporaryDirectory() as d:
+            fn(Path(d))
+    print("✓ OTHER 实体扫描测试通过")
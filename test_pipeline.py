@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the bounded read → process → write pipeline"""
+
+import threading
+import time
+from pathlib import Path
+
+from safe_med_ui.batch import process_file, run_file_pipeline
+from safe_med_ui.pipeline import Pipeline, PipelineMetrics
+
+
+def test_every_item_flows_through_all_stages():
+    written = []
+    pipeline = Pipeline(lambda x: x * 2, lambda x, v: v + 1, lambda x, v: written.append(v) or v,
+                        readers=3, workers=2, writers=2, queue_size=2)
+    metrics = PipelineMetrics()
+    results = list(pipeline.run(range(50), metrics))
+    assert sorted(r.item for r in results) == list(range(50))
+    assert all(r.ok and r.value == r.item * 2 + 1 for r in results)
+    assert sorted(written) == [x * 2 + 1 for x in range(50)]
+    assert metrics.snapshot()["processed"] == {"read": 50, "process": 50, "write": 50}
+
+
+def test_errors_are_per_item_and_skip_later_stages():
+    def process(x, v):
+        if x == 3:
+            raise ValueError("bad")
+        return v
+
+    written = []
+    results = {r.item: r for r in Pipeline(lambda x: x, process, lambda x, v: written.append(x)).run(range(6))}
+    assert results[3].error == "ValueError: bad" and results[3].stage == "process"
+    assert sorted(written) == [0, 1, 2, 4, 5]
+
+
+def test_bounded_queues_apply_backpressure():
+    # 写出很慢时，读取不会把所有文件提前读入内存
+    read = []
+    lock = threading.Lock()
+
+    def reader(x):
+        with lock:
+            read.append(x)
+        return x
+
+    metrics = PipelineMetrics()
+    pipeline = Pipeline(reader, lambda x, v: v, lambda x, v: time.sleep(0.02), readers=1, workers=1,
+                        writers=1, queue_size=2)
+    results = pipeline.run(range(100), metrics)
+    next(results)
+    time.sleep(0.1)
+    assert len(read) < 20
+    results.close()
+    assert all(depth <= 2 for depth in metrics.max_depth.values())
+    assert metrics.stages["process"].blocked_seconds > 0
+
+
+def test_file_pipeline_matches_process_file(tmp_path, make_engine):
+    src = tmp_path / "in"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.txt").write_text("患者电话13812345678，邮箱 zhang@example.com", encoding="utf-8")
+    (src / "sub" / "b.jsonl").write_text('{"note": "电话13912345678"}\n', encoding="utf-8")
+    (src / "c.csv").write_text("note\n电话13712345678\n", encoding="utf-8")
+    files = sorted(p for p in src.rglob("*") if p.is_file())
+    engine = make_engine({})
+
+    results = {r.rel_path: r for r in run_file_pipeline(files, src, tmp_path / "piped", engine, record_state=True)}
+    for file_path in files:
+        stats, rows = process_file(file_path, src, tmp_path / "direct", engine)
+        result = results[file_path.relative_to(src).as_posix()]
+        assert not result.error and result.stats == stats and result.rows == rows
+        assert result.size == file_path.stat().st_size and len(result.sha256) == 64
+        rel = file_path.relative_to(src)
+        assert (tmp_path / "piped" / rel).read_bytes() == (tmp_path / "direct" / rel).read_bytes()
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test pseudonym stores (memory / SQLite / LRU front)"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from anonymizers.id_anonymizer import get_hash, get_hash_many, hash_code
+from anonymizers.name_anonymizer import hash_name, hash_name_many
+from anonymizers.pseudonym_store import LRUStore, MemoryStore, PseudonymStore, SQLiteStore, open_store
+from safe_med_ui.rule_fallback import FallbackRuleEngine
+
+
+def _claim(args):
+    path, tag = args
+    store = open_store(path)
+    return store.get_or_create_many([str(i) for i in range(200)], lambda k: f"{tag}_{k}", namespace="ID")
+
+
+def test_first_writer_wins_in_memory():
+    store = MemoryStore()
+    assert store.put_many({"a": "1"}) == {"a": "1"}
+    assert store.put_many({"a": "2", "b": "3"}) == {"a": "1", "b": "3"}
+    assert store["a"] == "1" and "b" in store and "c" not in store
+    assert store.get_many(["a"], namespace="other") == {}
+
+
+def test_incomplete_store_fails_on_creation():
+    class NoLen(PseudonymStore):
+        def get_many(self, keys, namespace=""):
+            return {}
+
+        def put_many(self, mapping, namespace=""):
+            return dict(mapping)
+
+    with pytest.raises(TypeError):
+        PseudonymStore()
+    with pytest.raises(TypeError):
+        NoLen()
+
+
+def test_sqlite_persists_and_namespaces(tmp_path):
+    db = tmp_path / "map.db"
+    with SQLiteStore(db) as store:
+        store.put_many({"110101197812345678": "ID_x"}, namespace="ID")
+    with SQLiteStore(db) as store:
+        assert store.get_many(["110101197812345678", "nope"], namespace="ID") == {"110101197812345678": "ID_x"}
+        assert store.get_many(["110101197812345678"]) == {}
+        assert len(store) == 1
+
+
+def test_processes_agree(tmp_path):
+    db = str(tmp_path / "shared.db")
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(_claim, [(db, f"w{i}") for i in range(4)]))
+    assert all(r == results[0] for r in results)
+    assert len(SQLiteStore(db)) == 200
+
+
+def test_lru_front_is_bounded(tmp_path):
+    store = LRUStore(SQLiteStore(tmp_path / "lru.db"), maxsize=10)
+    codes = store.get_or_create_many([str(i) for i in range(100)], lambda k: "v" + k)
+    assert len(codes) == 100 and len(store._cache) == 10
+    assert store.get_many(["0", "99"]) == {"0": "v0", "99": "v99"}
+
+
+def test_hash_helpers_and_engine_use_store():
+    store = MemoryStore()
+    assert get_hash("123", store=store) == get_hash("123")
+    assert hash_name("张三", store=store) == hash_name("张三")
+    store.put_many({"110101197812345678": "ID_fixed"}, namespace="ID")
+    engine = FallbackRuleEngine(custom_terms={}, enable_categories={}, hash_mapping=store)
+    out, _ = engine.deidentify("身份证：110101197812345678，110101197812345678")
+    assert out == "身份证：ID_fixed，ID_fixed"
+
+
+def test_batch_hash_matches_single_values():
+    values = ["123", None, "", float("nan"), "123", 45]
+    assert get_hash_many(values) == [get_hash(v) if v == v else "" for v in values]
+    names = pd.Series(["张三", "李四", "张三"], index=[7, 8, 9])
+    out = hash_name_many(names)
+    assert out.index.tolist() == [7, 8, 9] and out.tolist() == [hash_name(n) for n in names]
+
+    hash_code.cache_clear()
+    get_hash_many(["a", "b", "a", "a"])
+    assert hash_code.cache_info().misses == 2
+    assert get_hash("a") == get_hash_many(["a"])[0] and hash_code.cache_info().hits >= 1
+
+
+def test_batch_hash_nullable_string_series():
+    # pd.NA 不能求布尔值，应与 None 一样视为空
+    ids = pd.Series(["a", None, "a"], dtype="string")
+    assert get_hash_many(ids).tolist() == [get_hash("a"), "", get_hash("a")]
+    names = pd.Series(["张三", pd.NA], dtype="string", index=[3, 4])
+    out = hash_name_many(names)
+    assert out.index.tolist() == [3, 4] and out.tolist() == [hash_name("张三"), ""]
+    assert get_hash_many([pd.NA, pd.NaT, "b"]) == ["", "", get_hash("b")]
+
+
+def test_keyed_hash_uses_separate_namespace():
+    store = MemoryStore()
+    plain = get_hash_many(["123", "456"], store=store)
+    keyed = get_hash_many(["123", "456"], store=store, key="secret")
+    assert keyed != plain and keyed == [get_hash(v, key="secret") for v in ["123", "456"]]
+    assert get_hash("123", store=store) == plain[0] and len(store) == 4
+    assert hash_name("张三", key="secret") != hash_name("张三", key="other")
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_first_writer_wins_in_memory()
+    test_incomplete_store_fails_on_creation()
+    for fn in (test_sqlite_persists_and_namespaces, test_processes_agree, test_lru_front_is_bounded):
+        with tempfile.TemporaryDirectory() as d:
+            fn(Path(d))
+    test_hash_helpers_and_engine_use_store()
+    test_batch_hash_matches_single_values()
+    test_batch_hash_nullable_string_series()
+    test_keyed_hash_uses_separate_namespace()
+    print("✓ 假名存储测试通过")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test native entry-point discovery caching"""
+
+import pytest
+
+from safe_med_ui import safe_med_adapter
+from safe_med_ui.engine import DeidEngine
+from safe_med_ui.safe_med_adapter import SafeMedAdapter, clear_discovery_cache, load_entry_point
+
+
+def fake_deidentify(text, **kwargs):
+    return text.replace("张三", "[NAME]"), {"name": 1}
+
+
+class FakeEngine:
+    def run(self, text, **kwargs):
+        return text.upper()
+
+
+def test_scan_runs_once_per_process(monkeypatch):
+    calls = []
+    monkeypatch.setattr(SafeMedAdapter, "_scan", staticmethod(lambda: calls.append(1) or (False, None, "")))
+    clear_discovery_cache()
+    for _ in range(3):
+        assert not SafeMedAdapter().discover().found
+    assert len(calls) == 1
+    SafeMedAdapter().discover(refresh=True)
+    assert len(calls) == 2
+    clear_discovery_cache()
+
+
+def test_entry_point_from_config():
+    assert load_entry_point("test_safe_med_adapter:FakeEngine.run")("ab") == "AB"
+    adapter = SafeMedAdapter(entry_point="test_safe_med_adapter:fake_deidentify").discover()
+    assert adapter.found and adapter.where == "test_safe_med_adapter:fake_deidentify"
+    assert adapter.deidentify("张三") == ("[NAME]", {"name": 1})
+    # 显式配置的入口加载失败时报错，而不是静默退回规则引擎
+    for spec in ("no_such_module:fn", "test_safe_med_adapter:no_such_fn"):
+        with pytest.raises(RuntimeError, match=spec):
+            SafeMedAdapter(entry_point=spec).discover()
+        with pytest.raises(RuntimeError):
+            DeidEngine(custom_terms={}, enable_categories={}, native_entry_point=spec)
+    assert not SafeMedAdapter(entry_point="").discover().found
+
+
+def test_engine_skips_discovery_without_native(monkeypatch):
+    monkeypatch.setattr(safe_med_adapter, "_DISCOVERY_CACHE", {})
+    engine = DeidEngine(custom_terms={}, enable_categories={}, prefer_native_safe_med=False)
+    assert not engine.adapter.found and safe_med_adapter._DISCOVERY_CACHE == {}
+
+    engine = DeidEngine(custom_terms={}, enable_categories={},
+                        native_entry_point="test_safe_med_adapter:fake_deidentify")
+    out, stats, backend = engine.deidentify_text("患者张三")
+    assert out == "患者[NAME]" and backend == "safe_med_native:test_safe_med_adapter:fake_deidentify"
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test the parallel streaming directory scanner"""
+
+from pathlib import Path
+
+from safe_med_ui.io_utils import scan_text_files
+from safe_med_ui.scanner import TEXT_EXTS, ScanFilter, iter_file_batches
+
+
+def _make_tree(root: Path, n_dirs: int = 6, per_dir: int = 5):
+    for d in range(n_dirs):
+        sub = root / f"d{d}" / "inner"
+        sub.mkdir(parents=True)
+        for i in range(per_dir):
+            (sub / f"f{i}.txt").write_text("x" * (i + 1), encoding="utf-8")
+        (sub / "skip.pdf").write_bytes(b"%PDF")
+    (root / "top.docx").write_bytes(b"not really a docx")
+    (root / "archive").mkdir()
+    (root / "archive" / "old.txt").write_text("old", encoding="utf-8")
+
+
+def test_matches_rglob_in_any_worker_count(tmp_path):
+    _make_tree(tmp_path)
+    expected = sorted(p for p in tmp_path.rglob("*") if p.is_file() and p.suffix.lower() in TEXT_EXTS)
+    assert scan_text_files(tmp_path) == expected
+    for workers in (1, 4):
+        batches = list(iter_file_batches(tmp_path, workers=workers, batch_size=7))
+        assert all(len(b) >= 7 for b in batches[:-1])
+        assert sorted(p for b in batches for p in b) == expected
+
+
+def test_include_exclude_and_size_filters(tmp_path):
+    _make_tree(tmp_path)
+    only_docx = scan_text_files(tmp_path, ScanFilter(include=["*.docx"]))
+    assert only_docx == [tmp_path / "top.docx"]
+
+    no_archive = scan_text_files(tmp_path, ScanFilter(exclude=["archive"]))
+    assert tmp_path / "archive" / "old.txt" not in no_archive
+    assert len(no_archive) == 31
+
+    sized = scan_text_files(tmp_path, ScanFilter(min_size=2, max_size=3, include=["d0/*"]))
+    assert [p.name for p in sized] == ["f1.txt", "f2.txt"]
+
+
+def test_consumer_can_stop_early(tmp_path):
+    _make_tree(tmp_path, n_dirs=20)
+    batches = iter_file_batches(tmp_path, workers=4, batch_size=3)
+    first = next(batches)
+    batches.close()
+    assert len(first) >= 3
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test span-based single-pass rewriting"""
+
+import pytest
+
+from ner.spans import Span, apply_spans, resolve_overlaps
+from safe_med_ui.rule_fallback import FallbackRuleEngine
+
+
+def test_resolve_by_priority_then_length():
+    spans = [
+        Span(0, 4, "surnames", "张某", 20),
+        Span(2, 8, "hospital_dict", "[HOSPITAL]", 30),
+        Span(9, 11, "departments", "[DEPARTMENT]", 30),
+        Span(9, 12, "departments", "[DEPARTMENT]", 30),
+    ]
+    accepted = resolve_overlaps(spans)
+    assert [(s.start, s.end) for s in accepted] == [(2, 8), (9, 12)]
+
+
+def test_apply_only_rewrites_detected_spans():
+    text = "张三，张三"
+    out, accepted = apply_spans(text, [Span(0, 2, "surnames", "张某")])
+    assert out == "张某，张三"
+    assert len(accepted) == 1
+
+
+def test_fallback_engine_stats_follow_accepted_spans(make_fallback):
+    engine = make_fallback({"surnames": True, "hospital_dict": True, "date": True, "id_like": True})
+    text = "姓名：张三\n就诊医院：北京协和医院\n日期：2023-12-15\n身份证：110101197812345678"
+    out, stats = engine.deidentify(text)
+    assert out == "姓名：张某\n就诊医院：[HOSPITAL]\n日期：2023-09-06\n身份证：ID_dc567e46"
+    assert stats == {"surnames": 1, "hospital_dict": 1, "date": 1, "id_like": 1}
+
+
+def test_fallback_date_shift_uses_match_groups():
+    engine = FallbackRuleEngine(custom_terms={}, enable_categories={})
+    out, stats = engine.deidentify("就诊 2023/05/10 ，复查 2023-02-30 ，出院 2023年3月1日")
+    # 斜杠日期同样偏移；不合法的日期替换为标签而不是抛异常
+    assert out == "就诊 2023-01-30 ，复查 [DATE] ，出院 2022-11-21"
+    assert stats == {"date": 3}
+
+
+def test_doctor_title_single_pattern_keeps_matched_title():
+    engine = FallbackRuleEngine(custom_terms={}, enable_categories={"doctor_title": True})
+    out, stats = engine.deidentify("李四主任医师查房，王五副主任医师会诊，陈佛平护士长")
+    assert out == "某某主任医师查房，某某副主任医师会诊，某某护士长"
+    assert stats == {"doctor_title": 3}
+
+
+def test_doctor_titles_from_custom_terms():
+    engine = FallbackRuleEngine(custom_terms={"doctor_titles": ["主治", "医生", "主治医师"]},
+                                enable_categories={"doctor_title": True})
+    # 职称词本身不会被当作姓名
+    out, _ = engine.deidentify("主治医生：李四主治医师")
+    assert out == "主治医生：某某主治医师"
+    # 不在 doctor_titles 中的职称不再匹配
+    assert engine.deidentify("王五护士长")[0] == "王五护士长"
+
+
+def test_doctor_title_with_shipped_config_leaves_generic_words(make_fallback):
+    engine = make_fallback({"doctor_title": True})
+    # 医生/主任/患者 等普通名词不作为职称，前面的汉字不是姓名
+    for text in ["患者由主治医生李四负责", "今日医生建议出院", "经治医生签名：王五"]:
+        assert engine.deidentify(text) == (text, {})
+    # 姓名从姓氏开始，前面的字保留
+    assert engine.deidentify("请王小明主任医师会诊")[0] == "请某某主任医师会诊"
+    assert engine.deidentify("李四主任医师查房，陈佛平护士长")[0] == "某某主任医师查房，某某护士长"
+
+
+def test_surname_triggers_and_compound_surnames():
+    engine = FallbackRuleEngine(custom_terms={"surnames": ["张", "李", "王", "陈", "欧阳", "诸葛"]},
+                                enable_categories={"surnames": True})
+    text = "父母亲：王小明。从患者张三，患者李四，患者王五六。紧急联系人：陈平，医生：赵四。欧阳娜娜、诸葛亮"
+    out, stats = engine.deidentify(text)
+    # 触发词之后的两字名字才替换；"从患者"、三字名、非姓氏开头不替换
+    assert out == "父母亲：王某明。从患者张三，患者李某，患者王五六。紧急联系人：陈某，医生：赵四。欧阳某、诸葛某"
+    assert stats == {"surnames": 5}
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
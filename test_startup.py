@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test lazy imports of heavy dependencies and the startup profiler"""
+
+import io
+
+from safe_med_ui.startup import parse_importtime, print_startup_report, profile_startup
+
+
+def test_parse_importtime_groups_packages():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:      1000 |       1000 |   pandas.core",
+        "import time:      2000 |       3000 | pandas",
+        "import time:       500 |        500 | safe_med_ui.io_utils",
+        "Traceback: ignored",
+    ])
+    assert parse_importtime(stderr) == {"pandas": 0.003, "safe_med_ui.io_utils": 0.0005}
+
+
+def test_entry_points_skip_heavy_imports():
+    for target in ("safe_med.cli", "safe_med_ui.ui_app", "safe_med_ui.engine", "safe_med_ui.batch"):
+        report = profile_startup(target)
+        assert report.heavy_loaded == [], (target, report.heavy_loaded)
+
+    # 导入 columns 不加载 pandas；第一次按列脱敏（deidentify_records → deidentify_column）时才导入
+    report = profile_startup("safe_med_ui.columns", "\n".join([
+        "assert 'pandas' not in sys.modules",
+        "from safe_med_ui.columns import deidentify_records",
+        "rows, _ = deidentify_records([{'备注': '电话'}], lambda text, **kw: (text + '*', {}))",
+        "assert rows == [{'备注': '电话*'}]",
+    ]))
+    assert "pandas" in report.heavy_loaded
+
+
+def test_print_report():
+    out = io.StringIO()
+    assert print_startup_report("safe_med_ui.engine", out=out) == 0
+    assert "safe_med_ui.engine" in out.getvalue()
+    assert print_startup_report("no_such_module_xyz", out=io.StringIO()) == 1
+
+
+if __name__ == "__main__":
+    test_parse_importtime_groups_packages()
+    test_entry_points_skip_heavy_imports()
+    test_print_report()
+    print("✓ 启动耗时测试通过")